@@ -17,13 +17,16 @@ Starting point for routing EC2 requests.
 """
 import hashlib
 import json
+import os
 import sys
+import time
 
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
 from oslo_utils import timeutils
 import requests
+from requests import adapters as requests_adapters
 import six
 import webob
 import webob.dec
@@ -33,8 +36,10 @@ from ec2api.api import apirequest
 from ec2api.api import ec2utils
 from ec2api.api import faults
 from ec2api import context
+from ec2api.db import api as db_api
 from ec2api import exception
 from ec2api.i18n import _
+from ec2api import utils
 from ec2api import wsgi
 
 
@@ -53,6 +58,32 @@ ec2_opts = [
     cfg.IntOpt('ec2_timestamp_expiry',
                default=300,
                help='Time in seconds before ec2 timestamp expires'),
+    cfg.IntOpt('auth_cache_size',
+               default=1024,
+               help='Maximum number of IAM validation results to cache. '
+                    'Zero disables the cache.'),
+    cfg.IntOpt('auth_cache_ttl',
+               default=60,
+               help='Time in seconds to cache successful IAM validation '
+                    'results. Zero disables the cache.'),
+    cfg.IntOpt('auth_cache_negative_ttl',
+               default=5,
+               help='Time in seconds to cache rejections of IAM '
+                    'validation. Zero disables caching of rejections.'),
+    cfg.IntOpt('iam_pool_size',
+               default=10,
+               help='Maximum number of keep-alive connections to IAM per '
+                    'worker.'),
+    cfg.FloatOpt('iam_connect_timeout',
+                 default=5.0,
+                 help='Timeout in seconds to connect to IAM.'),
+    cfg.FloatOpt('iam_read_timeout',
+                 default=30.0,
+                 help='Timeout in seconds to wait for IAM response.'),
+    cfg.IntOpt('iam_connect_retries',
+               default=2,
+               help='Number of retries on failed connections to IAM. '
+                    'Requests which reached IAM are not retried.'),
 ]
 
 CONF = cfg.CONF
@@ -295,6 +326,20 @@ class EC2KeystoneAuth(wsgi.Middleware):
                           'DeletePaasAccount' : None
                     }
 
+    def __init__(self, application):
+        super(EC2KeystoneAuth, self).__init__(application)
+        # NOTE(ft): validation results are keyed on the whole IAM request,
+        # so that a cached result is reused for the same token (or the same
+        # signed request) with the same action and resource only
+        self.auth_cache = utils.TTLCache(CONF.auth_cache_size,
+                                         CONF.auth_cache_ttl)
+        self._iam_session = None
+        self._iam_session_pid = None
+        self.iam_stats = {'requests': 0,
+                          'failures': 0,
+                          'total_time': 0.0,
+                          'max_time': 0.0}
+
     def _get_signature(self, req):
         """Extract the signature from the request.
 
@@ -393,6 +438,108 @@ class EC2KeystoneAuth(wsgi.Middleware):
 
         return armvalue
              
+    def _get_iam_session(self):
+        # NOTE(ft): the middleware is built before API workers are forked,
+        # so every worker creates its own session to not share sockets
+        pid = os.getpid()
+        if self._iam_session is None or self._iam_session_pid != pid:
+            session = requests.Session()
+            # NOTE(ft): an integer max_retries retries connection errors
+            # only, so a validation request which reached IAM is never
+            # sent twice
+            adapter = requests_adapters.HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=CONF.iam_pool_size,
+                max_retries=CONF.iam_connect_retries)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._iam_session = session
+            self._iam_session_pid = pid
+        return self._iam_session
+
+    def get_iam_pool_stats(self):
+        """Return IAM request statistics of the current worker."""
+        stats = dict(self.iam_stats)
+        stats['pools'] = {}
+        if self._iam_session is not None:
+            pools = self._iam_session.get_adapter(
+                CONF.keystone_url).poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                stats['pools'][pool.host] = {
+                    'connections': pool.num_connections,
+                    'requests': pool.num_requests,
+                    'idle': pool.pool.qsize() if pool.pool else 0}
+        return stats
+
+    def _request_iam(self, iam_validation_url, headers, data):
+        verify = CONF.ssl_ca_file or not CONF.ssl_insecure
+        session = self._get_iam_session()
+        start = time.time()
+        try:
+            return session.request(
+                'POST', iam_validation_url, verify=verify, data=data,
+                headers=headers,
+                timeout=(CONF.iam_connect_timeout, CONF.iam_read_timeout))
+        except Exception:
+            self.iam_stats['failures'] += 1
+            raise
+        finally:
+            elapsed = time.time() - start
+            self.iam_stats['requests'] += 1
+            self.iam_stats['total_time'] += elapsed
+            self.iam_stats['max_time'] = max(self.iam_stats['max_time'],
+                                             elapsed)
+            LOG.debug('IAM request took %.3fs', elapsed)
+
+    def _get_auth_cache_key(self, iam_validation_url, headers, data):
+        key = jsonutils.dumps([iam_validation_url, headers.get('X-Auth-Token'),
+                               headers.get('X-Forwarded-For'), data])
+        return hashlib.sha256(key).hexdigest()
+
+    def _validate_credentials(self, iam_validation_url, headers, data,
+                              auth_token, cache_key):
+        """Validate the request with IAM and cache the result.
+
+        Returns (status code, error message, (user_id, account_id, token_id))
+        tuple. Credentials are None if the validation failed.
+        """
+        response = self._request_iam(iam_validation_url, headers, data)
+        status_code = response.status_code
+        if status_code != 200:
+            LOG.error("Request headers - %s", str(headers))
+            LOG.error("Request params - %s", str(data))
+            LOG.error("Response headers - %s", str(response.headers))
+            LOG.error("Response content - %s", str(response._content))
+            auth_result = (status_code, response.reason, None)
+            # NOTE(ft): cache rejections of the request only, not failures
+            # of IAM itself
+            if 400 <= status_code < 500:
+                self.auth_cache.set(cache_key, auth_result,
+                                    CONF.auth_cache_negative_ttl)
+            return auth_result
+        result = response.json()
+
+        try:
+            user_id = result['user_id']
+            project_id = result['account_id']
+
+            if auth_token:
+                token_id = auth_token
+            else:
+                token_id = result['token_id']
+
+            if not token_id or not project_id or not user_id:
+                raise KeyError
+        except (AttributeError, KeyError):
+            LOG.exception(_("Keystone failure"))
+            msg = _("Failure communicating with keystone")
+            return (400, msg, None)
+
+        auth_result = (200, None, (user_id, project_id, token_id))
+        self.auth_cache.set(cache_key, auth_result)
+        return auth_result
+
     @webob.dec.wsgify(RequestClass=wsgi.Request)
     def __call__(self, req):
         request_id = context.generate_request_id()
@@ -485,41 +632,20 @@ class EC2KeystoneAuth(wsgi.Middleware):
                     format(request_id=request_id, client_ip=client_ip)))
         if client_ip:
             headers['X-Forwarded-For'] = client_ip
-        verify = CONF.ssl_ca_file or not CONF.ssl_insecure
-        response = requests.request('POST', iam_validation_url, verify=verify,
-                                    data=data, headers=headers)
-        status_code = response.status_code
+        cache_key = self._get_auth_cache_key(iam_validation_url, headers,
+                                             data)
+        auth_result = self.auth_cache.get(cache_key)
+        if auth_result is None:
+            auth_result = self._validate_credentials(
+                iam_validation_url, headers, data, auth_token, cache_key)
+        status_code, msg, credentials = auth_result
         if status_code != 200:
-            LOG.error("Request headers - %s", str(headers))
-            LOG.error("Request params - %s", str(data))
-            LOG.error("Response headers - %s", str(response.headers))
-            LOG.error("Response content - %s", str(response._content))
-            msg = response.reason
             return faults.ec2_error_response(request_id, "AuthFailure", msg,
                                              status=status_code)
-        result = response.json()
-
-        try:
-            user_id = result['user_id']
-            project_id = result['account_id']
-
-            if auth_token:
-                token_id = auth_token
-            else:
-                token_id = result['token_id']
-
-            if not token_id or not project_id or not user_id:
-                raise KeyError
-
-            user_name = project_name = 'default'
-
-            roles = []
-            catalog = []
-        except (AttributeError, KeyError):
-            LOG.exception(_("Keystone failure"))
-            msg = _("Failure communicating with keystone")
-            return faults.ec2_error_response(request_id, "AuthFailure", msg,
-                                             status=400)
+        user_id, project_id, token_id = credentials
+        user_name = project_name = 'default'
+        roles = []
+        catalog = []
 
         remote_address = req.remote_addr
         if CONF.use_forwarded_for:
@@ -535,6 +661,7 @@ class EC2KeystoneAuth(wsgi.Middleware):
                                       service_catalog=catalog,
                                       api_version=req.params.get('Version'),
                                       request_id=request_id)
+        ctxt.item_cache = db_api.ItemCache()
 
         req.environ['ec2api.context'] = ctxt
 
@@ -16,6 +16,7 @@ try:
     from neutronclient.common import exceptions as neutron_exception
 except ImportError:
     pass  # clients will log absense of neutronclient in this case
+import eventlet
 from novaclient import exceptions as nova_exception
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -24,34 +25,35 @@ from ec2api.api import clients
 from ec2api.api import common
 from ec2api.api import ec2utils
 from ec2api.api import internet_gateway as internet_gateway_api
+from ec2api.api import router_ssh
+from ec2api import context as ec2_context
 from ec2api.db import api as db_api
 from ec2api import exception
 from ec2api.i18n import _
-import paramiko
-import re   
-
-CONF = cfg.CONF
 
 address_opts = [
-    cfg.StrOpt('router_address',
-               default='',
-               help='Address of router to get routes'),
-    cfg.StrOpt('router_user',
-               default='',
-               help='Username for router'),
-    cfg.StrOpt('router_cred',
-               default='',
-               help='Creds for Router'),
+    cfg.BoolOpt('check_address_status_on_describe',
+                default=False,
+                help='Check routes of addresses on the router over SSH '
+                     'during DescribeAddresses. By default DescribeAddresses '
+                     'returns statuses stored by the '
+                     'ec2-api-address-reconciler service, which must be '
+                     'deployed. Enable it for deployments without the '
+                     'reconciler.'),
+    cfg.IntOpt('address_reconcile_interval',
+               default=30,
+               help='Interval in seconds between runs of the address '
+                    'status reconciler.'),
+    cfg.IntOpt('address_reconcile_concurrency',
+               default=4,
+               help='Number of concurrent router lookups of the address '
+                    'status reconciler.'),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(address_opts)
 LOG = logging.getLogger(__name__)
 
-RouterIP = CONF.router_address
-RouterUser = CONF.router_user
-RouterCred = CONF.router_cred 
-
 Status = ['active', 'pending']
 
 """Address related API implementation
@@ -63,17 +65,13 @@ Validator = common.Validator
 
 
 def get_rt_ip_status(publicIp):
-    status = Status[1]
-    client = paramiko.SSHClient()
-    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    client.connect(RouterIP, username=RouterUser, password=RouterCred)
-    stdin, stdout, stderr = client.exec_command('show route '+publicIp +' detail'+ ' | grep \"Protocol next hop\"')
-    for line in stdout:
-        if re.match('\s+Protocol next hop: \d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}.*', line) !=None :
-            status = Status[0]
-            break
-    client.close()
-    return status
+    return get_rt_ip_statuses([publicIp])[publicIp]
+
+
+def get_rt_ip_statuses(public_ips):
+    return {public_ip: Status[0] if has_route else Status[1]
+            for public_ip, has_route in
+            router_ssh.have_routes(public_ips).iteritems()}
 
 
     ### This function is called in order to remove any descrepancies
@@ -178,16 +176,54 @@ class AddressDescriber(common.UniversalDescriber):
                   'public-ip': 'publicIp',
                   'status': 'status'}
 
-    def __init__(self, os_ports, db_instances):
-        self.os_ports = os_ports
-        self.db_instances_dict = {i['os_id']: i for i in (db_instances or [])}
+    def __init__(self):
+        self.rt_ip_statuses = None
+
+    def get_rt_ip_status(self, public_ip):
+        # NOTE(ft): check routes of all addresses which can need it at once
+        # over a single router session instead of one session per address
+        if self.rt_ip_statuses is None:
+            self.rt_ip_statuses = get_rt_ip_statuses(
+                [i['public_ip'] for i in self.items
+                 if _is_route_check_needed(i)])
+        status = self.rt_ip_statuses.get(public_ip)
+        return status if status else get_rt_ip_status(public_ip)
 
     def format(self, item=None, os_item=None):
-        return _format_address(self.context, item, os_item, self.os_ports,
-                               self.db_instances_dict)
+        return _format_address(self.context, item, os_item,
+                               self.os_ports_dict, self.db_instances_dict)
+
+    def get_sources(self):
+        sources = super(AddressDescriber, self).get_sources()
+        sources['db_instances_dict'] = lambda: {
+            i['os_id']: i for i in db_api.get_items(self.context, 'i')}
+        if not self.is_lightweight_describe():
+            sources.update({
+                'os_ports_dict': lambda: {
+                    p['id']: p
+                    for p in address_engine.get_os_ports(self.context) or []},
+                'os_floating_ips': lambda: (
+                    address_engine.get_os_floating_ips(self.context)),
+            })
+        return sources
 
     def get_os_items(self):
-        return address_engine.get_os_floating_ips(self.context)
+        if not self.is_lightweight_describe():
+            return self.os_floating_ips
+        # NOTE(ft): get only requested floating IPs and their ports
+        os_ids = [i['os_id'] for i in self.items]
+        if not os_ids:
+            return []
+        os_floating_ips = address_engine.get_os_floating_ips(
+            self.context, os_ids=os_ids)
+        port_ids = [ip['port_id'] for ip in os_floating_ips
+                    if ip.get('port_id')]
+        self.os_ports_dict = (
+            {p['id']: p
+             for p in address_engine.get_os_ports(self.context,
+                                                  os_ids=port_ids) or []}
+            if port_ids else {})
+        return os_floating_ips
 
     def auto_update_db(self, item, os_item):
         item = super(AddressDescriber, self).auto_update_db(item, os_item)
@@ -198,42 +234,8 @@ class AddressDescriber(common.UniversalDescriber):
             LOG.error("Auto update triggered disassociation - Local DB item : {} OS item : {}".format(str(item), str(os_item)))
         
         
-        ## still need to change active and inactive
-        # If it has network_interface and status is inactive then association is happened
-        # check whether new network is available in router 
-        # If it doesn't have network interface and status is active
-        # then disassociation has happened check for update
-        if (item and 'status' in item) :
-            if (item['status'] == Status[1] ) :
-                
-                item['status'] = get_rt_ip_status(item['public_ip'])
-                
-                if('network_interface_id' in item) :                
-                    #check for route
-                    LOG.error('Address {} is pending and is associated. Adding status as {}'.format(str(item), item['status']))
-                    if item['status'] == Status[0] :
-                        _update_status(self.context, item, Status[0])
-
-                else :
-                    LOG.error('Address {} is pending and not associated. Popping status field'.format(str(item)))
-                    _pop_status(self.context, item)
-                    
-            elif ( item['status'] == Status[0] and 'network_interface_id' not in item ) :
-                #check for route
-                item['status'] = get_rt_ip_status(item['public_ip']) 
-                LOG.error('Address {} is disassociated and active. Current status is {}'.format(str(item), item['status']))
-                #pop if status is inactive
-                if item['status'] ==Status[1] :
-                    _pop_status(self.context, item)
-        
-        #This is for migration whenever an old associated address is described.    
-        if (item and 'network_interface_id' in item and 'status' not in item) :
-            #check for routes
-            item['status'] = get_rt_ip_status(item['public_ip'])
-            LOG.error('Address {} do not have status. Adding status as {}'.format(str(item), item['status']))
-            _update_status(self.context, item, item['status'])
-            
-            
+        if item and CONF.check_address_status_on_describe:
+            _sync_address_status(self.context, item, self.get_rt_ip_status)
         return item
 
     def get_name(self, os_item):
@@ -242,17 +244,15 @@ class AddressDescriber(common.UniversalDescriber):
 
 def describe_addresses(context, public_ip=None, allocation_id=None,
                        filter=None):
-    formatted_addresses = AddressDescriber(
-        address_engine.get_os_ports(context),
-        db_api.get_items(context, 'i')).describe(
-            context, allocation_id, public_ip, filter)
+    formatted_addresses = AddressDescriber().describe(
+        context, allocation_id, public_ip, filter)
     return {'addressesSet': formatted_addresses}
 
 ## Modify this function by adding bgp routes here.
 ## Also take care for vagrant environment.
 ## Make sure you read from your env.
 
-def _format_address(context, address, os_floating_ip, os_ports=[],
+def _format_address(context, address, os_floating_ip, os_ports_dict=None,
                     db_instances_dict=None):
     ec2_address = {'publicIp': os_floating_ip['floating_ip_address']}
     fixed_ip_address = os_floating_ip.get('fixed_ip_address')
@@ -261,8 +261,7 @@ def _format_address(context, address, os_floating_ip, os_ports=[],
         port_id = os_floating_ip.get('port_id')
         os_fip = os_floating_ip.get('instance_id')
         if port_id:
-            port = next((port for port in os_ports
-                         if port['id'] == port_id), None)
+            port = (os_ports_dict or {}).get(port_id)
             if port and port.get('device_id'):
                 ec2_address['instanceId'] = (
                     _get_instance_ec2_id_by_os_id(context, port['device_id'],
@@ -300,6 +299,92 @@ def _get_instance_ec2_id_by_os_id(context, os_instance_id, db_instances_dict):
     return db_item['id']
 
 
+def _is_route_check_needed(item):
+    """Check if _sync_address_status looks up routes of the address."""
+    if 'status' not in item:
+        return 'network_interface_id' in item
+    return (item['status'] == Status[1] or
+            (item['status'] == Status[0] and
+             'network_interface_id' not in item))
+
+
+def _sync_address_status(context, item, get_rt_ip_status):
+    """Update status of the address item by its route on the router."""
+    ## still need to change active and inactive
+    # If it has network_interface and status is inactive then association is happened
+    # check whether new network is available in router
+    # If it doesn't have network interface and status is active
+    # then disassociation has happened check for update
+    if (item and 'status' in item) :
+        if (item['status'] == Status[1] ) :
+
+            item['status'] = get_rt_ip_status(item['public_ip'])
+
+            if('network_interface_id' in item) :
+                #check for route
+                LOG.error('Address {} is pending and is associated. Adding status as {}'.format(str(item), item['status']))
+                if item['status'] == Status[0] :
+                    _update_status(context, item, Status[0])
+
+            else :
+                LOG.error('Address {} is pending and not associated. Popping status field'.format(str(item)))
+                _pop_status(context, item)
+
+        elif ( item['status'] == Status[0] and 'network_interface_id' not in item ) :
+            #check for route
+            item['status'] = get_rt_ip_status(item['public_ip'])
+            LOG.error('Address {} is disassociated and active. Current status is {}'.format(str(item), item['status']))
+            #pop if status is inactive
+            if item['status'] ==Status[1] :
+                _pop_status(context, item)
+
+    #This is for migration whenever an old associated address is described.
+    if (item and 'network_interface_id' in item and 'status' not in item) :
+        #check for routes
+        item['status'] = get_rt_ip_status(item['public_ip'])
+        LOG.error('Address {} do not have status. Adding status as {}'.format(str(item), item['status']))
+        _update_status(context, item, item['status'])
+
+
+def reconcile_addresses_status(context):
+    """Sync status of addresses of all projects with the router."""
+    addresses = [(project_id, address)
+                 for project_id, project_addresses in
+                 db_api.get_all_projects_items(context, 'eipalloc').iteritems()
+                 for address in project_addresses
+                 if _is_route_check_needed(address)]
+    if not addresses:
+        return
+    public_ips = sorted(set(address['public_ip']
+                            for _project_id, address in addresses))
+    concurrency = max(CONF.address_reconcile_concurrency, 1)
+    chunk_size = (len(public_ips) + concurrency - 1) // concurrency
+    rt_ip_statuses = {}
+    pool = eventlet.GreenPool(concurrency)
+    for statuses in pool.imap(get_rt_ip_statuses,
+                              [public_ips[i:i + chunk_size]
+                               for i in range(0, len(public_ips),
+                                              chunk_size)]):
+        rt_ip_statuses.update(statuses)
+
+    def get_status(public_ip):
+        return rt_ip_statuses.get(public_ip) or get_rt_ip_status(public_ip)
+
+    for project_id, address in addresses:
+        project_context = ec2_context.RequestContext(
+            None, project_id, is_admin=True, overwrite=False)
+        # NOTE(ft): reload the item to not overwrite changes made by API
+        # requests during router lookups
+        address = db_api.get_item_by_id(project_context, address['id'])
+        if not address:
+            continue
+        try:
+            _sync_address_status(project_context, address, get_status)
+        except Exception:
+            LOG.exception(_('Failed to update status of address %s'),
+                          address['id'])
+
+
 def _is_address_valid(context, neutron, address):
     try:
         neutron.show_floatingip(address['os_id'])
@@ -549,14 +634,17 @@ class AddressEngineNeutron(object):
                 
                 return status
 
-    def get_os_floating_ips(self, context):
+    def get_os_floating_ips(self, context, os_ids=None):
         neutron = clients.neutron(context)
+        search_opts = {'id': os_ids} if os_ids is not None else {}
         return neutron.list_floatingips(
-            tenant_id=context.project_id)['floatingips']
+            tenant_id=context.project_id, **search_opts)['floatingips']
 
-    def get_os_ports(self, context):
+    def get_os_ports(self, context, os_ids=None):
         neutron = clients.neutron(context)
-        return neutron.list_ports(tenant_id=context.project_id)['ports']
+        search_opts = {'id': os_ids} if os_ids is not None else {}
+        return neutron.list_ports(tenant_id=context.project_id,
+                                  **search_opts)['ports']
 
 
 class AddressEngineNova(object):
@@ -597,10 +685,14 @@ class AddressEngineNova(object):
             nova.servers.remove_floating_ip(os_instance_id, public_ip)
         return None
 
-    def get_os_floating_ips(self, context):
+    def get_os_floating_ips(self, context, os_ids=None):
         nova = clients.nova(context)
-        return self.convert_ips_to_neutron_format(context,
-                                                  nova.floating_ips.list())
+        os_floating_ips = self.convert_ips_to_neutron_format(
+            context, nova.floating_ips.list())
+        if os_ids is not None:
+            os_floating_ips = [ip for ip in os_floating_ips
+                               if ip['id'] in os_ids]
+        return os_floating_ips
 
     def convert_ips_to_neutron_format(self, context, nova_ips):
         neutron_ips = []
@@ -611,7 +703,7 @@ class AddressEngineNova(object):
                                 'instance_id': nova_ip.instance_id})
         return neutron_ips
 
-    def get_os_ports(self, context):
+    def get_os_ports(self, context, os_ids=None):
         return []
 
     def get_nova_ip_by_public_ip(self, context, public_ip,
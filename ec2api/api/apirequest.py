@@ -17,13 +17,10 @@ APIRequest class
 """
 
 import datetime
-# TODO(termie): replace minidom with etree
-from xml.dom import minidom
+from xml.sax import saxutils
 
-from lxml import etree
 from oslo_config import cfg
 from oslo_log import log as logging
-from oslo_utils import encodeutils
 import six
 
 from ec2api.api import cloud
@@ -49,6 +46,15 @@ def _database_to_isoformat(datetimeobj):
     return datetimeobj.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + 'Z'
 
 
+def _escape_attribute(value):
+    """Escape a value of a double quoted attribute to ASCII."""
+    # NOTE(ft): whitespaces are escaped to keep them from attribute value
+    # normalization of XML parsers
+    value = saxutils.escape(value, {'"': '&quot;', '\t': '&#9;',
+                                    '\n': '&#10;', '\r': '&#13;'})
+    return value.encode('ascii', 'xmlcharrefreplace')
+
+
 class APIRequest(object):
 
     def __init__(self, action, version, args):
@@ -94,27 +100,24 @@ class APIRequest(object):
         return self._render_response(result, context.request_id)
 
     def _render_response(self, response_data, request_id):
-        xml = minidom.Document()
-
-        response_el = xml.createElement(self.action + 'Response')
-        response_el.setAttribute('xmlns',
-                                 'http://vpc.ind-west-1.jiocloudservices.com/doc/%s/'
-                                 % self.version)
-        request_id_el = xml.createElement('requestId')
-        request_id_el.appendChild(xml.createTextNode(request_id))
-        response_el.appendChild(request_id_el)
+        # NOTE(ft): the response is written in one pass into a list of
+        # chunks. The result is the same as lxml pretty printed output:
+        # two spaces indentation, ASCII encoding with character references,
+        # no XML declaration, empty elements are self closed.
+        chunks = []
+        root_name = self.action + 'Response'
+        chunks.append('<%s xmlns="%s">\n' % (
+            root_name,
+            _escape_attribute('http://vpc.ind-west-1.jiocloudservices.com/'
+                              'doc/%s/' % self.version)))
+        self._render_text(chunks, 1, 'requestId', request_id)
         if response_data is True:
-            self._render_dict(xml, response_el, {'return': 'true'})
+            self._render_dict(chunks, 1, {'return': 'true'})
         else:
-            self._render_dict(xml, response_el, response_data)
-
-        xml.appendChild(response_el)
+            self._render_dict(chunks, 1, response_data)
+        chunks.append('</%s>\n' % root_name)
 
-        response = xml.toxml()
-        root = etree.fromstring(response)
-        response = etree.tostring(root, pretty_print=True)
-
-        xml.unlink()
+        response = ''.join(chunks)
 
         # Don't write private key or response to flow-log api to log
         if self.action == "DescribeFlowLog":
@@ -126,33 +129,49 @@ class APIRequest(object):
 
         return response
 
-    def _render_dict(self, xml, el, data):
+    def _render_dict(self, chunks, level, data):
         try:
             for key in data.keys():
                 val = data[key]
-                el.appendChild(self._render_data(xml, key, val))
+                self._render_data(chunks, level, key, val)
         except Exception:
             LOG.debug(data)
             raise
 
-    def _render_data(self, xml, el_name, data):
+    def _render_data(self, chunks, level, el_name, data):
         el_name = _underscore_to_xmlcase(el_name)
-        data_el = xml.createElement(el_name)
-
-        if isinstance(data, list):
-            for item in data:
-                data_el.appendChild(self._render_data(xml, 'item', item))
-        elif isinstance(data, dict):
-            self._render_dict(xml, data_el, data)
-        elif hasattr(data, '__dict__'):
-            self._render_dict(xml, data_el, data.__dict__)
+        indent = '  ' * level
+
+        if isinstance(data, (list, dict)) or hasattr(data, '__dict__'):
+            if not isinstance(data, (list, dict)):
+                data = data.__dict__
+            if not data:
+                chunks.append('%s<%s/>\n' % (indent, el_name))
+                return
+            chunks.append('%s<%s>\n' % (indent, el_name))
+            if isinstance(data, list):
+                for item in data:
+                    self._render_data(chunks, level + 1, 'item', item)
+            else:
+                self._render_dict(chunks, level + 1, data)
+            chunks.append('%s</%s>\n' % (indent, el_name))
         elif isinstance(data, bool):
-            data_el.appendChild(xml.createTextNode(str(data).lower()))
+            self._render_text(chunks, level, el_name, str(data).lower())
         elif isinstance(data, datetime.datetime):
-            data_el.appendChild(
-                xml.createTextNode(_database_to_isoformat(data)))
+            self._render_text(chunks, level, el_name,
+                              _database_to_isoformat(data))
         elif data is not None:
-            data_el.appendChild(xml.createTextNode(
-                encodeutils.safe_encode(six.text_type(data))))
-
-        return data_el
+            self._render_text(chunks, level, el_name, six.text_type(data))
+        else:
+            self._render_text(chunks, level, el_name, None)
+
+    def _render_text(self, chunks, level, el_name, text):
+        if not text:
+            chunks.append('%s<%s/>\n' % ('  ' * level, el_name))
+            return
+        # NOTE(ft): XML parsers normalize line ends, the previous
+        # implementation reparsed the document, so do the same
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+        text = saxutils.escape(text).encode('ascii', 'xmlcharrefreplace')
+        chunks.append('%s<%s>%s</%s>\n' % ('  ' * level, el_name, text,
+                                           el_name))
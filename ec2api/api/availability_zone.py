@@ -15,6 +15,7 @@
 from oslo_config import cfg
 from oslo_log import log as logging
 
+from ec2api.api import catalog_cache
 from ec2api.api import clients
 from ec2api.api import common
 from ec2api import exception
@@ -77,12 +78,9 @@ class AvailabilityZoneDescriber(common.UniversalDescriber):
         return []
 
     def get_os_items(self):
-        nova = clients.nova(self.context)
-        zones = nova.availability_zones.list(detailed=False)
-        for zone in zones:
-            if zone.zoneName == CONF.internal_service_availability_zone:
-                zones.remove(zone)
-        return zones
+        # NOTE(ft): zones are the same for all projects
+        return list(catalog_cache.availability_zones.get(
+            None, lambda: _get_os_availability_zones(self.context)))
 
     def get_name(self, os_item):
         return os_item.zoneName
@@ -151,6 +149,13 @@ def describe_account_attributes(context, attribute_name=None):
     return {'accountAttributeSet': formatted_attributes}
 
 
+def _get_os_availability_zones(context):
+    nova = clients.nova(context)
+    zones = nova.availability_zones.list(detailed=False)
+    return [zone for zone in zones
+            if zone.zoneName != CONF.internal_service_availability_zone]
+
+
 def _format_availability_zone(zone):
     return {'zoneName': zone.zoneName,
             'zoneState': ('available'
@@ -0,0 +1,166 @@
+# Copyright 2014
+# The Cloudscaling Group, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per worker cache of slow changing OpenStack catalogs."""
+
+import os
+import sys
+
+from eventlet import event
+from oslo_config import cfg
+import six
+
+from ec2api import utils
+
+
+catalog_cache_opts = [
+    cfg.IntOpt('catalog_cache_size',
+               default=256,
+               help='Maximum number of cached entries of every OpenStack '
+                    'catalog (flavors, availability zones, service '
+                    'catalogs).'),
+    cfg.IntOpt('flavor_cache_ttl',
+               default=300,
+               help='Time in seconds to cache Nova flavors. Zero disables '
+                    'the cache.'),
+    cfg.IntOpt('availability_zone_cache_ttl',
+               default=60,
+               help='Time in seconds to cache Nova availability zones. Zero '
+                    'disables the cache.'),
+    cfg.IntOpt('service_catalog_cache_ttl',
+               default=300,
+               help='Time in seconds to cache Keystone service catalogs. '
+                    'Zero disables the cache.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(catalog_cache_opts)
+
+
+class CatalogCache(object):
+    """TTL cache of one catalog.
+
+    Concurrent misses of the same key wait for a single fetch instead of
+    fetching the catalog once per request. If negative_ttl_option is set,
+    None fetched for a key is cached for that time as a negative result.
+    """
+
+    def __init__(self, name, ttl_option, size_option='catalog_cache_size',
+                 group=None, negative_ttl_option=None):
+        self.name = name
+        self._ttl_option = ttl_option
+        self._size_option = size_option
+        self._group = group
+        self._negative_ttl_option = negative_ttl_option
+        self._cache = None
+        self._cache_pid = None
+        self._fetches = {}
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+
+    def _get_conf(self):
+        return getattr(CONF, self._group) if self._group else CONF
+
+    def _get_cache(self):
+        # NOTE(ft): API workers are forked after the module is loaded, every
+        # worker needs its own cache
+        pid = os.getpid()
+        if self._cache is None or self._cache_pid != pid:
+            conf = self._get_conf()
+            self._cache = utils.TTLCache(getattr(conf, self._size_option),
+                                         getattr(conf, self._ttl_option))
+            self._cache_pid = pid
+            self._fetches = {}
+        return self._cache
+
+    def get(self, key, fetch):
+        """Return cached value of the key, call fetch() to get it on miss."""
+        cache = self._get_cache()
+        value = cache.get(key, _MISSED)
+        if value is not _MISSED:
+            self.hits += 1
+            if value is None:
+                self.negative_hits += 1
+            return value
+        pending_fetch = self._fetches.get(key)
+        if pending_fetch is not None:
+            value = pending_fetch.wait()
+            if value is _INTERRUPTED:
+                return self.get(key, fetch)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        pending_fetch = self._fetches[key] = event.Event()
+        try:
+            value = fetch()
+        except Exception:
+            exc_info = sys.exc_info()
+            self._fetches.pop(key, None)
+            pending_fetch.send_exception(*exc_info)
+            six.reraise(*exc_info)
+        except BaseException:
+            # NOTE(ft): the fetch is interrupted by a timeout or a kill of
+            # the fetching green thread, waiters fetch the value themselves
+            self._fetches.pop(key, None)
+            pending_fetch.send(_INTERRUPTED)
+            raise
+        if value is not None:
+            cache.set(key, value)
+        elif self._negative_ttl_option:
+            cache.set(key, value,
+                      getattr(self._get_conf(), self._negative_ttl_option))
+        self._fetches.pop(key, None)
+        pending_fetch.send(value)
+        return value
+
+    def invalidate(self, key=None):
+        if self._cache is None:
+            return
+        if key is None:
+            # NOTE(ft): the cache is recreated with actual options on the
+            # next access
+            self._cache = None
+        else:
+            self._cache.pop(key)
+
+    def get_stats(self):
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'negative_hits': self.negative_hits,
+                'size': len(self._cache) if self._cache is not None else 0}
+
+
+_MISSED = object()
+_INTERRUPTED = object()
+
+flavors = CatalogCache('flavors', 'flavor_cache_ttl')
+availability_zones = CatalogCache('availability_zones',
+                                  'availability_zone_cache_ttl')
+service_catalogs = CatalogCache('service_catalogs',
+                                'service_catalog_cache_ttl')
+
+_CACHES = (flavors, availability_zones, service_catalogs)
+
+
+def invalidate_all():
+    """Drop all cached catalogs, e.g. after flavors or zones are changed."""
+    for cache in _CACHES:
+        cache.invalidate()
+
+
+def get_stats():
+    """Return hit and miss counters of all catalog caches."""
+    return dict((cache.name, cache.get_stats()) for cache in _CACHES)
@@ -19,6 +19,7 @@ from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging as messaging
 
+from ec2api.api import catalog_cache
 from ec2api import context as ec2_context
 from ec2api.i18n import _, _LW
 
@@ -172,8 +173,10 @@ def nova_cert(context):
 def _url_for(context, **kwargs):
     service_catalog = context.service_catalog
     if not service_catalog:
-        catalog = keystone(context).service_catalog.catalog
-        service_catalog = catalog['serviceCatalog']
+        service_catalog = catalog_cache.service_catalogs.get(
+            context.project_id,
+            lambda: keystone(context).service_catalog.catalog[
+                'serviceCatalog'])
         context.service_catalog = service_catalog
 
     service_type = kwargs['service_type']
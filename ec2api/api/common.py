@@ -12,28 +12,59 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
 import collections
 import fnmatch
+import hashlib
+import hmac
 import inspect
+import json
+import re
+import sys
 
+import eventlet
 from oslo_config import cfg
+from oslo_db import options as db_options
 from oslo_log import log as logging
+import six
 
 from ec2api.api import ec2utils
 from ec2api.api import validator
 from ec2api.db import api as db_api
 from ec2api import exception
-from ec2api.i18n import _LW
+from ec2api.i18n import _, _LW
+from ec2api import utils
 
 
 ec2_opts = [
     cfg.BoolOpt('full_vpc_support',
                 default=True,
                 help='True if server supports Neutron for full VPC access'),
+    cfg.FloatOpt('describe_source_timeout',
+                 default=60.0,
+                 help='Timeout in seconds to fetch every data source of a '
+                      'describe operation. Zero disables the timeout.'),
+    cfg.IntOpt('lightweight_describe_limit',
+               default=10,
+               help='Maximum number of items requested by ids, which a '
+                    'describe operation fetches from OpenStack by their ids '
+                    'instead of listing all items of the project. Zero '
+                    'disables lightweight describes.'),
+    cfg.StrOpt('next_token_secret',
+               secret=True,
+               help='Secret key to sign NextToken values of paginated '
+                    'describe operations. It must be the same for all API '
+                    'workers and nodes. If it is not set, the key is derived '
+                    'from the database connection and the admin password, '
+                    'which all API workers share.'),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(ec2_opts)
+# NOTE(ft): the database options are registered by oslo.db on the first DB
+# access, the next token key needs them earlier
+CONF.register_opts(db_options.database_opts, 'database')
+CONF.import_opt('admin_password', 'ec2api.context')
 LOG = logging.getLogger(__name__)
 
 
@@ -259,14 +290,174 @@ class Validator(object):
         self.multi(values, self.security_group_str)
 
 
+def fetch_concurrently(sources):
+    """Call independent data sources on separate green threads.
+
+    :param sources: dict of source name to callable, or to (callable, timeout)
+                    pair to override describe_source_timeout option
+    :returns: dict of source name to the result of its callable
+
+    All sources are waited for before the first failure is re-raised.
+    """
+    def fetch(name, source):
+        if isinstance(source, tuple):
+            source, timeout = source
+        else:
+            timeout = CONF.describe_source_timeout
+        timer = eventlet.Timeout(timeout) if timeout > 0 else None
+        try:
+            return source()
+        except eventlet.Timeout as ex:
+            if ex is not timer:
+                raise
+            raise exception.EC2APIBackendTimeout(source=name)
+        finally:
+            if timer:
+                timer.cancel()
+
+    if len(sources) <= 1:
+        return dict((name, fetch(name, source))
+                    for name, source in sources.items())
+    pool = eventlet.GreenPool(len(sources))
+    threads = dict((name, pool.spawn(fetch, name, source))
+                   for name, source in sources.items())
+    results = {}
+    exc_info = None
+    for name in sorted(threads):
+        try:
+            results[name] = threads[name].wait()
+        except Exception:
+            exc_info = exc_info or sys.exc_info()
+    if exc_info:
+        six.reraise(*exc_info)
+    return results
+
+
 VPC_KINDS = ['vpc', 'igw', 'subnet', 'eni', 'dopt', 'eipalloc', 'sg', 'rtb']
 
 
+def _get_next_token_key():
+    if CONF.next_token_secret:
+        return CONF.next_token_secret
+    # NOTE(ft): a token can be continued by any API worker, so a random key
+    # of a worker can't be used
+    secrets = json.dumps([CONF.database.connection, CONF.admin_password])
+    return hmac.new('ec2api-next-token', secrets, hashlib.sha256).digest()
+
+
+def _sign_next_token(payload):
+    return hmac.new(_get_next_token_key(), payload,
+                    hashlib.sha256).hexdigest()
+
+
+def encode_next_token(context, kind, marker):
+    """Build an opaque token to continue a describe after the marker."""
+    payload = base64.urlsafe_b64encode(
+        json.dumps([kind, context.project_id, marker]))
+    return '%s.%s' % (payload, _sign_next_token(payload))
+
+
+def decode_next_token(context, kind, next_token):
+    """Return the marker of the token issued for the same kind and project.
+
+    Raise InvalidPaginationToken if the token is corrupted or forged.
+    """
+    try:
+        payload, signature = str(next_token).rsplit('.', 1)
+        if not utils.constant_time_compare(signature,
+                                           _sign_next_token(payload)):
+            raise ValueError()
+        token_kind, project_id, marker = json.loads(
+            base64.urlsafe_b64decode(payload))
+    except (ValueError, TypeError, UnicodeError):
+        raise exception.InvalidPaginationToken()
+    if token_kind != kind or project_id != context.project_id:
+        raise exception.InvalidPaginationToken()
+    return marker
+
+
+class ValueMatcher(object):
+    """Matcher of a value to any of filter values.
+
+    Filter values may contain shell-style wildcards. Exact values are looked
+    up in a set, wildcard ones are translated to regular expressions once.
+    """
+
+    def __init__(self, filter_values):
+        self.exact_values = set()
+        self.patterns = []
+        for filter_value in filter_values:
+            filter_value = str(filter_value)
+            if any(c in filter_value for c in '*?['):
+                self.patterns.append(
+                    re.compile(fnmatch.translate(filter_value)).match)
+            else:
+                self.exact_values.add(filter_value)
+
+    def __call__(self, value):
+        value = str(value)
+        return (value in self.exact_values or
+                any(match(value) for match in self.patterns))
+
+
+class TagMatcher(object):
+    """Matcher of a tag set to any of {'key': key, 'value': values} pairs."""
+
+    def __init__(self, filter_values):
+        self.matchers = [(f.get('key'), ValueMatcher(f.get('value')))
+                         for f in filter_values]
+
+    def __call__(self, tag_set):
+        return any(isinstance(tag, dict) and tag.get('key') == key and
+                   match(tag.get('value'))
+                   for key, match in self.matchers
+                   for tag in tag_set)
+
+
+class CompiledFilters(list):
+    """List of (values extractor, value matcher) pairs of filters."""
+
+
+def _compile_extractor(filter_name):
+    """Build a function to get values of a FILTER_MAP path of an item."""
+    if isinstance(filter_name, list):
+        name = filter_name[0]
+        extract_sub_values = _compile_extractor(filter_name[1])
+        return lambda item: [value
+                             for sub_item in item.get(name, [])
+                             for value in extract_sub_values(sub_item)]
+    if isinstance(filter_name, tuple):
+        name, key = filter_name
+
+        def extract(item):
+            value = item.get(name, {}).get(key)
+            return [value] if value is not None else []
+    else:
+        def extract(item):
+            value = item.get(filter_name)
+            return [value] if value is not None else []
+    return extract
+
+
 class UniversalDescriber(object):
     """Abstract Describer class for various Describe implementations."""
 
     KIND = ''
     FILTER_MAP = {}
+    # NOTE(ft): filters which narrow DB or OpenStack queries before they are
+    # evaluated on formatted items. DB_FILTER_MAP maps a filter to an item
+    # column, OS_FILTER_MAP maps a filter to a parameter of the OS list call,
+    # which the describer passes from os_filters. DB filters are declared
+    # for kinds which are not auto created by describes only, because OS
+    # items unknown in DB are skipped by DB filtered describes.
+    DB_FILTER_MAP = {}
+    OS_FILTER_MAP = {}
+    MAX_RESULTS_LIMIT = 1000
+    # NOTE(ft): paginated describes of auto created kinds must add OS items
+    # unknown in DB before paging, otherwise the items are never described.
+    # This is done on the first page only to not list all OS items for every
+    # page. Such describers must implement list_os_items.
+    AUTO_CREATE_ON_PAGING = False
 
     def format(self, item=None, os_item=None):
         pass
@@ -274,12 +465,129 @@ class UniversalDescriber(object):
     def post_format(self, formatted_item, item):
         pass
 
+    def get_sources(self):
+        """Return independent data sources of the describer.
+
+        The result is a dict of describer attribute name to a source for
+        fetch_concurrently. Sources are fetched before get_db_items, their
+        results are set to the attributes.
+        """
+        return {}
+
+    def fetch_sources(self):
+        for name, value in fetch_concurrently(self.get_sources()).items():
+            setattr(self, name, value)
+
     def get_db_items(self):
         return ec2utils.get_db_items(self.context, self.KIND, self.ids)
 
     def get_os_items(self):
         return []
 
+    def get_db_items_page(self, marker, limit):
+        return db_api.get_items_page(self.context, self.KIND,
+                                     marker=marker, limit=limit,
+                                     filters=self.db_filters or None)
+
+    def get_marker(self, item):
+        return item['id']
+
+    def pages_db_items(self):
+        """Check if DB items of the describer are got by get_db_items_page.
+
+        Describers, which override get_db_items only, get their DB items in
+        other way, so their describes are neither paginated nor narrowed by
+        DB filters.
+        """
+        base_get_db_items = six.get_unbound_function(
+            UniversalDescriber.get_db_items)
+        base_get_db_items_page = six.get_unbound_function(
+            UniversalDescriber.get_db_items_page)
+        return (getattr(self.get_db_items, '__func__', None) is
+                base_get_db_items or
+                getattr(self.get_db_items_page, '__func__', None) is not
+                base_get_db_items_page)
+
+    def list_os_items(self):
+        """List all OS items of the project to add unknown ones to DB."""
+        raise NotImplementedError()
+
+    def auto_create_db_items(self):
+        os_items = self.list_os_items()
+        if not os_items:
+            return
+        os_ids = [self.get_id(os_item) for os_item in os_items]
+        known_os_ids = set(os_id for _item_id, os_id in
+                           db_api.get_items_ids(self.context, self.KIND,
+                                                item_os_ids=os_ids))
+        for os_item in os_items:
+            if self.get_id(os_item) not in known_os_ids:
+                self.auto_update_db(None, os_item)
+
+    def get_paged_db_items(self, max_results, next_token):
+        """Get a page of DB items, set next_token if there are more items.
+
+        Items are ordered by DB, so a page starts right after the marker of
+        the previous page regardless of items created or deleted meanwhile.
+        """
+        if max_results is None:
+            max_results = self.MAX_RESULTS_LIMIT
+        elif not 5 <= max_results <= self.MAX_RESULTS_LIMIT:
+            raise exception.InvalidParameterValue(
+                value=max_results, parameter='MaxResults',
+                reason=_('The value must be between 5 and %s.') %
+                self.MAX_RESULTS_LIMIT)
+        marker = (decode_next_token(self.context, self.KIND, next_token)
+                  if next_token else None)
+        # NOTE(ft): get one extra item to know if there is the next page
+        items = self.get_db_items_page(marker, max_results + 1)
+        if len(items) > max_results:
+            items = items[:max_results]
+            self.next_token = encode_next_token(
+                self.context, self.KIND, self.get_marker(items[-1]))
+        return items
+
+    def plan_filters(self, filters):
+        """Push filters down to DB and OS queries where it is possible.
+
+        Exact and wildcard values go to DB, exact values only go to OS
+        queries. Values with character sets ('[...]') and repeated filters
+        are not pushed down. Filters are not pushed down for selective
+        describes, otherwise not matched items would be reported as not
+        found.
+        Return filters to be evaluated on formatted items. Pushed down
+        filters are evaluated again, because DB and OS queries can compare
+        values case-insensitively (e.g. with MySQL *_ci collations).
+        """
+        self.db_filters = {}
+        self.os_filters = {}
+        if (not filters or self.selective_describe or
+                not self.pages_db_items()):
+            return filters
+        for f in filters:
+            values = f.get('value')
+            if (not values or
+                    not all(isinstance(v, six.string_types) for v in values)):
+                continue
+            column = self.DB_FILTER_MAP.get(f['name'])
+            os_param = self.OS_FILTER_MAP.get(f['name'])
+            if (column and column not in self.db_filters and
+                    not any('[' in v for v in values)):
+                self.db_filters[column] = values
+            elif (os_param and os_param not in self.os_filters and
+                    not any(c in v for v in values for c in '*?[')):
+                self.os_filters[os_param] = values
+        return filters
+
+    def is_lightweight_describe(self):
+        """Check if a few items are requested by ids only.
+
+        Describers may fetch only related OS objects in this case instead of
+        listing all objects of the project.
+        """
+        return (bool(self.ids) and not self.names and
+                len(self.ids) <= CONF.lightweight_describe_limit)
+
     def auto_update_db(self, item, os_item):
         if item is None and self.KIND not in VPC_KINDS:
             item = ec2utils.auto_create_db_item(self.context, self.KIND,
@@ -295,53 +603,73 @@ class UniversalDescriber(object):
     def delete_obsolete_item(self, item):
         db_api.delete_item(self.context, item['id'])
 
-    def is_filtering_value_found(self, filter_value, value):
-        if fnmatch.fnmatch(str(value), str(filter_value)):
-            return True
+    def compile_value_matcher(self, filter_values):
+        return ValueMatcher(filter_values)
 
-    def filtered_out(self, item, filters):
+    def compile_filters(self, filters):
+        """Compile filters once to check many formatted items.
+
+        Filter names are resolved to value extractors and filter values to
+        matchers before the first item is checked.
+        """
         if filters is None:
-            return False
+            return None
+        compiled_filters = CompiledFilters()
         for filter in filters:
             filter_name = self.FILTER_MAP.get(filter['name'])
             if filter_name is None:
                 raise exception.InvalidParameterValue(
                     value=filter['name'], parameter='filter',
                     reason='invalid filter')
-            values = self.get_values_by_filter(filter_name, item)
-            if not values:
-                return True
-            filter_values = filter['value']
-            for filter_value in filter_values:
-                if any(self.is_filtering_value_found(filter_value, value)
-                       for value in values):
-                    break
-            else:
+            compiled_filters.append(
+                (_compile_extractor(filter_name),
+                 self.compile_value_matcher(filter['value'])))
+        return compiled_filters
+
+    def filtered_out(self, item, filters):
+        if filters is None:
+            return False
+        if not isinstance(filters, CompiledFilters):
+            filters = self.compile_filters(filters)
+        for extract, match in filters:
+            if not any(match(value) for value in extract(item)):
                 return True
         return False
 
-    def get_values_by_filter(self, filter_name, item):
-        if isinstance(filter_name, list):
-            values = []
-            value_set = item.get(filter_name[0], [])
-            for value in value_set:
-                vals = self.get_values_by_filter(filter_name[1], value)
-                if vals:
-                    values += vals
-        else:
-            if isinstance(filter_name, tuple):
-                value = item.get(filter_name[0], {}).get(filter_name[1])
-            else:
-                value = item.get(filter_name)
-            values = [value] if value is not None else []
-        return values
-
-    def describe(self, context, ids=None, names=None, filter=None):
+    def describe(self, context, ids=None, names=None, filter=None,
+                 max_results=None, next_token=None):
         self.context = context
         self.selective_describe = ids is not None or names is not None
         self.ids = set(ids or [])
         self.names = set(names or [])
-        self.items = self.get_db_items()
+        self.next_token = None
+        paginated = max_results is not None or next_token is not None
+        if paginated and self.selective_describe:
+            raise exception.InvalidParameterCombination(
+                _('MaxResults and NextToken cannot be used with item '
+                  'ids or names.'))
+        paginated = paginated and self.pages_db_items()
+        filter = self.compile_filters(self.plan_filters(filter))
+        narrowed = paginated or bool(self.db_filters)
+        if narrowed:
+            # NOTE(ft): describe the page or the DB filtered items as
+            # requested by ids, but don't report obsolete items as not found.
+            if (paginated and next_token is None and
+                    self.AUTO_CREATE_ON_PAGING):
+                self.auto_create_db_items()
+            page = (self.get_paged_db_items(max_results, next_token)
+                    if paginated else
+                    self.get_db_items_page(None, None))
+            if not page:
+                # NOTE(ft): don't list OS items to describe nothing
+                return []
+            self.selective_describe = True
+            self.ids = set(item['id'] for item in page)
+            self.fetch_sources()
+            self.items = page
+        else:
+            self.fetch_sources()
+            self.items = self.get_db_items()
         self.os_items = self.get_os_items()
         formatted_items = []
 
@@ -377,7 +705,7 @@ class UniversalDescriber(object):
         #     if item['id'] not in paired_items_ids:
         #         self.delete_obsolete_item(item)
         # NOTE(Alex): some requested items are not found
-        if self.ids or self.names:
+        if not narrowed and (self.ids or self.names):
             params = {'id': next(iter(self.ids or self.names))}
             raise ec2utils.NOT_FOUND_EXCEPTION_MAP[self.KIND](**params)
         return formatted_items
@@ -396,15 +724,23 @@ class TaggableItemsDescriber(UniversalDescriber):
     def get_tags(self):
         return db_api.get_tags(self.context, (self.KIND,), self.ids)
 
+    def get_sources(self):
+        sources = super(TaggableItemsDescriber, self).get_sources()
+        sources['tags'] = self._get_indexed_tags
+        return sources
+
+    def _get_indexed_tags(self):
+        tags = collections.defaultdict(list)
+        for tag in self.get_tags():
+            tags[tag['item_id']].append(tag)
+        return tags
+
     def post_format(self, formatted_item, item):
         if not item or not formatted_item:
             return
 
         if self.tags is None:
-            tags = collections.defaultdict(list)
-            for tag in self.get_tags():
-                tags[tag['item_id']].append(tag)
-            self.tags = tags
+            self.tags = self._get_indexed_tags()
 
         formatted_tags = []
         for tag in self.tags[item['id']]:
@@ -415,7 +751,8 @@ class TaggableItemsDescriber(UniversalDescriber):
             # errors in AWS docs)
             formatted_item['tagSet'] = formatted_tags
 
-    def describe(self, context, ids=None, names=None, filter=None):
+    def describe(self, context, ids=None, names=None, filter=None,
+                 max_results=None, next_token=None):
         if filter:
             for f in filter:
                 if f['name'].startswith('tag:'):
@@ -425,32 +762,87 @@ class TaggableItemsDescriber(UniversalDescriber):
                     f['value'] = [{'key': tag_key,
                                    'value': tag_values}]
         return super(TaggableItemsDescriber, self).describe(
-            context, ids, names, filter)
-
-    def is_filtering_value_found(self, filter_value, value):
-        if isinstance(filter_value, dict):
-            for tag_pair in value:
-                if (not isinstance(tag_pair, dict) or
-                        filter_value.get('key') != tag_pair.get('key')):
-                    continue
-                for filter_dict_value in filter_value.get('value'):
-                    if super(TaggableItemsDescriber,
-                             self).is_filtering_value_found(
-                                filter_dict_value,
-                                tag_pair.get('value')):
-                        return True
-            return False
+            context, ids, names, filter, max_results=max_results,
+            next_token=next_token)
+
+    def plan_filters(self, filters):
+        filters = super(TaggableItemsDescriber, self).plan_filters(filters)
+        # NOTE(ft): tag filters are resolved to item ids in DB
+        if (not filters or self.selective_describe or
+                not self.pages_db_items()):
+            return filters
+        tag_filters = [tag_filter for tag_filter in
+                       (_get_db_tag_filter(f) for f in filters)
+                       if tag_filter is not None]
+        if tag_filters:
+            tagged_ids = db_api.get_item_ids_by_tags(
+                self.context, (self.KIND,), tag_filters)
+            id_patterns = self.db_filters.get('id')
+            if id_patterns:
+                tagged_ids = [item_id for item_id in tagged_ids
+                              if any(fnmatch.fnmatchcase(item_id, pattern)
+                                     for pattern in id_patterns)]
+            self.db_filters['id'] = sorted(tagged_ids)
+        return filters
+
+    def compile_value_matcher(self, filter_values):
+        if any(isinstance(v, dict) for v in filter_values):
+            return TagMatcher(filter_values)
         return super(TaggableItemsDescriber,
-                     self).is_filtering_value_found(filter_value, value)
+                     self).compile_value_matcher(filter_values)
+
+
+def _get_db_tag_filter(filter):
+    """Convert a tag filter to a tag filter of get_item_ids_by_tags.
+
+    Return None if the filter is not a tag filter or can't be evaluated in
+    DB exactly.
+    """
+    values = filter.get('value')
+    if not values:
+        return None
+    if filter['name'] == 'tag':
+        if len(values) != 1 or not isinstance(values[0], dict):
+            return None
+        key = values[0].get('key')
+        values = values[0].get('value')
+        # NOTE(ft): a tag key of 'tag:key' filters is compared exactly
+        if (not isinstance(key, six.string_types) or
+                any(c in key for c in '*?[') or not values):
+            return None
+        tag_filter = {'key': [key], 'value': values}
+    elif filter['name'] == 'tag-key':
+        tag_filter = {'key': values}
+    elif filter['name'] == 'tag-value':
+        tag_filter = {'value': values}
+    else:
+        return None
+    if not all(isinstance(v, six.string_types) and '[' not in v
+               for v in values):
+        return None
+    return tag_filter
 
 
 class NonOpenstackItemsDescriber(UniversalDescriber):
     """Describer class for non-Openstack items Describe implementations."""
 
-    def describe(self, context, ids=None, names=None, filter=None):
+    def describe(self, context, ids=None, names=None, filter=None,
+                 max_results=None, next_token=None):
         self.context = context
         self.ids = ids
-        self.items = self.get_db_items()
+        self.selective_describe = ids is not None
+        self.next_token = None
+        filter = self.compile_filters(self.plan_filters(filter))
+        if ((max_results is not None or next_token is not None) and
+                self.pages_db_items()):
+            self.items = self.get_paged_db_items(max_results, next_token)
+            self.fetch_sources()
+        elif self.db_filters:
+            self.items = self.get_db_items_page(None, None)
+            self.fetch_sources()
+        else:
+            self.fetch_sources()
+            self.items = self.get_db_items()
         formatted_items = []
 
         for item in self.items:
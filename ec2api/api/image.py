@@ -292,15 +292,23 @@ class ImageDescriber(common.TaggableItemsDescriber):
             if len(images_ids) < len(self.ids):
                 missed_ids = self.ids - images_ids
                 raise exception.InvalidAMIIDNotFound(id=next(iter(missed_ids)))
-        self.snapshot_ids = dict(
-            (s['os_id'], s['id'])
-            for s in db_api.get_items(self.context, 'snap'))
         self.local_images_os_ids = set(i['os_id'] for i in local_images)
         self.ids_dict = {}
         return images
 
+    def get_sources(self):
+        sources = super(ImageDescriber, self).get_sources()
+        sources.update({
+            'snapshot_ids': lambda: dict(
+                (s['os_id'], s['id'])
+                for s in db_api.get_items(self.context, 'snap')),
+            'os_images': lambda: list(
+                clients.glance(self.context).images.list()),
+        })
+        return sources
+
     def get_os_items(self):
-        return clients.glance(self.context).images.list()
+        return self.os_images
 
     def auto_update_db(self, image, os_image):
         if not image:
@@ -24,6 +24,7 @@ from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import timeutils
 
+from ec2api.api import catalog_cache
 from ec2api.api import clients
 from ec2api.api import common
 from ec2api.api import ec2utils
@@ -108,14 +109,9 @@ def run_instances(context, image_id, min_count, max_count,
             context, image_id, kernel_id, ramdisk_id)
 
     nova = clients.nova(context)
-    try:
-        if instance_type is None:
-            instance_type = CONF.default_flavor
-        os_flavor = next(f for f in nova.flavors.list()
-                         if f.name == instance_type)
-    except StopIteration:
-        raise exception.InvalidParameterValue(value=instance_type,
-                                              parameter='InstanceType')
+    if instance_type is None:
+        instance_type = CONF.default_flavor
+    os_flavor = _get_os_flavor_by_name(context, instance_type)
 
     bdm = _parse_block_device_mapping(context, block_device_mapping)
     availability_zone = (placement or {}).get('availability_zone')
@@ -212,6 +208,7 @@ def terminate_instances(context, instance_id):
 class InstanceDescriber(common.TaggableItemsDescriber):
 
     KIND = 'i'
+    AUTO_CREATE_ON_PAGING = True
     FILTER_MAP = {
         'availability-zone': ('placement', 'availabilityZone'),
         'block-device-mapping.delete-on-termination': [
@@ -296,6 +293,7 @@ class InstanceDescriber(common.TaggableItemsDescriber):
         self.reservation_instances = collections.defaultdict(list)
         self.reservation_os_groups = {}
         self.obsolete_instances = []
+        self.listed_os_instances = None
 
     def format(self, instance, os_instance):
         formatted_instance = _format_instance(
@@ -320,32 +318,69 @@ class InstanceDescriber(common.TaggableItemsDescriber):
 
         return formatted_instance
 
-    def get_db_items(self):
-        instances = super(InstanceDescriber, self).get_db_items()
-        self.ec2_network_interfaces = (
-            instance_engine.get_ec2_network_interfaces(
-                self.context, self.ids))
-        self.volumes = {v['os_id']: v
-                        for v in db_api.get_items(self.context, 'vol')}
-        self.image_ids = {i['os_id']: i['id']
-                          for i in itertools.chain(
-                              db_api.get_items(self.context, 'ami'),
-                              db_api.get_public_items(self.context, 'ami'))}
-        return instances
+    def get_sources(self):
+        sources = super(InstanceDescriber, self).get_sources()
+        sources.update({
+            'ec2_network_interfaces': lambda: (
+                instance_engine.get_ec2_network_interfaces(
+                    self.context, self.ids)),
+            'os_flavors': lambda: _get_os_flavors(self.context),
+        })
+        if self.is_lightweight_describe():
+            # NOTE(ft): images are looked up in DB one by one on formatting,
+            # volumes are got for found instances only
+            sources['image_ids'] = lambda: {}
+        else:
+            sources.update({
+                'volumes': lambda: {
+                    v['os_id']: v
+                    for v in db_api.get_items(self.context, 'vol')},
+                'image_ids': lambda: {
+                    i['os_id']: i['id']
+                    for i in itertools.chain(
+                        db_api.get_items(self.context, 'ami'),
+                        db_api.get_public_items(self.context, 'ami'))},
+                'os_volumes': lambda: _get_os_volumes(self.context),
+            })
+        return sources
+
+    def list_os_items(self):
+        if self.listed_os_instances is None:
+            self.listed_os_instances = ec2_context.call_with_os_admin_reauth(
+                self._list_os_instances)
+        return self.listed_os_instances
+
+    def _list_os_instances(self):
+        nova = clients.nova(ec2_context.get_os_admin_context())
+        return nova.servers.list(
+            search_opts={'all_tenants': True,
+                         'project_id': self.context.project_id})
 
     def get_os_items(self):
-        self.os_volumes = _get_os_volumes(self.context)
-        self.os_flavors = _get_os_flavors(self.context)
-        nova = clients.nova(ec2_context.get_os_admin_context())
-        if self.ids == 1 and len(self.items) == 1:
+        if not self.is_lightweight_describe():
+            return self.list_os_items()
+
+        os_instances = []
+        for instance in self.items:
             try:
-                return [nova.servers.get(self.items[0]['os_id'])]
+                os_instances.append(
+                    _get_os_instance_as_admin(instance['os_id']))
             except nova_exception.NotFound:
-                return []
-        else:
-            return nova.servers.list(
-                search_opts={'all_tenants': True,
-                             'project_id': self.context.project_id})
+                pass
+        self.os_volumes = _get_instances_os_volumes(self.context,
+                                                    os_instances)
+        os_volume_ids = [os_volume.id
+                         for os_volume in itertools.chain(
+                             *self.os_volumes.itervalues())]
+        volume_ids = [volume_id for volume_id, _os_id in (
+            db_api.get_items_ids(self.context, 'vol',
+                                 item_os_ids=os_volume_ids)
+            if os_volume_ids else [])]
+        self.volumes = {
+            v['os_id']: v
+            for v in (db_api.get_items_by_ids(self.context, volume_ids)
+                      if volume_ids else [])}
+        return os_instances
 
     def auto_update_db(self, instance, os_instance):
         if not instance:
@@ -382,7 +417,8 @@ class ReservationDescriber(common.NonOpenstackItemsDescriber):
     def get_db_items(self):
         return self.reservations
 
-    def describe(self, context, ids=None, names=None, filter=None):
+    def describe(self, context, ids=None, names=None, filter=None,
+                 max_results=None, next_token=None):
         reservation_filters = []
         instance_filters = []
         for f in filter or []:
@@ -400,7 +436,8 @@ class ReservationDescriber(common.NonOpenstackItemsDescriber):
         try:
             instance_describer = InstanceDescriber()
             formatted_instances = instance_describer.describe(
-                    context, ids=ids, filter=instance_filters)
+                    context, ids=ids, filter=instance_filters,
+                    max_results=max_results, next_token=next_token)
         except exception.InvalidInstanceIDNotFound:
             _remove_instances(context, instance_describer.obsolete_instances)
             raise
@@ -413,15 +450,22 @@ class ReservationDescriber(common.NonOpenstackItemsDescriber):
         self.suitable_instances = set(i['instanceId']
                                       for i in formatted_instances)
 
-        return super(ReservationDescriber, self).describe(
+        formatted_reservations = super(ReservationDescriber, self).describe(
                 context, filter=reservation_filters)
+        self.next_token = instance_describer.next_token
+        return formatted_reservations
 
 
 def describe_instances(context, instance_id=None, filter=None,
                        max_results=None, next_token=None):
-    formatted_reservations = ReservationDescriber().describe(
-            context, ids=instance_id, filter=filter)
-    return {'reservationSet': formatted_reservations}
+    reservation_describer = ReservationDescriber()
+    formatted_reservations = reservation_describer.describe(
+            context, ids=instance_id, filter=filter,
+            max_results=max_results, next_token=next_token)
+    result = {'reservationSet': formatted_reservations}
+    if reservation_describer.next_token:
+        result['nextToken'] = reservation_describer.next_token
+    return result
 
 
 def reboot_instances(context, instance_id):
@@ -473,8 +517,7 @@ def get_console_output(context, instance_id):
 
 def describe_instance_attribute(context, instance_id, attribute):
     instance = ec2utils.get_db_item(context, instance_id)
-    nova = clients.nova(ec2_context.get_os_admin_context())
-    os_instance = nova.servers.get(instance['os_id'])
+    os_instance = _get_os_instance_as_admin(instance['os_id'])
 
     def _format_attr_block_device_mapping(result):
         # TODO(ft): next call add 'rootDeviceType' to result,
@@ -778,8 +821,28 @@ def _get_os_instances_by_instances(context, instances, exactly=False,
     return os_instances
 
 
+def _get_os_flavor_list(context):
+    return catalog_cache.flavors.get(
+        context.project_id, lambda: clients.nova(context).flavors.list())
+
+
+def _get_os_flavor_by_name(context, name):
+    os_flavor = next((f for f in _get_os_flavor_list(context)
+                      if f.name == name), None)
+    if os_flavor is None:
+        # NOTE(ft): the flavor can be created after the list was cached
+        catalog_cache.flavors.invalidate(context.project_id)
+        os_flavor = next((f for f in _get_os_flavor_list(context)
+                          if f.name == name), None)
+    if os_flavor is None:
+        raise exception.InvalidParameterValue(value=name,
+                                              parameter='InstanceType',
+                                              reason=_('Unknown flavor'))
+    return os_flavor
+
+
 def _get_os_flavors(context):
-    os_flavors = clients.nova(context).flavors.list()
+    os_flavors = _get_os_flavor_list(context)
     return dict((f.id, f.name) for f in os_flavors)
 
 
@@ -797,9 +860,32 @@ def _get_os_volumes(context):
     return os_volumes
 
 
+def _get_instances_os_volumes(context, os_instances):
+    if any(not hasattr(os_instance, 'os-extended-volumes:volumes_attached')
+           for os_instance in os_instances):
+        return _get_os_volumes(context)
+    os_volumes = collections.defaultdict(list)
+    cinder = clients.cinder(context)
+    for os_instance in os_instances:
+        for volume_attached in getattr(
+                os_instance, 'os-extended-volumes:volumes_attached'):
+            os_volume = cinder.volumes.get(volume_attached['id'])
+            os_attachment = next(iter(os_volume.attachments), {})
+            if os_attachment.get('server_id') == os_instance.id:
+                os_volumes[os_instance.id].append(os_volume)
+    return os_volumes
+
+
+def _get_os_instance_as_admin(os_instance_id):
+    def get_os_instance():
+        nova = clients.nova(ec2_context.get_os_admin_context())
+        return nova.servers.get(os_instance_id)
+
+    return ec2_context.call_with_os_admin_reauth(get_os_instance)
+
+
 def _is_ebs_instance(context, os_instance_id):
-    nova = clients.nova(ec2_context.get_os_admin_context())
-    os_instance = nova.servers.get(os_instance_id)
+    os_instance = _get_os_instance_as_admin(os_instance_id)
     root_device_name = getattr(os_instance,
                                'OS-EXT-SRV-ATTR:root_device_name', None)
     if not root_device_name:
@@ -882,6 +968,26 @@ class InstanceEngineNeutron(object):
                 context, data['network_interface'])
 
     def get_ec2_network_interfaces(self, context, instance_ids=None):
+        if (instance_ids and
+                len(instance_ids) <= CONF.lightweight_describe_limit):
+            # NOTE(ft): network interfaces of a few instances are got by
+            # their instance_id index in DB. If one of them is obsolete,
+            # all network interfaces are described (see point 1 below).
+            network_interface_ids = [
+                eni['id']
+                for instance_id in instance_ids
+                for eni in db_api.get_items_by_instance_id(
+                    context, 'eni', instance_id)]
+            if not network_interface_ids:
+                return {}
+            try:
+                enis = network_interface_api.describe_network_interfaces(
+                    context, network_interface_id=network_interface_ids)
+                return self._group_ec2_network_interfaces(
+                    enis['networkInterfaceSet'], instance_ids)
+            except exception.InvalidNetworkInterfaceIDNotFound:
+                pass
+
         # NOTE(ft): we would be glad to use filters with this describe
         # operation, but:
         # 1. A selective filter by network interface IDs is improper because
@@ -894,6 +1000,9 @@ class InstanceEngineNeutron(object):
         # lead to decrease DB and OS throughtput in called describe operation.
         enis = network_interface_api.describe_network_interfaces(
                 context)['networkInterfaceSet']
+        return self._group_ec2_network_interfaces(enis, instance_ids)
+
+    def _group_ec2_network_interfaces(self, enis, instance_ids):
         ec2_network_interfaces = collections.defaultdict(list)
         for eni in enis:
             if (eni['status'] == 'in-use' and
@@ -1129,8 +1238,7 @@ instance_engine = get_instance_engine()
 
 def _auto_create_instance_extension(context, instance, os_instance=None):
     if not os_instance:
-        nova = clients.nova(ec2_context.get_os_admin_context())
-        os_instance = nova.servers.get(instance['os_id'])
+        os_instance = _get_os_instance_as_admin(instance['os_id'])
     if hasattr(os_instance, 'OS-EXT-SRV-ATTR:reservation_id'):
         instance['reservation_id'] = getattr(os_instance,
                                              'OS-EXT-SRV-ATTR:reservation_id')
@@ -1201,7 +1309,12 @@ def _cloud_format_ramdisk_id(context, os_instance, image_ids=None):
 
 
 def _cloud_format_instance_type(context, os_instance):
-    return clients.nova(context).flavors.get(os_instance.flavor['id']).name
+    flavor_name = _get_os_flavors(context).get(os_instance.flavor['id'])
+    if flavor_name is None:
+        # NOTE(ft): a private flavor of another project is not listed
+        flavor_name = clients.nova(context).flavors.get(
+            os_instance.flavor['id']).name
+    return flavor_name
 
 
 def _cloud_state_description(vm_state):
@@ -218,6 +218,10 @@ class NetworkInterfaceDescriber(common.TaggableItemsDescriber):
                   'status': 'status',
                   'vpc-id': 'vpcId',
                   'subnet-id': 'subnetId'}
+    DB_FILTER_MAP = {'attachment.instance-id': 'instance_id',
+                     'network-interface-id': 'id',
+                     'vpc-id': 'vpc_id'}
+    OS_FILTER_MAP = {'mac-address': 'mac_address'}
 
     def format(self, network_interface, os_port):
         if not network_interface:
@@ -227,17 +231,55 @@ class NetworkInterfaceDescriber(common.TaggableItemsDescriber):
                 self.ec2_addresses[network_interface['id']],
                 self.security_groups)
 
-    def get_os_items(self):
-        addresses = address_api.describe_addresses(self.context)
-        self.ec2_addresses = collections.defaultdict(list)
+    def get_sources(self):
+        sources = super(NetworkInterfaceDescriber, self).get_sources()
+        neutron = clients.neutron(self.context)
+        sources.update({
+            'ec2_addresses': self._get_ec2_addresses,
+            'security_groups': lambda: (
+                security_group_api._format_security_groups_ids_names(
+                    self.context)),
+        })
+        if not self.is_lightweight_describe():
+            sources['os_ports'] = lambda: neutron.list_ports(
+                tenant_id=self.context.project_id,
+                **self.os_filters)['ports']
+        return sources
+
+    def _get_ec2_addresses(self):
+        ec2_addresses = collections.defaultdict(list)
+        addresses = None
+        if self.is_lightweight_describe():
+            # NOTE(ft): describe only addresses associated with requested
+            # network interfaces. If one of them is obsolete, describe all
+            # addresses to not fail this describe.
+            allocation_ids = [
+                address['id']
+                for address in db_api.get_items(self.context, 'eipalloc')
+                if address.get('network_interface_id') in self.ids]
+            if not allocation_ids:
+                return ec2_addresses
+            try:
+                addresses = address_api.describe_addresses(
+                    self.context, allocation_id=allocation_ids)
+            except exception.InvalidAllocationIDNotFound:
+                pass
+        if addresses is None:
+            addresses = address_api.describe_addresses(self.context)
         for address in addresses['addressesSet']:
             if 'networkInterfaceId' in address:
-                self.ec2_addresses[
-                        address['networkInterfaceId']].append(address)
-        self.security_groups = (
-            security_group_api._format_security_groups_ids_names(self.context))
+                ec2_addresses[address['networkInterfaceId']].append(address)
+        return ec2_addresses
+
+    def get_os_items(self):
+        if not self.is_lightweight_describe():
+            return self.os_ports
+        os_ids = [i['os_id'] for i in self.items]
+        if not os_ids:
+            return []
         neutron = clients.neutron(self.context)
-        return neutron.list_ports(tenant_id=self.context.project_id)['ports']
+        return neutron.list_ports(tenant_id=self.context.project_id,
+                                  id=os_ids, **self.os_filters)['ports']
 
     def get_name(self, os_item):
         return ''
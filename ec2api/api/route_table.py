@@ -14,9 +14,12 @@
 
 import collections
 import copy
+import sys
 
+import eventlet
 import netaddr
-from novaclient import exceptions as nova_exception
+from oslo_config import cfg
+import six
 
 from ec2api.api import clients
 from ec2api.api import common
@@ -26,6 +29,17 @@ from ec2api import exception
 from ec2api.i18n import _
 
 
+route_table_opts = [
+    cfg.IntOpt('subnet_routes_update_concurrency',
+               default=10,
+               help='Number of concurrent Neutron subnet updates on '
+                    'propagation of routes of a route table.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(route_table_opts)
+
+
 Validator = common.Validator
 
 
@@ -226,24 +240,80 @@ class RouteTableDescriber(common.TaggableItemsDescriber,
             is_main=(self.vpcs[route_table['vpc_id']]['route_table_id'] ==
                      route_table['id']),
             gateways=self.gateways,
-            network_interfaces=self.network_interfaces)
-
-    def get_db_items(self):
+            network_interfaces=self.network_interfaces,
+            instance_statuses=self.instance_statuses)
+
+    def get_sources(self):
+        sources = super(RouteTableDescriber, self).get_sources()
+        sources.update({
+            'associations': self._get_associations,
+            'vpcs': lambda: {
+                vpc['id']: vpc
+                for vpc in db_api.get_items(self.context, 'vpc')},
+            'gateways': lambda: {
+                igw['id']: igw
+                for igw in db_api.get_items(self.context, 'igw')},
+            # TODO(ft): scan route tables to get only used network interfaces
+            # to reduce DB throughput
+            'network_interfaces': lambda: {
+                eni['id']: eni
+                for eni in db_api.get_items(self.context, 'eni')},
+        })
+        return sources
+
+    def _get_associations(self):
         associations = collections.defaultdict(list)
         for subnet in db_api.get_items(self.context, 'subnet'):
             if 'route_table_id' in subnet:
                 associations[subnet['route_table_id']].append(subnet['id'])
-        self.associations = associations
-        vpcs = db_api.get_items(self.context, 'vpc')
-        self.vpcs = {vpc['id']: vpc for vpc in vpcs}
-        gateways = db_api.get_items(self.context, 'igw')
-        self.gateways = {igw['id']: igw for igw in gateways}
-        # TODO(ft): scan route tables to get only used instances and
-        # network interfaces to reduce DB and Nova throughput
-        network_interfaces = db_api.get_items(self.context, 'eni')
-        self.network_interfaces = {eni['id']: eni
-                                   for eni in network_interfaces}
-        return super(RouteTableDescriber, self).get_db_items()
+        return associations
+
+    def get_db_items(self):
+        route_tables = super(RouteTableDescriber, self).get_db_items()
+        self.instance_statuses = self._get_instance_statuses(route_tables)
+        return route_tables
+
+    def _get_instance_statuses(self, route_tables):
+        instance_ids = set()
+        for route_table in route_tables:
+            for route in route_table['routes']:
+                network_interface = self.network_interfaces.get(
+                    route.get('network_interface_id'))
+                if network_interface and 'instance_id' in network_interface:
+                    instance_ids.add(network_interface['instance_id'])
+        if not instance_ids:
+            return {}
+        instances = db_api.get_items_by_ids(self.context, instance_ids)
+        if not instances:
+            return {}
+        # NOTE(ft): a list call per page costs less than a get call per
+        # route, pages are listed until all the instances are found
+        os_ids = set(instance['os_id'] for instance in instances)
+        os_statuses = {}
+        for os_instance in _iter_os_instances(clients.nova(self.context)):
+            if os_instance.id in os_ids:
+                os_statuses[os_instance.id] = os_instance.status
+                if len(os_statuses) == len(os_ids):
+                    break
+        return dict((instance['id'], os_statuses[instance['os_id']])
+                    for instance in instances
+                    if instance['os_id'] in os_statuses)
+
+
+def _iter_os_instances(nova):
+    """Iterate Nova instances of the project page by page.
+
+    Nova returns not more than osapi_max_limit instances per list call, and
+    novaclient before 2.24 doesn't request next pages itself.
+    """
+    marker = None
+    while True:
+        os_instances = nova.servers.list(marker=marker)
+        if not os_instances:
+            return
+        for os_instance in os_instances:
+            yield os_instance
+        marker = os_instances[-1].id
 
 
 def describe_route_tables(context, route_table_id=None, filter=None):
@@ -336,9 +406,8 @@ def _set_route(context, route_table_id, destination_cidr_block,
             raise exception.InvalidParameterValue(msg)
         route = {'network_interface_id': network_interface['id']}
     elif instance_id:
-        # TODO(ft): implement search in DB layer
-        network_interfaces = [eni for eni in db_api.get_items(context, 'eni')
-                              if eni.get('instance_id') == instance_id]
+        network_interfaces = db_api.get_items_by_instance_id(
+            context, 'eni', instance_id)
         if len(network_interfaces) == 0:
             msg = _("Invalid value '%(i_id)s' for instance ID. "
                     "Instance is not in a VPC.")
@@ -386,7 +455,8 @@ def _set_route(context, route_table_id, destination_cidr_block,
 def _format_route_table(context, route_table, is_main=False,
                         associated_subnet_ids=[],
                         gateways={},
-                        network_interfaces={}):
+                        network_interfaces={},
+                        instance_statuses={}):
     vpc_id = route_table['vpc_id']
     ec2_route_table = {'routeTableId': route_table['id'],
                        'vpcId': vpc_id,
@@ -394,8 +464,6 @@ def _format_route_table(context, route_table, is_main=False,
                        # NOTE(ft): AWS returns empty tag set for a route table
                        # if no tag exists
                        #'tagSet': []}
-    # TODO(ft): refactor to get Nova instances outside of this function
-    nova = clients.nova(context)
     for route in route_table['routes']:
         origin = ('CreateRouteTable'
                   if route.get('gateway_id', 0) is None else
@@ -423,14 +491,8 @@ def _format_route_table(context, route_table, is_main=False,
                            None)
             state = 'blackhole'
             if instance_id:
-                instance = db_api.get_item_by_id(context, instance_id)
-                if instance:
-                    try:
-                        os_instance = nova.servers.get(instance['os_id'])
-                        if os_instance and os_instance.status == 'ACTIVE':
-                            state = 'active'
-                    except nova_exception.NotFound:
-                        pass
+                if instance_statuses.get(instance_id) == 'ACTIVE':
+                    state = 'active'
                 ec2_route.update({'instanceId': instance_id,
                                   'instanceOwnerId': context.project_id})
             ec2_route.update({'networkInterfaceId': network_interface_id})
@@ -467,31 +529,74 @@ def _update_routes_in_associated_subnets(context, route_table, cleaner,
         appropriate_rtb_ids = (route_table['id'], None)
     else:
         appropriate_rtb_ids = (route_table['id'],)
+    subnets = [subnet for subnet in db_api.get_items(context, 'subnet')
+               if (subnet['vpc_id'] == route_table['vpc_id'] and
+                   subnet.get('route_table_id') in appropriate_rtb_ids)]
+    if not subnets:
+        return
     router_objects = _get_router_objects(context, route_table)
     neutron = clients.neutron(context)
-    for subnet in db_api.get_items(context, 'subnet'):
-        if (subnet['vpc_id'] == route_table['vpc_id'] and
-                subnet.get('route_table_id') in appropriate_rtb_ids):
-            _update_subnet_host_routes(
-                context, subnet, route_table, cleaner=cleaner,
-                rollback_route_table_object=rollabck_route_table_object,
-                router_objects=router_objects, neutron=neutron)
+    os_subnets = neutron.list_subnets(
+        id=[subnet['os_id'] for subnet in subnets])['subnets']
+    os_subnets = dict((os_subnet['id'], os_subnet)
+                      for os_subnet in os_subnets)
+    # NOTE(ft): host routes depend on a subnet by its gateway address only
+    host_routes_by_gateway = {}
+    updates = []
+    for subnet in subnets:
+        os_subnet = os_subnets.get(subnet['os_id'])
+        host_routes = None
+        if os_subnet:
+            gateway_ip = _get_subnet_gateway_ip(os_subnet)
+            if gateway_ip not in host_routes_by_gateway:
+                host_routes_by_gateway[gateway_ip] = _get_subnet_host_routes(
+                    context, route_table, gateway_ip, router_objects)
+            host_routes = host_routes_by_gateway[gateway_ip]
+        updates.append((subnet, os_subnet, host_routes))
+
+    pool = eventlet.GreenPool(max(CONF.subnet_routes_update_concurrency, 1))
+    threads = [pool.spawn(_update_subnet_host_routes,
+                          context, update_subnet, route_table,
+                          cleaner=cleaner,
+                          rollback_route_table_object=(
+                              rollabck_route_table_object),
+                          router_objects=router_objects, neutron=neutron,
+                          os_subnet=update_os_subnet,
+                          host_routes=update_host_routes)
+               for update_subnet, update_os_subnet, update_host_routes
+               in updates]
+    # NOTE(ft): wait for all updates before raising a failure to have
+    # rollbacks of all successful updates registered in the cleaner
+    exc_info = None
+    for thread in threads:
+        try:
+            thread.wait()
+        except Exception:
+            exc_info = exc_info or sys.exc_info()
+    if exc_info:
+        six.reraise(*exc_info)
 
 
 def _update_subnet_host_routes(context, subnet, route_table, cleaner=None,
                                rollback_route_table_object=None,
                                router_objects=None, neutron=None,
-                               vpc_route_revert=False, add_vpc_route=True):
+                               vpc_route_revert=False, add_vpc_route=True,
+                               os_subnet=None, host_routes=None):
     neutron = neutron or clients.neutron(context)
-    os_subnet = neutron.show_subnet(subnet['os_id'])['subnet']
-    gateway_ip = str(netaddr.IPAddress(
-        netaddr.IPNetwork(os_subnet['cidr']).first + 1))
-    if add_vpc_route == False:
-        host_routes = _get_subnet_host_routes(context, route_table, gateway_ip,
-                                              router_objects, False)
-    else:
-        host_routes = _get_subnet_host_routes(context, route_table, gateway_ip,
-                                              router_objects)
+    if os_subnet is None:
+        os_subnet = neutron.show_subnet(subnet['os_id'])['subnet']
+    if host_routes is None:
+        gateway_ip = _get_subnet_gateway_ip(os_subnet)
+        if add_vpc_route == False:
+            host_routes = _get_subnet_host_routes(context, route_table,
+                                                  gateway_ip, router_objects,
+                                                  False)
+        else:
+            host_routes = _get_subnet_host_routes(context, route_table,
+                                                  gateway_ip, router_objects)
+    if (os_subnet.get('host_routes') is not None and
+            _are_host_routes_equal(os_subnet['host_routes'], host_routes)):
+        return
     neutron.update_subnet(subnet['os_id'],
                           {'subnet': {'host_routes': host_routes}})
     if cleaner and rollback_route_table_object:
@@ -502,33 +607,46 @@ def _update_subnet_host_routes(context, subnet, route_table, cleaner=None,
                            route_table, None, None, None, None, False, True)
 
 
+def _get_subnet_gateway_ip(os_subnet):
+    return str(netaddr.IPAddress(
+        netaddr.IPNetwork(os_subnet['cidr']).first + 1))
+
+
+def _are_host_routes_equal(host_routes, other_host_routes):
+    def get_key(routes):
+        return sorted((route['destination'], route['nexthop'])
+                      for route in routes)
+
+    try:
+        return get_key(host_routes) == get_key(other_host_routes)
+    except (KeyError, TypeError):
+        return False
+
+
 def _get_router_objects(context, route_table):
-    return dict((route['gateway_id'],
-                 db_api.get_item_by_id(context, route['gateway_id']))
-                if route.get('gateway_id') else
-                (route['network_interface_id'],
-                 db_api.get_item_by_id(context, route['network_interface_id']))
-                for route in route_table['routes']
-                if route.get('gateway_id') or 'network_interface_id' in route)
+    router_ids = set(route.get('gateway_id') or route['network_interface_id']
+                     for route in route_table['routes']
+                     if route.get('gateway_id') or
+                     'network_interface_id' in route)
+    return dict((item['id'], item)
+                for item in db_api.get_items_by_ids(context, router_ids))
 
 
 def _get_subnet_host_routes(context, route_table, gateway_ip,
                             router_objects=None, add_vpc_route=True):
+    if router_objects is None:
+        router_objects = _get_router_objects(context, route_table)
+
     def get_nexthop(route):
         if 'gateway_id' in route:
             gateway_id = route['gateway_id']
             if gateway_id:
-                gateway = (router_objects[route['gateway_id']]
-                           if router_objects else
-                           db_api.get_item_by_id(context, gateway_id))
+                gateway = router_objects.get(gateway_id)
                 if (not gateway or
                         gateway.get('vpc_id') != route_table['vpc_id']):
                     return '127.0.0.1'
             return gateway_ip
-        network_interface = (
-            router_objects[route['network_interface_id']]
-            if router_objects else
-            db_api.get_item_by_id(context, route['network_interface_id']))
+        network_interface = router_objects.get(route['network_interface_id'])
         if not network_interface:
             return '127.0.0.1'
         return network_interface['private_ip_address']
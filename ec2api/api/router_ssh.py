@@ -0,0 +1,171 @@
+# Copyright 2014
+# The Cloudscaling Group, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Pooled SSH sessions to the edge router which announces public IPs."""
+
+import contextlib
+import os
+import re
+import socket
+
+from eventlet import semaphore
+from oslo_config import cfg
+from oslo_log import log as logging
+import paramiko
+
+from ec2api.i18n import _
+
+
+router_ssh_opts = [
+    cfg.StrOpt('router_address',
+               default='',
+               help='Address of router to get routes'),
+    cfg.StrOpt('router_user',
+               default='',
+               help='Username for router'),
+    cfg.StrOpt('router_cred',
+               default='',
+               help='Creds for Router'),
+    cfg.IntOpt('router_pool_size',
+               default=2,
+               help='Maximum number of SSH connections to the router per '
+                    'worker.'),
+    cfg.FloatOpt('router_ssh_timeout',
+                 default=10.0,
+                 help='Timeout in seconds to connect to the router and to '
+                      'wait for output of a command.'),
+    cfg.IntOpt('router_ssh_keepalive',
+               default=30,
+               help='Interval in seconds of keepalive packets on idle '
+                    'router connections. Zero disables keepalive.'),
+    cfg.IntOpt('router_batch_size',
+               default=20,
+               help='Maximum number of commands run at once over one '
+                    'router connection.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(router_ssh_opts)
+LOG = logging.getLogger(__name__)
+
+ROUTE_COMMAND = 'show route %s detail | grep "Protocol next hop"'
+NEXT_HOP_REGEX = re.compile(
+    r'^\s+Protocol next hop: \d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}', re.M)
+# NOTE(ft): errors which mean a broken connection to reestablish
+CONNECTION_ERRORS = (paramiko.SSHException, socket.error, EOFError)
+
+
+class RouterSessionPool(object):
+    """Pool of authenticated SSH connections to the router.
+
+    Connections are kept open between API requests and are reopened if the
+    transport is found closed or fails.
+    """
+
+    def __init__(self, size):
+        self._idle_clients = []
+        self._semaphore = semaphore.Semaphore(size)
+
+    def _connect(self):
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(CONF.router_address, username=CONF.router_user,
+                       password=CONF.router_cred,
+                       timeout=CONF.router_ssh_timeout)
+        if CONF.router_ssh_keepalive > 0:
+            client.get_transport().set_keepalive(CONF.router_ssh_keepalive)
+        return client
+
+    @staticmethod
+    def _is_alive(client):
+        transport = client.get_transport()
+        return transport is not None and transport.is_active()
+
+    @contextlib.contextmanager
+    def session(self):
+        with self._semaphore:
+            client = None
+            while self._idle_clients and client is None:
+                client = self._idle_clients.pop()
+                if not self._is_alive(client):
+                    client.close()
+                    client = None
+            if client is None:
+                client = self._connect()
+            try:
+                yield client
+            except Exception:
+                client.close()
+                raise
+            self._idle_clients.append(client)
+
+    def close(self):
+        while self._idle_clients:
+            self._idle_clients.pop().close()
+
+
+_pool = None
+_pool_pid = None
+
+
+def _get_pool():
+    global _pool, _pool_pid
+    # NOTE(ft): API workers are forked after the module is loaded, every
+    # worker needs its own connections
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        _pool = RouterSessionPool(CONF.router_pool_size)
+        _pool_pid = pid
+    return _pool
+
+
+def _exec_commands(client, commands):
+    outputs = []
+    batch_size = max(CONF.router_batch_size, 1)
+    for start in range(0, len(commands), batch_size):
+        # NOTE(ft): start all commands of the batch on separate channels of
+        # the same transport before reading any output, so that the router
+        # runs them concurrently
+        stdouts = []
+        for command in commands[start:start + batch_size]:
+            _stdin, stdout, _stderr = client.exec_command(
+                command, timeout=CONF.router_ssh_timeout)
+            stdouts.append(stdout)
+        outputs.extend(stdout.read() for stdout in stdouts)
+    return outputs
+
+
+def run_commands(commands):
+    """Run commands on the router and return their outputs."""
+    if not commands:
+        return []
+    pool = _get_pool()
+    try:
+        with pool.session() as client:
+            return _exec_commands(client, commands)
+    except CONNECTION_ERRORS as ex:
+        # NOTE(ft): an idle connection could be silently dropped by the
+        # router, so retry once on a new connection
+        LOG.warning(_('Router connection failed, reconnecting: %s'), ex)
+        pool.close()
+    with pool.session() as client:
+        return _exec_commands(client, commands)
+
+
+def have_routes(public_ips):
+    """Return dict of public IP to flag whether the router has its route."""
+    public_ips = sorted(set(public_ips))
+    outputs = run_commands([ROUTE_COMMAND % ip for ip in public_ips])
+    return {ip: NEXT_HOP_REGEX.search(output) is not None
+            for ip, output in zip(public_ips, outputs)}
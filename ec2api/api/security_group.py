@@ -129,19 +129,28 @@ class SecurityGroupDescriber(common.TaggableItemsDescriber):
                   'owner-id': 'ownerId',
                   'vpc-id': 'vpcId',
     }
-
-    def __init__(self):
-        super(SecurityGroupDescriber, self).__init__()
-        self.all_db_items = None
+    DB_FILTER_MAP = {'group-id': 'id',
+                     'vpc-id': 'vpc_id'}
 
     def format(self, item=None, os_item=None):
         return _format_security_group(item, os_item,
-                                      self.all_db_items, self.os_items)
+                                      self.db_items_by_os_id,
+                                      self.os_items_by_id)
+
+    def get_sources(self):
+        sources = super(SecurityGroupDescriber, self).get_sources()
+        sources.update({
+            'all_db_items': lambda: db_api.get_items(self.context, 'sg'),
+            'os_groups': lambda: security_group_engine.get_os_groups(
+                self.context),
+        })
+        return sources
 
     def get_os_items(self):
-        if self.all_db_items is None:
-            self.all_db_items = db_api.get_items(self.context, 'sg')
-        os_groups = security_group_engine.get_os_groups(self.context)
+        # NOTE(ft): index groups once per request, rules of every group
+        # refer to other groups by OpenStack id
+        self.db_items_by_os_id = _index_by(self.all_db_items, 'os_id')
+        os_groups = self.os_groups
         #if self.check_and_repair_default_groups(os_groups, self.all_db_items):
         #    self.all_db_items = db_api.get_items(self.context, 'sg')
         #    self.items = self.get_db_items()
@@ -149,7 +158,8 @@ class SecurityGroupDescriber(common.TaggableItemsDescriber):
         for os_group in os_groups:
             os_group['name'] = _translate_group_name(self.context,
                                                      os_group,
-                                                     self.all_db_items)
+                                                     self.db_items_by_os_id)
+        self.os_items_by_id = _index_by(os_groups, 'id')
         return os_groups
 
     def check_and_repair_default_groups(self, os_groups, db_groups):
@@ -344,16 +354,24 @@ def _revoke_security_group(context, group_id, group_name, ip_permissions,
     return True
 
 
-def _translate_group_name(context, os_group, db_groups):
+def _index_by(items, key):
+    # NOTE(ft): keep the first item of duplicates like a linear search does
+    index = {}
+    for item in items:
+        index.setdefault(item[key], item)
+    return index
+
+
+def _translate_group_name(context, os_group, db_groups_by_os_id):
     # NOTE(Alex): This function translates VPC default group names
     # from vpc id 'vpc-xxxxxxxx' format to 'default'. It's supposed
     # to be called right after getting security groups from OpenStack
     # in order to avoid problems with incoming 'default' name value
     # in all of the subsequent handling (filtering, using in parameters...)
-    if (os_group['name'].startswith('vpc-') and db_groups and
-            next((g for g in db_groups
-                  if g['os_id'] == os_group['id'] and g['vpc_id'] == os_group['name']), None)):
-        return 'default'
+    if os_group['name'].startswith('vpc-'):
+        db_group = db_groups_by_os_id.get(os_group['id'])
+        if db_group and db_group['vpc_id'] == os_group['name']:
+            return 'default'
     return os_group['name']
 
 
@@ -361,11 +379,10 @@ def _format_security_groups_ids_names(context):
     neutron = clients.neutron(context)
     os_security_groups = neutron.list_security_groups(
         tenant_id=context.project_id)['security_groups']
-    security_groups = db_api.get_items(context, 'sg')
+    security_groups = _index_by(db_api.get_items(context, 'sg'), 'os_id')
     ec2_security_groups = {}
     for os_security_group in os_security_groups:
-        security_group = next((g for g in security_groups
-                               if g['os_id'] == os_security_group['id']), None)
+        security_group = security_groups.get(os_security_group['id'])
         if security_group is None:
             continue
         ec2_security_groups[os_security_group['id']] = (
@@ -377,7 +394,7 @@ def _format_security_groups_ids_names(context):
 
 
 def _format_security_group(security_group, os_security_group,
-                           security_groups, os_security_groups):
+                           security_groups_by_os_id, os_security_groups_by_id):
     ec2_security_group = {}
     if security_group is not None:
         ec2_security_group['groupId'] = security_group['id']
@@ -401,15 +418,13 @@ def _format_security_group(security_group, os_security_group,
         remote_group_id = os_rule['remote_group_id']
         if remote_group_id is not None:
             ec2_remote_group = {}
-            db_remote_group = next((g for g in security_groups
-                                    if g['os_id'] == remote_group_id), None)
+            db_remote_group = security_groups_by_os_id.get(remote_group_id)
             if db_remote_group is not None:
                 ec2_remote_group['groupId'] = db_remote_group['id']
             else:
                 # TODO(Alex) Log absence of remote_group
                 pass
-            os_remote_group = next((g for g in os_security_groups
-                                    if g['id'] == remote_group_id), None)
+            os_remote_group = os_security_groups_by_id.get(remote_group_id)
             if os_remote_group is not None:
                 ec2_remote_group['groupName'] = os_remote_group['name']
                 ec2_remote_group['userId'] = os_remote_group['tenant_id']
@@ -82,13 +82,18 @@ class SnapshotDescriber(common.TaggableItemsDescriber):
         return _format_snapshot(self.context, snapshot, os_snapshot,
                                 self.volumes)
 
-    def get_db_items(self):
-        self.volumes = {vol['os_id']: vol
-                        for vol in db_api.get_items(self.context, 'vol')}
-        return super(SnapshotDescriber, self).get_db_items()
+    def get_sources(self):
+        sources = super(SnapshotDescriber, self).get_sources()
+        sources.update({
+            'volumes': lambda: {
+                vol['os_id']: vol
+                for vol in db_api.get_items(self.context, 'vol')},
+            'os_snapshots': clients.cinder(self.context).volume_snapshots.list,
+        })
+        return sources
 
     def get_os_items(self):
-        return clients.cinder(self.context).volume_snapshots.list()
+        return self.os_snapshots
 
     def get_name(self, os_item):
         return ''
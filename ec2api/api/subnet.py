@@ -158,7 +158,8 @@ def create_subnet(context, vpc_id, cidr_block,
                               {'subnet': {'name': subnet['id']}})
     os_ports = neutron.list_ports(tenant_id=context.project_id)['ports']
     return {'subnet': _format_subnet(context, subnet, os_subnet,
-                                     os_network, os_ports)}
+                                     os_network,
+                                     _get_subnets_ips_usage(os_ports))}
 
 
 def delete_subnet(context, subnet_id):
@@ -211,7 +212,11 @@ class SubnetDescriber(common.TaggableItemsDescriber):
                   'subnet-id': 'subnetId',
                   'state': 'state',
                   'vpc-id': 'vpcId'}
-
+    DB_FILTER_MAP = {'subnet-id': 'id',
+                     'vpc-id': 'vpc_id'}
+    OS_FILTER_MAP = {'cidr': 'cidr',
+                     'cidrBlock': 'cidr',
+                     'cidr-block': 'cidr'}
 
     def format(self, subnet, os_subnet):
         if not subnet:
@@ -223,18 +228,27 @@ class SubnetDescriber(common.TaggableItemsDescriber):
             self.delete_obsolete_item(subnet)
             return None
         return _format_subnet(self.context, subnet, os_subnet, os_network,
-                              self.os_ports)
+                              self.subnets_ips_usage)
 
     def get_name(self, os_item):
         return ''
 
-    def get_os_items(self):
+    def get_sources(self):
+        sources = super(SubnetDescriber, self).get_sources()
         neutron = clients.neutron(self.context)
-        self.os_networks = neutron.list_networks(
-            tenant_id=self.context.project_id)['networks']
-        self.os_ports = neutron.list_ports(
-            tenant_id=self.context.project_id)['ports']
-        return neutron.list_subnets()['subnets']
+        project_id = self.context.project_id
+        sources.update({
+            'os_networks': lambda: neutron.list_networks(
+                tenant_id=project_id)['networks'],
+            'subnets_ips_usage': lambda: _get_subnets_ips_usage(
+                neutron.list_ports(tenant_id=project_id)['ports']),
+            'os_subnets': lambda: neutron.list_subnets(
+                **self.os_filters)['subnets'],
+        })
+        return sources
+
+    def get_os_items(self):
+        return self.os_subnets
 
 
 def describe_subnets(context, subnet_id=None, filter=None):
@@ -243,7 +257,24 @@ def describe_subnets(context, subnet_id=None, filter=None):
     return {'subnetSet': formatted_subnets}
 
 
-def _format_subnet(context, subnet, os_subnet, os_network, os_ports):
+def _get_subnets_ips_usage(os_ports):
+    """Count used IPs of subnets in one pass over ports.
+
+    Returns dict of subnet OS id to (used IP count, has DHCP port) pair.
+    """
+    usage = {}
+    for port in os_ports:
+        is_dhcp_port = port.get('device_owner') == 'network:dhcp'
+        for fixed_ip in port.get('fixed_ips', []):
+            used_ips, has_dhcp_port = usage.get(fixed_ip['subnet_id'],
+                                                (0, False))
+            usage[fixed_ip['subnet_id']] = (used_ips + 1,
+                                            has_dhcp_port or is_dhcp_port)
+    return usage
+
+
+def _format_subnet(context, subnet, os_subnet, os_network,
+                   subnets_ips_usage):
     status_map = {'ACTIVE': 'available',
                   'BUILD': 'pending',
                   'DOWN': 'available',
@@ -251,8 +282,6 @@ def _format_subnet(context, subnet, os_subnet, os_network, os_ports):
     cidr_range = int(os_subnet['cidr'].split('/')[1])
     # NOTE(Alex) First and last IP addresses are system ones.
     ip_count = pow(2, 32 - cidr_range) - 2
-    # TODO(Alex): Probably performance-killer. Will have to optimize.
-    dhcp_port_accounted = False
 
     # Get the vpc cidr and the route table object to trigger subnet host route cleanup
     vpc_id = subnet["vpc_id"]
@@ -267,12 +296,9 @@ def _format_subnet(context, subnet, os_subnet, os_network, os_ports):
             route_table_api._update_subnet_host_routes(context, subnet, main_route_table, cleaner, None, None, None, True, False)
             LOG.error("Triggering host route cleanup for subnet id - {} within vpc {}".format(subnet['id'], vpc_id))
 
-    for port in os_ports:
-        for fixed_ip in port.get('fixed_ips', []):
-            if fixed_ip['subnet_id'] == os_subnet['id']:
-                ip_count -= 1
-                if port['device_owner'] == 'network:dhcp':
-                    dhcp_port_accounted = True
+    used_ips, dhcp_port_accounted = subnets_ips_usage.get(os_subnet['id'],
+                                                          (0, False))
+    ip_count -= used_ips
     if not dhcp_port_accounted:
         ip_count -= 1
     return {
@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import six
+
 from ec2api.api import common
 from ec2api.api import ec2utils
 from ec2api.db import api as db_api
@@ -62,6 +64,7 @@ def create_tags(context, resource_id, tag):
             raise exception.InvalidParameterValue(
                     parameter='Tag', value=str(tag_pair), reason=reason)
 
+    checked_ids = []
     for item_id in resource_id:
         kind = ec2utils.get_ec2_id_kind(item_id)
         if kind not in RESOURCE_TYPES:
@@ -69,7 +72,14 @@ def create_tags(context, resource_id, tag):
         # NOTE(ft): check items exist (excluding images because AWS allows to
         # create a tag with any image id)
         if kind not in ('ami', 'ari', 'aki'):
-            ec2utils.get_db_item(context, item_id)
+            checked_ids.append(item_id)
+    if checked_ids:
+        existing_ids = set(item['id'] for item in
+                           db_api.get_items_by_ids(context, checked_ids))
+        for item_id in checked_ids:
+            if item_id not in existing_ids:
+                raise ec2utils.NOT_FOUND_EXCEPTION_MAP[
+                    ec2utils.get_ec2_id_kind(item_id)](id=item_id)
 
     tags = [dict(item_id=item_id,
                  key=tag_pair['key'],
@@ -88,21 +98,61 @@ def delete_tags(context, resource_id, tag=None):
 
 class TagDescriber(common.NonOpenstackItemsDescriber):
 
+    KIND = 'tag'
     FILTER_MAP = {'key': 'key',
                   'resource-id': 'resourceId',
                   'resource-type': 'resourceType',
                   'value': 'value'}
+    DB_FILTER_MAP = {'key': 'key',
+                     'resource-id': 'item_id',
+                     'value': 'value'}
 
     def get_db_items(self):
         return db_api.get_tags(self.context)
 
+    def get_db_items_page(self, marker, limit):
+        return db_api.get_tags_page(self.context, marker=marker,
+                                    limit=limit,
+                                    filters=self.db_filters or None)
+
+    def plan_filters(self, filters):
+        filters = super(TagDescriber, self).plan_filters(filters)
+        if not filters:
+            return filters
+        remaining_filters = []
+        for f in filters:
+            values = f.get('value')
+            # NOTE(ft): known resource types are resolved to item kinds,
+            # other values are left to be compared with formatted tags
+            if (f['name'] == 'resource-type' and values and
+                    'kind' not in self.db_filters and
+                    all(isinstance(v, six.string_types) and
+                        v in RESOURCE_TYPES.values()
+                        for v in values)):
+                self.db_filters['kind'] = sorted(
+                    kind for kind, resource_type in
+                    six.iteritems(RESOURCE_TYPES)
+                    if resource_type in values)
+            else:
+                remaining_filters.append(f)
+        return remaining_filters or None
+
+    def get_marker(self, item):
+        return [item['item_id'], item['key']]
+
     def format(self, item):
         return _format_tag(item)
 
 
 def describe_tags(context, filter=None, max_results=None, next_token=None):
-    formatted_tags = TagDescriber().describe(context, filter=filter)
-    return {'tagSet': formatted_tags}
+    tag_describer = TagDescriber()
+    formatted_tags = tag_describer.describe(
+        context, filter=filter, max_results=max_results,
+        next_token=next_token)
+    result = {'tagSet': formatted_tags}
+    if tag_describer.next_token:
+        result['nextToken'] = tag_describer.next_token
+    return result
 
 
 def _format_tag(tag):
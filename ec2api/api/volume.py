@@ -109,6 +109,9 @@ def delete_volume(context, volume_id):
 class VolumeDescriber(common.TaggableItemsDescriber):
 
     KIND = 'vol'
+    MAX_RESULTS_LIMIT = 500
+    AUTO_CREATE_ON_PAGING = True
+    os_volumes = None
     FILTER_MAP = {'availability-zone': 'availabilityZone',
                   'create-time': 'createTime',
                   'encrypted': 'encrypted',
@@ -125,15 +128,25 @@ class VolumeDescriber(common.TaggableItemsDescriber):
         return _format_volume(self.context, volume, os_volume,
                               self.instances, self.snapshots)
 
-    def get_db_items(self):
-        self.instances = {i['os_id']: i
-                          for i in db_api.get_items(self.context, 'i')}
-        self.snapshots = {s['os_id']: s
-                          for s in db_api.get_items(self.context, 'snap')}
-        return super(VolumeDescriber, self).get_db_items()
+    def get_sources(self):
+        sources = super(VolumeDescriber, self).get_sources()
+        sources.update({
+            'instances': lambda: {
+                i['os_id']: i for i in db_api.get_items(self.context, 'i')},
+            'snapshots': lambda: {
+                s['os_id']: s for s in db_api.get_items(self.context, 'snap')},
+        })
+        if self.os_volumes is None:
+            sources['os_volumes'] = clients.cinder(self.context).volumes.list
+        return sources
+
+    def list_os_items(self):
+        if self.os_volumes is None:
+            self.os_volumes = clients.cinder(self.context).volumes.list()
+        return self.os_volumes
 
     def get_os_items(self):
-        return clients.cinder(self.context).volumes.list()
+        return self.os_volumes
 
     def get_name(self, os_item):
         return ''
@@ -141,9 +154,14 @@ class VolumeDescriber(common.TaggableItemsDescriber):
 
 def describe_volumes(context, volume_id=None, filter=None,
                      max_results=None, next_token=None):
-    formatted_volumes = VolumeDescriber().describe(
-        context, ids=volume_id, filter=filter)
-    return {'volumeSet': formatted_volumes}
+    volume_describer = VolumeDescriber()
+    formatted_volumes = volume_describer.describe(
+        context, ids=volume_id, filter=filter,
+        max_results=max_results, next_token=next_token)
+    result = {'volumeSet': formatted_volumes}
+    if volume_describer.next_token:
+        result['nextToken'] = volume_describer.next_token
+    return result
 
 
 def _format_volume(context, volume, os_volume, instances={},
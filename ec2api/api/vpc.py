@@ -134,6 +134,7 @@ class VpcDescriber(common.TaggableItemsDescriber,
                   'is-default': 'isDefault',
                   'state': 'state',
                   'vpc-id': 'vpcId'}
+    DB_FILTER_MAP = {'vpc-id': 'id'}
 
     def format(self, item=None, os_item=None):
         return _format_vpc(item)
@@ -14,8 +14,13 @@
 
 """RequestContext: context for requests that persist through all of ec2."""
 
+import calendar
+import os
+import sys
+import time
 import uuid
 
+from eventlet import event
 from keystoneclient import client as keystone_client
 from keystoneclient.v2_0 import client as keystone_client_v2
 from keystoneclient.v3 import client as keystone_client_v3
@@ -25,7 +30,7 @@ from oslo_utils import timeutils
 import six
 
 from ec2api import exception
-from ec2api.i18n import _
+from ec2api.i18n import _, _LW
 from ec2api.openstack.common import local
 
 
@@ -37,6 +42,10 @@ ec2_opts = [
                secret=True),
     cfg.StrOpt('admin_tenant_name',
                help=_("Admin tenant name")),
+    cfg.IntOpt('admin_token_refresh_margin',
+               default=300,
+               help=_("Time in seconds before expiration of the cached admin "
+                      "token to authenticate again")),
     # TODO(andrey-mp): keystone v3 allows to pass domain_name
     # or domain_id to auth. This code should support this feature.
 ]
@@ -102,6 +111,8 @@ class RequestContext(object):
         # TODO(ft): call policy.check_is_admin if is_admin is None
         self.is_os_admin = is_os_admin
         self.api_version = api_version
+        # NOTE(ft): request scoped cache of DB items, see db.api.ItemCache
+        self.item_cache = None
         if overwrite or not hasattr(local.store, 'context'):
             self.update_store()
 
@@ -173,12 +184,13 @@ def get_keystone_client_class():
     return _keystone_client_class
 
 
-def get_os_admin_context():
-    """Create a context to interact with OpenStack as an administrator."""
-    if (getattr(local.store, 'context', None) and
-            local.store.context.is_os_admin):
-        return local.store.context
-    # TODO(ft): make an authentification token reusable
+_os_admin_auth = None
+_os_admin_auth_pid = None
+_os_admin_auth_fetch = None
+_INTERRUPTED = object()
+
+
+def _authenticate_os_admin():
     keystone_client_class = get_keystone_client_class()
     keystone = keystone_client_class(
         username=CONF.admin_user,
@@ -189,12 +201,103 @@ def get_os_admin_context():
         insecure=CONF.ssl_insecure,
         cacert=CONF.ssl_ca_file
     )
-    service_catalog = keystone.service_catalog.get_data()
+    try:
+        expires_at = calendar.timegm(
+            keystone.auth_ref.expires.utctimetuple())
+    except Exception:
+        # NOTE(ft): do not reuse a token of unknown lifetime
+        expires_at = 0
+    return {'user_id': keystone.auth_user_id,
+            'project_id': keystone.auth_tenant_id,
+            'auth_token': keystone.auth_token,
+            'service_catalog': keystone.service_catalog.get_data(),
+            'expires_at': expires_at}
+
+
+def _get_os_admin_auth():
+    global _os_admin_auth, _os_admin_auth_pid, _os_admin_auth_fetch
+    # NOTE(ft): API workers are forked after the module is loaded, every
+    # worker authenticates by itself
+    pid = os.getpid()
+    if _os_admin_auth_pid != pid:
+        _os_admin_auth = None
+        _os_admin_auth_fetch = None
+        _os_admin_auth_pid = pid
+    auth = _os_admin_auth
+    if (auth and
+            auth['expires_at'] - CONF.admin_token_refresh_margin >
+            time.time()):
+        return auth
+    if _os_admin_auth_fetch is not None:
+        auth = _os_admin_auth_fetch.wait()
+        if auth is _INTERRUPTED:
+            return _get_os_admin_auth()
+        return auth
+
+    fetch = _os_admin_auth_fetch = event.Event()
+    try:
+        auth = _authenticate_os_admin()
+    except Exception:
+        exc_info = sys.exc_info()
+        _os_admin_auth_fetch = None
+        fetch.send_exception(*exc_info)
+        six.reraise(*exc_info)
+    except BaseException:
+        # NOTE(ft): the authentication is interrupted by a timeout or a kill
+        # of the green thread, waiters authenticate themselves
+        _os_admin_auth_fetch = None
+        fetch.send(_INTERRUPTED)
+        raise
+    _os_admin_auth = auth
+    _os_admin_auth_fetch = None
+    fetch.send(auth)
+    return auth
+
+
+def reset_os_admin_auth():
+    """Drop the cached admin token, e.g. if OpenStack rejects it."""
+    global _os_admin_auth
+    _os_admin_auth = None
+    context = getattr(local.store, 'context', None)
+    if context and context.is_os_admin:
+        del local.store.context
+
+
+def is_unauthorized_error(ex):
+    """Check if an OpenStack client exception is HTTP 401 Unauthorized."""
+    return any(getattr(ex, attr, None) == 401
+               for attr in ('http_status', 'code', 'status_code'))
+
+
+def call_with_os_admin_reauth(func, *args, **kwargs):
+    """Call a function which uses the admin context.
+
+    The cached admin token can be revoked before its expiration, so if
+    OpenStack rejects it, authenticate again and call the function once more.
+    The function must get the admin context by itself to use the new token.
+    """
+    try:
+        return func(*args, **kwargs)
+    except Exception as ex:
+        if not is_unauthorized_error(ex):
+            raise
+        LOG.warning(_LW('Admin token is rejected, reauthenticating.'))
+        reset_os_admin_auth()
+        return func(*args, **kwargs)
+
+
+def get_os_admin_context():
+    """Create a context to interact with OpenStack as an administrator."""
+    auth = _get_os_admin_auth()
+    context = getattr(local.store, 'context', None)
+    if (context and context.is_os_admin and
+            context.auth_token == auth['auth_token']):
+        return context
     return RequestContext(
-            keystone.auth_user_id,
-            keystone.auth_tenant_id,
-            auth_token=keystone.auth_token,
-            service_catalog=service_catalog,
+            auth['user_id'],
+            auth['project_id'],
+            auth_token=auth['auth_token'],
+            service_catalog=auth['service_catalog'],
             is_os_admin=True)
 
 
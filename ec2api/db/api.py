@@ -27,6 +27,8 @@ functions from ec2api.db namespace, not the ec2api.db.api namespace.
 
 """
 
+import copy
+
 from eventlet import tpool
 from oslo_config import cfg
 from oslo_db import api as db_api
@@ -79,42 +81,162 @@ IMPL = EC2DBAPI()
 LOG = logging.getLogger(__name__)
 
 
+class ItemCache(object):
+    """Request scoped identity map of DB items.
+
+    Assign an instance to context.item_cache to serve repeated reads of items
+    within one API request from memory. Items are copied on the way in and
+    out, so callers are free to modify them. Writes through this module
+    invalidate affected entries.
+    """
+
+    def __init__(self):
+        # NOTE(ft): None value means the item is known to be absent
+        self._items = {}
+        self._kinds = set()
+
+    @staticmethod
+    def _get_kind(item_id):
+        return item_id.rsplit('-', 1)[0]
+
+    def get_item(self, item_id):
+        """Return (is_known, item) pair."""
+        if item_id in self._items:
+            return True, copy.deepcopy(self._items[item_id])
+        if self._get_kind(item_id) in self._kinds:
+            return True, None
+        return False, None
+
+    def get_items(self, kind):
+        if kind not in self._kinds:
+            return None
+        return [copy.deepcopy(item) for item in self._items.values()
+                if item is not None and self._get_kind(item['id']) == kind]
+
+    def set_item(self, item_id, item):
+        self._items[item_id] = copy.deepcopy(item)
+
+    def set_items(self, kind, items):
+        for item_id in [i for i in self._items
+                        if self._get_kind(i) == kind]:
+            del self._items[item_id]
+        for item in items:
+            self.set_item(item['id'], item)
+        self._kinds.add(kind)
+
+    def invalidate(self, item_id=None, kind=None):
+        if item_id:
+            self._items.pop(item_id, None)
+            kind = kind or self._get_kind(item_id)
+        self._kinds.discard(kind)
+
+
+def _get_item_cache(context):
+    item_cache = getattr(context, 'item_cache', None)
+    return item_cache if isinstance(item_cache, ItemCache) else None
+
+
+def _invalidate_item_cache(context, item_id=None, kind=None):
+    item_cache = _get_item_cache(context)
+    if item_cache is not None:
+        item_cache.invalidate(item_id, kind)
+
+
 def add_item(context, kind, data, project_id=None):
-    return IMPL.add_item(context, kind, data, project_id=project_id)
+    item = IMPL.add_item(context, kind, data, project_id=project_id)
+    _invalidate_item_cache(context, item['id'], kind)
+    return item
 
 
 def add_item_id(context, kind, os_id, project_id=None):
-    return IMPL.add_item_id(context, kind, os_id, project_id=project_id)
+    item_id = IMPL.add_item_id(context, kind, os_id, project_id=project_id)
+    _invalidate_item_cache(context, item_id, kind)
+    return item_id
 
 
 def update_item(context, item):
     IMPL.update_item(context, item)
+    _invalidate_item_cache(context, item['id'])
 
 
 def delete_item(context, item_id):
     IMPL.delete_item(context, item_id)
+    _invalidate_item_cache(context, item_id)
 
 
 def restore_item(context, kind, data):
-    return IMPL.restore_item(context, kind, data)
+    item = IMPL.restore_item(context, kind, data)
+    _invalidate_item_cache(context, data['id'], kind)
+    return item
 
 
 def get_items(context, kind):
-    return IMPL.get_items(context, kind)
+    item_cache = _get_item_cache(context)
+    if item_cache is None:
+        return IMPL.get_items(context, kind)
+    items = item_cache.get_items(kind)
+    if items is None:
+        items = IMPL.get_items(context, kind)
+        item_cache.set_items(kind, items)
+    return items
+
+
+def get_items_page(context, kind, marker=None, limit=None, filters=None):
+    items = IMPL.get_items_page(context, kind, marker=marker, limit=limit,
+                                filters=filters)
+    item_cache = _get_item_cache(context)
+    if item_cache is not None:
+        for item in items:
+            item_cache.set_item(item['id'], item)
+    return items
 
 
 def get_item_by_id(context, item_id):
-    return IMPL.get_item_by_id(context, item_id)
+    item_cache = _get_item_cache(context)
+    if item_cache is None or not item_id:
+        return IMPL.get_item_by_id(context, item_id)
+    is_known, item = item_cache.get_item(item_id)
+    if not is_known:
+        item = IMPL.get_item_by_id(context, item_id)
+        item_cache.set_item(item_id, item)
+    return item
 
 
 def get_items_by_ids(context, item_ids):
-    return IMPL.get_items_by_ids(context, item_ids)
+    item_cache = _get_item_cache(context)
+    if item_cache is None or not item_ids:
+        return IMPL.get_items_by_ids(context, item_ids)
+    items = []
+    missed_ids = set()
+    for item_id in item_ids:
+        is_known, item = item_cache.get_item(item_id)
+        if not is_known:
+            missed_ids.add(item_id)
+        elif item is not None:
+            items.append(item)
+    if missed_ids:
+        loaded_items = IMPL.get_items_by_ids(context, missed_ids)
+        for item in loaded_items:
+            item_cache.set_item(item['id'], item)
+            missed_ids.discard(item['id'])
+        for item_id in missed_ids:
+            item_cache.set_item(item_id, None)
+        items.extend(loaded_items)
+    return items
+
+
+def get_items_by_instance_id(context, kind, instance_id):
+    return IMPL.get_items_by_instance_id(context, kind, instance_id)
 
 
 def get_public_items(context, kind, item_ids=None):
     return IMPL.get_public_items(context, kind, item_ids)
 
 
+def get_all_projects_items(context, kind):
+    return IMPL.get_all_projects_items(context, kind)
+
+
 def get_items_ids(context, kind, item_ids=None, item_os_ids=None):
     return IMPL.get_items_ids(context, kind, item_ids=item_ids,
                               item_os_ids=item_os_ids)
@@ -130,3 +252,12 @@ def delete_tags(context, item_ids, tag_pairs=None):
 
 def get_tags(context, kinds=None, item_ids=None):
     return IMPL.get_tags(context, kinds, item_ids)
+
+
+def get_tags_page(context, marker=None, limit=None, filters=None):
+    return IMPL.get_tags_page(context, marker=marker, limit=limit,
+                              filters=filters)
+
+
+def get_item_ids_by_tags(context, kinds, tag_filters):
+    return IMPL.get_item_ids_by_tags(context, kinds, tag_filters)
@@ -14,20 +14,24 @@
 
 """Implementation of SQLAlchemy backend."""
 
+import collections
 import copy
 import functools
-import json
 import random
 import sys
 
 from oslo_config import cfg
 from oslo_db import exception as db_exception
 from oslo_db.sqlalchemy import session as db_session
+import six
 from sqlalchemy import and_
+from sqlalchemy import false
 from sqlalchemy import or_
 from sqlalchemy.sql import bindparam
+from sqlalchemy.sql import text
 
 import ec2api.context
+from ec2api.db.sqlalchemy import codec
 from ec2api.db.sqlalchemy import models
 
 CONF = cfg.CONF
@@ -89,6 +93,10 @@ def _new_id(kind, os_id):
     return obj_id
 
 
+def _get_kind(item_id):
+    return item_id.rsplit('-', 1)[0]
+
+
 @require_context
 def add_item(context, kind, data, project_id=None):
     if not project_id:
@@ -97,6 +105,7 @@ def add_item(context, kind, data, project_id=None):
     item_ref.update({
         "project_id": project_id,
         "id": _new_id(kind, data.get("os_id")),
+        "kind": kind,
     })
     item_ref.update(_pack_item_data(data))
     try:
@@ -109,7 +118,7 @@ def add_item(context, kind, data, project_id=None):
                     filter_by(os_id=data["os_id"]).
                     filter(or_(models.Item.project_id == project_id,
                                models.Item.project_id.is_(None))).
-                    filter(models.Item.id.like('%s-%%' % kind)).
+                    filter_by(kind=kind).
                     one())
         item_data = _unpack_item_data(item_ref)
         item_data.update(data)
@@ -124,6 +133,7 @@ def add_item_id(context, kind, os_id, project_id=None):
     item_ref = models.Item()
     item_ref.update({
         "id": _new_id(kind, os_id),
+        "kind": kind,
         "os_id": os_id,
     })
     if project_id:
@@ -176,6 +186,7 @@ def restore_item(context, kind, data):
     item_ref = models.Item()
     item_ref.update({
         "project_id": context.project_id,
+        "kind": kind,
     })
     item_ref.id = data['id']
     item_ref.update(_pack_item_data(data))
@@ -187,11 +198,57 @@ def restore_item(context, kind, data):
 def get_items(context, kind):
     return [_unpack_item_data(item)
             for item in (model_query(context, models.Item).
-                         filter_by(project_id=context.project_id).
-                         filter(models.Item.id.like('%s-%%' % kind)).
+                         filter_by(project_id=context.project_id,
+                                   kind=kind).
                          all())]
 
 
+ITEM_FILTER_COLUMNS = ('id', 'os_id', 'vpc_id', 'instance_id')
+TAG_FILTER_COLUMNS = ('item_id', 'kind', 'key', 'value')
+
+
+def _fnmatch_to_like(pattern):
+    return (pattern.replace('\\', '\\\\').
+            replace('%', '\\%').
+            replace('_', '\\_').
+            replace('*', '%').
+            replace('?', '_'))
+
+
+def _apply_filters(query, model, filter_columns, filters):
+    """Filter objects by column values.
+
+    filters is a dict of column name to a list of values, any of which may
+    match. Values may contain '*' and '?' wildcards. An empty list matches
+    nothing.
+    """
+    for column_name, values in six.iteritems(filters or {}):
+        if column_name not in filter_columns:
+            raise ValueError('%s cannot be filtered by %s' %
+                             (model.__tablename__, column_name))
+        column = getattr(model, column_name)
+        conditions = [column.like(_fnmatch_to_like(value), escape='\\')
+                      if '*' in value or '?' in value else
+                      column == value
+                      for value in values]
+        query = query.filter(or_(*conditions) if conditions else false())
+    return query
+
+
+@require_context
+def get_items_page(context, kind, marker=None, limit=None, filters=None):
+    query = (model_query(context, models.Item).
+             filter_by(project_id=context.project_id,
+                       kind=kind))
+    query = _apply_filters(query, models.Item, ITEM_FILTER_COLUMNS, filters)
+    if marker is not None:
+        query = query.filter(models.Item.id > marker)
+    query = query.order_by(models.Item.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return [_unpack_item_data(item) for item in query.all()]
+
+
 @require_context
 def get_item_by_id(context, item_id):
     return (_unpack_item_data(model_query(context, models.Item).
@@ -211,21 +268,41 @@ def get_items_by_ids(context, item_ids):
                          all())]
 
 
+@require_context
+def get_items_by_instance_id(context, kind, instance_id):
+    return [_unpack_item_data(item)
+            for item in (model_query(context, models.Item).
+                         filter_by(project_id=context.project_id,
+                                   instance_id=instance_id,
+                                   kind=kind).
+                         all())]
+
+
 @require_context
 def get_public_items(context, kind, item_ids=None):
     query = (model_query(context, models.Item).
-             filter(models.Item.id.like('%s-%%' % kind)).
-             filter(models.Item.data.like('%"is_public": True%')))
+             filter_by(kind=kind,
+                       is_public=True))
     if item_ids:
         query = query.filter(models.Item.id.in_(item_ids))
     return [_unpack_item_data(item)
             for item in query.all()]
 
 
+@require_context
+def get_all_projects_items(context, kind):
+    items = collections.defaultdict(list)
+    for item_ref in (model_query(context, models.Item).
+                     filter_by(kind=kind).
+                     filter(models.Item.project_id.isnot(None))):
+        items[item_ref.project_id].append(_unpack_item_data(item_ref))
+    return dict(items)
+
+
 @require_context
 def get_items_ids(context, kind, item_ids=None, item_os_ids=None):
     query = (model_query(context, models.Item).
-             filter(models.Item.id.like('%s-%%' % kind)))
+             filter_by(kind=kind))
     if item_ids:
         query = query.filter(models.Item.id.in_(item_ids))
     if item_os_ids:
@@ -234,31 +311,80 @@ def get_items_ids(context, kind, item_ids=None, item_os_ids=None):
             for item in query.all()]
 
 
+TAG_COLUMNS = ('project_id', 'item_id', 'kind', 'key', 'value')
+
+
+def _get_tags_upsert_statement(dialect):
+    """Build an insert or update statement of tags for the dialect.
+
+    Return None if the dialect doesn't support such statements.
+    """
+    quote = dialect.identifier_preparer.quote_identifier
+    insert = 'INSERT%%s INTO tags (%s) VALUES (%s)' % (
+        ', '.join(quote(c) for c in TAG_COLUMNS),
+        ', '.join(':tag_%s' % c for c in TAG_COLUMNS))
+    if dialect.name == 'mysql':
+        return text(insert % '' +
+                    ' ON DUPLICATE KEY UPDATE %(value)s = VALUES(%(value)s)' %
+                    {'value': quote('value')})
+    if (dialect.name == 'postgresql' and
+            (dialect.server_version_info or ()) >= (9, 5)):
+        return text(insert % '' +
+                    ' ON CONFLICT (%s) DO UPDATE SET %s = EXCLUDED.%s' %
+                    (', '.join(quote(c)
+                               for c in ('project_id', 'item_id', 'key')),
+                     quote('value'), quote('value')))
+    if dialect.name == 'sqlite':
+        return text(insert % ' OR REPLACE')
+    return None
+
+
 @require_context
 def add_tags(context, tags):
+    # NOTE(ft): the last value of a repeated tag wins as it did when tags
+    # were added one by one
+    rows = collections.OrderedDict(
+        ((tag['item_id'], tag['key']),
+         {'tag_project_id': context.project_id,
+          'tag_item_id': tag['item_id'],
+          'tag_kind': _get_kind(tag['item_id']),
+          'tag_key': tag['key'],
+          'tag_value': tag['value']})
+        for tag in tags)
+    if not rows:
+        return
     session = get_session()
+    upsert = _get_tags_upsert_statement(session.bind.dialect)
+    with session.begin():
+        if upsert is not None:
+            session.execute(upsert, list(rows.values()))
+        else:
+            _add_tags_one_by_one(context, session, rows.values())
+
+
+def _add_tags_one_by_one(context, session, rows):
     get_query = (model_query(context, models.Tag, session=session).
                  filter_by(project_id=context.project_id,
                            # NOTE(ft): item_id param name is reserved for
                            # sqlalchemy internal use
                            item_id=bindparam('tag_item_id'),
                            key=bindparam('tag_key')))
-    with session.begin():
-        for tag in tags:
-            tag_ref = models.Tag(project_id=context.project_id,
-                                 item_id=tag['item_id'],
-                                 key=tag['key'],
-                                 value=tag['value'])
-            try:
-                with session.begin(nested=True):
-                    tag_ref.save(session)
-            except db_exception.DBDuplicateEntry as ex:
-                if ('PRIMARY' not in ex.columns and
-                        ex.columns != ['project_id', 'item_id', 'key']):
-                    raise
-                (get_query.params(tag_item_id=tag['item_id'],
-                                  tag_key=tag['key']).
-                 update({'value': tag['value']}))
+    for row in rows:
+        tag_ref = models.Tag(project_id=row['tag_project_id'],
+                             item_id=row['tag_item_id'],
+                             kind=row['tag_kind'],
+                             key=row['tag_key'],
+                             value=row['tag_value'])
+        try:
+            with session.begin(nested=True):
+                tag_ref.save(session)
+        except db_exception.DBDuplicateEntry as ex:
+            if ('PRIMARY' not in ex.columns and
+                    ex.columns != ['project_id', 'item_id', 'key']):
+                raise
+            (get_query.params(tag_item_id=row['tag_item_id'],
+                              tag_key=row['tag_key']).
+             update({'value': row['tag_value']}))
 
 
 @require_context
@@ -293,11 +419,7 @@ def get_tags(context, kinds=None, item_ids=None):
     query = (model_query(context, models.Tag).
              filter_by(project_id=context.project_id))
     if kinds:
-        fltr = None
-        for kind in kinds:
-            expr = models.Tag.item_id.like('%s-%%' % kind)
-            fltr = expr if fltr is None else or_(fltr, expr)
-        query = query.filter(fltr)
+        query = query.filter(models.Tag.kind.in_(kinds))
     if item_ids:
         query = query.filter(models.Tag.item_id.in_(item_ids))
     return [dict(item_id=tag.item_id,
@@ -306,22 +428,143 @@ def get_tags(context, kinds=None, item_ids=None):
             for tag in query.all()]
 
 
+@require_context
+def get_tags_page(context, marker=None, limit=None, filters=None):
+    query = (model_query(context, models.Tag).
+             filter_by(project_id=context.project_id))
+    query = _apply_filters(query, models.Tag, TAG_FILTER_COLUMNS, filters)
+    if marker is not None:
+        marker_item_id, marker_key = marker
+        query = query.filter(or_(
+            models.Tag.item_id > marker_item_id,
+            and_(models.Tag.item_id == marker_item_id,
+                 models.Tag.key > marker_key)))
+    # NOTE(ft): the order of the primary key lets DB get a page without
+    # sorting
+    query = query.order_by(models.Tag.item_id, models.Tag.key)
+    if limit is not None:
+        query = query.limit(limit)
+    return [dict(item_id=tag.item_id,
+                 key=tag.key,
+                 value=tag.value)
+            for tag in query.all()]
+
+
+@require_context
+def get_item_ids_by_tags(context, kinds, tag_filters):
+    """Get ids of items having tags matched to every tag filter.
+
+    A tag filter is a dict of tag column name to a list of values, as
+    filters of get_tags_page are. Every filter must be matched by one tag.
+    """
+    def get_tags_query():
+        return (model_query(context, models.Tag.item_id).
+                filter(models.Tag.project_id == context.project_id))
+
+    query = get_tags_query()
+    if kinds:
+        query = query.filter(models.Tag.kind.in_(kinds))
+    for tag_filter in tag_filters:
+        tagged_ids = _apply_filters(get_tags_query(), models.Tag,
+                                    TAG_FILTER_COLUMNS, tag_filter)
+        query = query.filter(models.Tag.item_id.in_(tagged_ids.subquery()))
+    return set(item_id for item_id, in query.distinct())
+
+
+ITEM_COLUMN_KEYS = ('id', 'os_id', 'vpc_id')
+
+
+class Item(collections.MutableMapping):
+    """Item, which decodes its data on first access to a non-column key.
+
+    Callers, which need ids only, don't pay for data decoding. Any access to
+    other keys, iteration and comparison decode data, deep copies keep not
+    decoded data as is. Item is not a dict subclass, so that dict(item),
+    dict.update(item) and **item go through keys() and get all fields.
+    """
+
+    def __init__(self, item_ref):
+        self._data = {'id': item_ref.id,
+                      'os_id': item_ref.os_id,
+                      'vpc_id': item_ref.vpc_id}
+        self._encoded_data = item_ref.data
+        self._is_decoded = False
+
+    def _decode(self):
+        if self._is_decoded:
+            return
+        self._is_decoded = True
+        data = codec.decode(self._encoded_data)
+        self._encoded_data = None
+        for key, value in six.iteritems(data):
+            if key not in ITEM_COLUMN_KEYS:
+                self._data[key] = value
+
+    def __getitem__(self, key):
+        if key not in ITEM_COLUMN_KEYS:
+            self._decode()
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        self._decode()
+        self._data[key] = value
+
+    def __delitem__(self, key):
+        self._decode()
+        del self._data[key]
+
+    def __iter__(self):
+        self._decode()
+        return iter(self._data)
+
+    def __len__(self):
+        self._decode()
+        return len(self._data)
+
+    def __contains__(self, key):
+        if key not in ITEM_COLUMN_KEYS:
+            self._decode()
+        return key in self._data
+
+    def __repr__(self):
+        self._decode()
+        return repr(self._data)
+
+    def copy(self):
+        self._decode()
+        return dict(self._data)
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        if self._is_decoded:
+            return copy.deepcopy(self._data, memo)
+        item = Item.__new__(Item)
+        item._data = dict(self._data)
+        item._encoded_data = self._encoded_data
+        item._is_decoded = False
+        return item
+
+    def __reduce_ex__(self, protocol):
+        return dict, (self.copy(),)
+
+
 def _pack_item_data(item_data):
-    data = copy.deepcopy(item_data)
-    data.pop("id", None)
+    data = dict((key, value) for key, value in six.iteritems(item_data)
+                if key not in ITEM_COLUMN_KEYS)
     return {
-        "os_id": data.pop("os_id", None),
-        "vpc_id": data.pop("vpc_id", None),
-        "data": json.dumps(data),
+        "os_id": item_data.get("os_id"),
+        "vpc_id": item_data.get("vpc_id"),
+        # NOTE(ft): is_public and instance_id stay in data as well to be
+        # returned to callers
+        "is_public": bool(data.get("is_public")),
+        "instance_id": data.get("instance_id"),
+        "data": codec.encode(data),
     }
 
 
 def _unpack_item_data(item_ref):
     if item_ref is None:
         return None
-    data = item_ref.data
-    data = json.loads(data) if data is not None else {}
-    data["id"] = item_ref.id
-    data["os_id"] = item_ref.os_id
-    data["vpc_id"] = item_ref.vpc_id
-    return data
+    return Item(item_ref)
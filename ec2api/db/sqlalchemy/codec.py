@@ -0,0 +1,100 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Codecs of data of items.
+
+JSON data is stored as is, as legacy rows are. Data of other codecs is
+prefixed with the codec name and version ('msgpack:1:...'), so every row is
+decoded by its own codec regardless of the configured one.
+"""
+
+import base64
+import json
+
+from oslo_config import cfg
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+codec_opts = [
+    cfg.StrOpt('item_data_codec',
+               default='json',
+               choices=('json', 'msgpack'),
+               help='Codec to store data of items in DB. Items stored by '
+                    'any codec are read regardless of this option. msgpack '
+                    'requires the msgpack package.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(codec_opts, 'database')
+
+
+class JsonCodec(object):
+
+    name = 'json'
+    version = None
+
+    def encode(self, data):
+        return json.dumps(data, separators=(',', ':'))
+
+    def decode(self, text):
+        return json.loads(text)
+
+
+class MsgpackCodec(object):
+
+    name = 'msgpack'
+    version = '1'
+
+    def encode(self, data):
+        _check_msgpack()
+        # NOTE(ft): the data column is a text one
+        return base64.b64encode(msgpack.packb(data, use_bin_type=False))
+
+    def decode(self, text):
+        _check_msgpack()
+        # NOTE(ft): strings are decoded to unicode as JSON does
+        return msgpack.unpackb(base64.b64decode(text), raw=False)
+
+
+def _check_msgpack():
+    if msgpack is None:
+        raise RuntimeError('msgpack package is required to encode or decode '
+                           'msgpack item data')
+
+
+_json_codec = JsonCodec()
+_CODECS = {'json': _json_codec,
+           'msgpack': MsgpackCodec()}
+
+
+def encode(data):
+    codec = _CODECS[CONF.database.item_data_codec]
+    text = codec.encode(data)
+    if codec.version is None:
+        return text
+    return '%s:%s:%s' % (codec.name, codec.version, text)
+
+
+def decode(text):
+    if text is None:
+        return {}
+    if text.startswith('{'):
+        return _json_codec.decode(text)
+    name, version, text = text.split(':', 2)
+    codec = _CODECS.get(name)
+    if codec is None or codec.version != version:
+        raise ValueError('Unknown item data codec %s:%s' % (name, version))
+    return codec.decode(text)
@@ -0,0 +1,67 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from migrate import changeset  # noqa
+from sqlalchemy import Column, Index, MetaData, String, Table
+from sqlalchemy.sql import bindparam
+
+BACKFILL_BATCH_SIZE = 1000
+
+# NOTE(ft): (table name, column which holds an item id, index name)
+_TABLES = (('items', 'id', 'items_project_id_kind_idx'),
+           ('tags', 'item_id', 'tags_project_id_kind_idx'))
+
+
+def _select_ids(table, id_column):
+    return table.select().with_only_columns([id_column]).distinct()
+
+
+def _backfill_kind(migrate_engine, table, id_column):
+    update = (table.update().
+              where(id_column == bindparam('b_id')).
+              values(kind=bindparam('b_kind')))
+    item_ids = [row[0]
+                for row in migrate_engine.execute(_select_ids(table,
+                                                              id_column))]
+    batch = []
+    for item_id in item_ids:
+        batch.append({'b_id': item_id,
+                      'b_kind': item_id.rsplit('-', 1)[0]})
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            migrate_engine.execute(update, batch)
+            batch = []
+    if batch:
+        migrate_engine.execute(update, batch)
+
+
+def upgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    for table_name, id_column_name, index_name in _TABLES:
+        table = Table(table_name, meta, autoload=True)
+        Column('kind', String(length=20)).create(table)
+        _backfill_kind(migrate_engine, table, table.c[id_column_name])
+        Index(index_name, table.c.project_id, table.c.kind).create(
+            migrate_engine)
+
+
+def downgrade(migrate_engine):
+    for table_name, _id_column_name, index_name in _TABLES:
+        meta = MetaData(bind=migrate_engine)
+        table = Table(table_name, meta, autoload=True)
+        Index(index_name, table.c.project_id, table.c.kind).drop(
+            migrate_engine)
+        # NOTE(ft): reload the table to not recreate the dropped index
+        meta = MetaData(bind=migrate_engine)
+        table = Table(table_name, meta, autoload=True)
+        table.c.kind.drop()
@@ -0,0 +1,63 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+
+from migrate import changeset  # noqa
+from sqlalchemy import Boolean, CheckConstraint, Column, Index, MetaData
+from sqlalchemy import Table
+
+INDEX_NAME = 'items_kind_is_public_idx'
+
+
+def upgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    items = Table('items', meta, autoload=True)
+    Column('is_public', Boolean(create_constraint=False),
+           default=False).create(items)
+
+    # NOTE(ft): the LIKE preselection is case insensitive on supported
+    # backends, JSON decoding makes the final decision
+    candidates = migrate_engine.execute(
+        items.select().
+        with_only_columns([items.c.id, items.c.data]).
+        where(items.c.data.like('%"is_public": true%'))).fetchall()
+    public_ids = [row[0] for row in candidates
+                  if json.loads(row[1]).get('is_public')]
+    if public_ids:
+        migrate_engine.execute(
+            items.update().
+            where(items.c.id.in_(public_ids)).
+            values(is_public=True))
+    migrate_engine.execute(
+        items.update().
+        where(items.c.is_public.is_(None)).
+        values(is_public=False))
+
+    Index(INDEX_NAME, items.c.kind, items.c.is_public).create(migrate_engine)
+
+
+def downgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+    items = Table('items', meta, autoload=True)
+    Index(INDEX_NAME, items.c.kind, items.c.is_public).drop(migrate_engine)
+    # NOTE(ft): reload the table to not recreate the dropped index, and
+    # remove the CHECK constraint of the reflected boolean column, since SQLite
+    # recreates the table with all remaining constraints
+    meta = MetaData(bind=migrate_engine)
+    items = Table('items', meta, autoload=True)
+    for constraint in list(items.constraints):
+        if isinstance(constraint, CheckConstraint):
+            items.constraints.remove(constraint)
+    items.c.is_public.drop()
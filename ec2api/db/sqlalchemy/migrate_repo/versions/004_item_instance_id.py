@@ -0,0 +1,60 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+
+from migrate import changeset  # noqa
+from sqlalchemy import Column, Index, MetaData, String, Table
+from sqlalchemy.sql import bindparam
+
+INDEX_NAME = 'items_project_id_instance_id_idx'
+
+
+def upgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    items = Table('items', meta, autoload=True)
+    Column('instance_id', String(length=30)).create(items)
+
+    # NOTE(ft): the LIKE preselection is a hint only, JSON decoding makes the
+    # final decision
+    candidates = migrate_engine.execute(
+        items.select().
+        with_only_columns([items.c.id, items.c.data]).
+        where(items.c.data.like('%"instance_id"%'))).fetchall()
+    values = []
+    for item_id, data in candidates:
+        instance_id = json.loads(data).get('instance_id')
+        if instance_id:
+            values.append({'b_id': item_id,
+                           'b_instance_id': instance_id})
+    if values:
+        migrate_engine.execute(
+            items.update().
+            where(items.c.id == bindparam('b_id')).
+            values(instance_id=bindparam('b_instance_id')),
+            values)
+
+    Index(INDEX_NAME, items.c.project_id, items.c.instance_id).create(
+        migrate_engine)
+
+
+def downgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+    items = Table('items', meta, autoload=True)
+    Index(INDEX_NAME, items.c.project_id, items.c.instance_id).drop(
+        migrate_engine)
+    # NOTE(ft): reload the table to not recreate the dropped index
+    meta = MetaData(bind=migrate_engine)
+    items = Table('items', meta, autoload=True)
+    items.c.instance_id.drop()
@@ -0,0 +1,32 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from migrate import changeset  # noqa
+from sqlalchemy import Index, MetaData, Table
+
+INDEX_NAME = 'tags_project_id_key_idx'
+
+
+def upgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    # NOTE(ft): lookups by item id are served by the primary key, values are
+    # not indexed to keep the index within MySQL key length limits
+    tags = Table('tags', meta, autoload=True)
+    Index(INDEX_NAME, tags.c.project_id, tags.c.key).create(migrate_engine)
+
+
+def downgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+    tags = Table('tags', meta, autoload=True)
+    Index(INDEX_NAME, tags.c.project_id, tags.c.key).drop(migrate_engine)
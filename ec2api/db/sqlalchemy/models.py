@@ -18,12 +18,18 @@ SQLAlchemy models for ec2api data.
 
 from oslo_db.sqlalchemy import models
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, PrimaryKeyConstraint, String, Text
+from sqlalchemy import Boolean, Column, Index, PrimaryKeyConstraint, String
+from sqlalchemy import Text
 from sqlalchemy import UniqueConstraint
 
 BASE = declarative_base()
 
 ITEMS_OS_ID_INDEX_NAME = 'items_os_id_idx'
+ITEMS_PROJECT_KIND_INDEX_NAME = 'items_project_id_kind_idx'
+ITEMS_KIND_PUBLIC_INDEX_NAME = 'items_kind_is_public_idx'
+ITEMS_PROJECT_INSTANCE_INDEX_NAME = 'items_project_id_instance_id_idx'
+TAGS_PROJECT_KIND_INDEX_NAME = 'tags_project_id_kind_idx'
+TAGS_PROJECT_KEY_INDEX_NAME = 'tags_project_id_key_idx'
 
 
 class EC2Base(models.ModelBase):
@@ -43,11 +49,17 @@ class Item(BASE, EC2Base):
     __table_args__ = (
         PrimaryKeyConstraint('id'),
         UniqueConstraint('os_id', name=ITEMS_OS_ID_INDEX_NAME),
+        Index(ITEMS_PROJECT_KIND_INDEX_NAME, 'project_id', 'kind'),
+        Index(ITEMS_KIND_PUBLIC_INDEX_NAME, 'kind', 'is_public'),
+        Index(ITEMS_PROJECT_INSTANCE_INDEX_NAME, 'project_id', 'instance_id'),
     )
     id = Column(String(length=30))
     project_id = Column(String(length=64))
+    kind = Column(String(length=20))
     vpc_id = Column(String(length=12))
     os_id = Column(String(length=36))
+    is_public = Column(Boolean(create_constraint=False), default=False)
+    instance_id = Column(String(length=30))
     data = Column(Text())
 
 
@@ -55,8 +67,11 @@ class Tag(BASE, EC2Base):
     __tablename__ = 'tags'
     __table_args__ = (
         PrimaryKeyConstraint('project_id', 'item_id', 'key'),
+        Index(TAGS_PROJECT_KIND_INDEX_NAME, 'project_id', 'kind'),
+        Index(TAGS_PROJECT_KEY_INDEX_NAME, 'project_id', 'key'),
     )
     project_id = Column(String(length=64))
     item_id = Column(String(length=30))
+    kind = Column(String(length=20))
     key = Column(String(length=127))
     value = Column(String(length=255))
@@ -99,6 +99,10 @@ class EC2KeystoneDiscoverFailure(EC2APIException):
     msg_fmt = _("Could not discover keystone versions.")
 
 
+class EC2APIBackendTimeout(EC2APIException):
+    msg_fmt = _("Timed out waiting for %(source)s.")
+
+
 # Internal ec2api metadata exceptions
 
 class EC2MetadataException(EC2APIException):
@@ -227,6 +231,10 @@ class InvalidParameterCombination(EC2InvalidException):
     msg_fmt = _('The combination of parameters in incorrect')
 
 
+class InvalidPaginationToken(EC2InvalidException):
+    msg_fmt = _('The specified pagination token is not valid.')
+
+
 class InvalidVpcRange(EC2InvalidException):
     ec2_code = 'InvalidVpc.Range'
     msg_fmt = _("The CIDR '%(cidr_block)s' is invalid, kindly input a netmask between /16 and /28. "
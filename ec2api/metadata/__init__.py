@@ -86,10 +86,11 @@ class MetadataRequestHandler(wsgi.Application):
 
         try:
             if path_tokens[0] == 'openstack':
-                return self._proxy_request(req)
+                return self._call_with_reauth(self._proxy_request, req)
             elif path_tokens[0] == 'ec2':
                 path_tokens = path_tokens[1:]
-            resp = self._get_metadata(req, path_tokens)
+            resp = self._call_with_reauth(self._get_metadata, req,
+                                          path_tokens)
             return self._add_response_data(req.response, resp)
         except exception.EC2MetadataNotFound:
             return webob.exc.HTTPNotFound()
@@ -99,6 +100,9 @@ class MetadataRequestHandler(wsgi.Application):
                     'Please try your request again.')
             return webob.exc.HTTPInternalServerError(explanation=unicode(msg))
 
+    def _call_with_reauth(self, func, *args):
+        return ec2_context.call_with_os_admin_reauth(func, *args)
+
     def _proxy_request(self, req):
         headers = self._build_proxy_request_headers(req)
         nova_ip_port = '%s:%s' % (CONF.metadata.nova_metadata_ip,
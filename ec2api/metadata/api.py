@@ -16,8 +16,10 @@ import base64
 import itertools
 
 from novaclient import exceptions as nova_exception
+from oslo_config import cfg
 from oslo_log import log as logging
 
+from ec2api.api import catalog_cache
 from ec2api.api import clients
 from ec2api.api import ec2utils
 from ec2api.api import instance as instance_api
@@ -26,6 +28,35 @@ from ec2api.i18n import _
 
 LOG = logging.getLogger(__name__)
 
+metadata_cache_opts = [
+    cfg.IntOpt('cache_size',
+               default=1000,
+               help=_('Maximum number of instances to cache built metadata '
+                      'of.')),
+    cfg.IntOpt('cache_ttl',
+               default=15,
+               help=_('Time in seconds to cache built metadata of an '
+                      'instance. Zero disables the cache.')),
+    cfg.IntOpt('fixed_ip_cache_ttl',
+               default=30,
+               help=_('Time in seconds to cache instance and project of a '
+                      'fixed IP address. Zero disables the cache.')),
+    cfg.IntOpt('fixed_ip_negative_cache_ttl',
+               default=10,
+               help=_('Time in seconds to cache that a fixed IP address '
+                      'does not belong to any instance.')),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(metadata_cache_opts, group='metadata')
+
+_metadata_cache = catalog_cache.CatalogCache('metadata', 'cache_ttl',
+                                             size_option='cache_size',
+                                             group='metadata')
+_fixed_ip_cache = catalog_cache.CatalogCache(
+    'fixed_ips', 'fixed_ip_cache_ttl', size_option='cache_size',
+    group='metadata', negative_ttl_option='fixed_ip_negative_cache_ttl')
+
 VERSIONS = [
     '1.0',
     '2007-01-19',
@@ -68,6 +99,17 @@ def get_version_list():
 
 
 def get_os_instance_and_project_id(context, fixed_ip):
+    # NOTE(ft): unknown addresses are cached too, otherwise a misconfigured
+    # host polling the metadata service makes two Nova calls per request
+    ids = _fixed_ip_cache.get(
+        fixed_ip,
+        lambda: _find_os_instance_and_project_id(context, fixed_ip))
+    if ids is None:
+        raise exception.EC2MetadataNotFound()
+    return ids
+
+
+def _find_os_instance_and_project_id(context, fixed_ip):
     try:
         nova = clients.nova(context)
         os_address = nova.fixed_ips.get(fixed_ip)
@@ -81,7 +123,7 @@ def get_os_instance_and_project_id(context, fixed_ip):
                            for addr in itertools.chain(
                                 *os_instance.addresses.itervalues())))
     except (nova_exception.NotFound, StopIteration):
-        raise exception.EC2MetadataNotFound()
+        return None
 
 
 def get_metadata_item(context, path_tokens, os_instance_id, remote_ip):
@@ -91,6 +133,34 @@ def get_metadata_item(context, path_tokens, os_instance_id, remote_ip):
     elif version not in VERSIONS:
         raise exception.EC2MetadataNotFound()
 
+    # NOTE(ft): cloud-init requests dozens of paths at boot, so built
+    # metadata is cached for a short time. The key contains project_id to
+    # never return metadata cached for a request which passed the project
+    # check to a request which didn't.
+    cached_metadata = _metadata_cache.get(
+        (os_instance_id, context.project_id, remote_ip),
+        lambda: _build_cached_metadata(context, os_instance_id, remote_ip))
+    versions = cached_metadata['versions']
+    metadata = versions.get(version)
+    if metadata is None:
+        metadata = _cut_down_to_version(cached_metadata['metadata'], version)
+        versions[version] = metadata
+    metadata_item = _find_path_in_tree(metadata, path_tokens[1:])
+    return _format_metadata_item(metadata_item)
+
+
+def invalidate_metadata_cache():
+    _metadata_cache.invalidate()
+    _fixed_ip_cache.invalidate()
+
+
+def get_cache_stats():
+    """Return hit and miss counters of metadata service caches."""
+    return dict((cache.name, cache.get_stats())
+                for cache in (_metadata_cache, _fixed_ip_cache))
+
+
+def _build_cached_metadata(context, os_instance_id, remote_ip):
     ec2_instance, ec2_reservation = (
         _get_ec2_instance_and_reservation(context, os_instance_id))
     # NOTE(ft): check for case of Neutron metadata proxy.
@@ -104,10 +174,8 @@ def get_metadata_item(context, path_tokens, os_instance_id, remote_ip):
 
     metadata = _build_metadata(context, ec2_instance, ec2_reservation,
                                os_instance_id, remote_ip)
-    # TODO(ft): cache built metadata
-    metadata = _cut_down_to_version(metadata, version)
-    metadata_item = _find_path_in_tree(metadata, path_tokens[1:])
-    return _format_metadata_item(metadata_item)
+    return {'metadata': metadata,
+            'versions': {}}
 
 
 def _get_ec2_instance_and_reservation(context, os_instance_id):
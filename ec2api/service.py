@@ -165,6 +165,30 @@ class WSGIService(object):
         self.server.wait()
 
 
+class PeriodicService(service.Service):
+    """Runs a task in a green thread with a fixed interval."""
+
+    def __init__(self, name, task, interval, initial_delay=None):
+        super(PeriodicService, self).__init__()
+        self.name = name
+        self.task = task
+        self.interval = interval
+        self.initial_delay = initial_delay
+
+    def start(self):
+        super(PeriodicService, self).start()
+        self.tg.add_timer(self.interval, self._run_task,
+                          initial_delay=self.initial_delay)
+
+    def _run_task(self):
+        # NOTE(ft): an exception stops the looping call, so log it and wait
+        # for the next run
+        try:
+            self.task()
+        except Exception:
+            LOG.exception(_('%s periodic task failed'), self.name)
+
+
 # NOTE(vish): the global launcher is to maintain the existing
 #             functionality of calling service.serve +
 #             service.wait
@@ -23,6 +23,7 @@ from oslo_config import fixture as config_fixture
 from oslotest import base as test_base
 
 import ec2api.api.apirequest
+from ec2api.api import catalog_cache
 from ec2api.api import ec2utils
 import ec2api.db.sqlalchemy.api
 from ec2api.tests.unit import fakes
@@ -44,6 +45,8 @@ class ApiTestCase(test_base.BaseTestCase):
 
     def setUp(self):
         super(ApiTestCase, self).setUp()
+        catalog_cache.invalidate_all()
+        self.addCleanup(catalog_cache.invalidate_all)
 
         neutron_patcher = mock.patch('neutronclient.v2_0.client.Client',
                                      autospec=True)
@@ -110,8 +113,12 @@ class ApiTestCase(test_base.BaseTestCase):
             tools.get_db_api_get_item_by_id(*self._db_items))
         self.db_api.get_items_by_ids.side_effect = (
             tools.get_db_api_get_items_by_ids(*self._db_items))
+        self.db_api.get_items_by_instance_id.side_effect = (
+            tools.get_db_api_get_items_by_instance_id(*self._db_items))
         self.db_api.get_items_ids.side_effect = (
             tools.get_db_api_get_items_ids(*self._db_items))
+        self.db_api.get_items_page.side_effect = (
+            tools.get_db_api_get_items_page(*self._db_items))
 
     def add_mock_db_items(self, *items):
         merged_items = items + tuple(item for item in self._db_items
@@ -139,10 +146,12 @@ class ApiTestCase(test_base.BaseTestCase):
 
     def check_tag_support(self, operation, resultset_key, sample_item_id,
                           id_key, item_kinds=[]):
-        self.db_api.get_tags = tools.CopyingMock(
-            return_value=[{'item_id': sample_item_id,
-                           'key': 'fake_key',
-                           'value': 'fake_value'}])
+        tags = [{'item_id': sample_item_id,
+                 'key': 'fake_key',
+                 'value': 'fake_value'}]
+        self.db_api.get_tags = tools.CopyingMock(return_value=tags)
+        self.db_api.get_item_ids_by_tags.side_effect = (
+            tools.get_db_api_get_item_ids_by_tags(*tags))
         ec2_tags = [{'key': 'fake_key',
                      'value': 'fake_value'}]
 
@@ -603,3 +603,54 @@ class AddressTestCase(base.ApiTestCase):
                                                   fakes.IP_ADDRESS_2})
         self.assertThat(resp['addressesSet'],
                         matchers.ListMatches([fakes.EC2_ADDRESS_CLASSIC_2]))
+
+    @mock.patch('ec2api.api.router_ssh.have_routes')
+    def test_reconcile_addresses_status(self, have_routes):
+        pending_address = {'id': fakes.random_ec2_id('eipalloc'),
+                           'os_id': fakes.random_os_id(),
+                           'public_ip': '10.10.1.1',
+                           'network_interface_id': fakes.random_ec2_id('eni'),
+                           'private_ip_address': '10.0.0.1',
+                           'status': 'pending'}
+        active_address = {'id': fakes.random_ec2_id('eipalloc'),
+                          'os_id': fakes.random_os_id(),
+                          'public_ip': '10.10.1.2',
+                          'status': 'active'}
+        unused_address = {'id': fakes.random_ec2_id('eipalloc'),
+                          'os_id': fakes.random_os_id(),
+                          'public_ip': '10.10.1.3'}
+        # NOTE(ft): routes of associated active addresses are not checked
+        associated_address = tools.update_dict(
+            pending_address, {'id': fakes.random_ec2_id('eipalloc'),
+                              'public_ip': '10.10.1.4',
+                              'status': 'active'})
+        self.db_api.get_all_projects_items.return_value = {
+            'project1': [pending_address, unused_address],
+            'project2': [active_address, associated_address]}
+        self.set_mock_db_items(pending_address, active_address,
+                               unused_address, associated_address)
+        have_routes.side_effect = (
+            lambda public_ips: {ip: ip == '10.10.1.1' for ip in public_ips})
+
+        address.reconcile_addresses_status(self._create_context())
+        self.assertEqual(set(['10.10.1.1', '10.10.1.2']),
+                         set(ip for call in have_routes.call_args_list
+                             for ip in call[0][0]))
+        self.assertEqual(2, self.db_api.update_item.call_count)
+        self.db_api.update_item.assert_any_call(
+            mock.ANY, tools.update_dict(pending_address,
+                                        {'status': 'active'}))
+        self.db_api.update_item.assert_any_call(
+            mock.ANY, tools.purge_dict(active_address, ['status']))
+
+    def test_is_route_check_needed(self):
+        eni_id = fakes.random_ec2_id('eni')
+        self.assertTrue(address._is_route_check_needed(
+            {'status': 'pending', 'network_interface_id': eni_id}))
+        self.assertTrue(address._is_route_check_needed({'status': 'pending'}))
+        self.assertTrue(address._is_route_check_needed({'status': 'active'}))
+        self.assertTrue(address._is_route_check_needed(
+            {'network_interface_id': eni_id}))
+        self.assertFalse(address._is_route_check_needed(
+            {'status': 'active', 'network_interface_id': eni_id}))
+        self.assertFalse(address._is_route_check_needed({}))
@@ -105,6 +105,29 @@ class EC2RequesterTestCase(test_base.BaseTestCase):
         data = req._render_response(resp, 'uuid')
         self.assertIn('<utf8>&#40960;abcd&#1972;</utf8>', data)
 
+    def test_render_response_format(self):
+        req = apirequest.APIRequest("FakeAction", "FakeVersion", {})
+        resp = {
+            'itemSet': [{'flag': True,
+                         'text': 'a&b<c>"d\r\ne'}],
+            'emptySet': [],
+            'emptyText': '',
+            'none': None,
+        }
+        data = req._render_response(resp, 'uuid')
+        for line in ('<FakeActionResponse xmlns="http://vpc.ind-west-1.'
+                     'jiocloudservices.com/doc/FakeVersion/">\n',
+                     '  <requestId>uuid</requestId>\n',
+                     '  <itemSet>\n    <item>\n',
+                     '      <flag>true</flag>\n',
+                     '      <text>a&amp;b&lt;c&gt;"d\ne</text>\n',
+                     '    </item>\n  </itemSet>\n',
+                     '  <emptySet/>\n',
+                     '  <emptyText/>\n',
+                     '  <none/>\n'):
+            self.assertIn(line, data)
+        self.assertTrue(data.endswith('</FakeActionResponse>\n'))
+
     # Tests for individual data element format functions
 
     def test_return_valid_isoformat(self):
@@ -134,3 +157,16 @@ class EC2RequesterTestCase(test_base.BaseTestCase):
                               self.fake_context.request_id,
                               {},
                               result)
+
+    def test_xmlns_version_is_escaped(self):
+        self.controller.fake_action.return_value = True
+
+        api_request = apirequest.APIRequest('FakeAction',
+                                            u'2010"\'<&>\n\xe9', {})
+        result = api_request.invoke(self.fake_context)
+
+        self.assertIsInstance(result, str)
+        self.assertTrue(result.startswith(
+            '<FakeActionResponse xmlns="http://vpc.ind-west-1.'
+            'jiocloudservices.com/doc/2010&quot;\'&lt;&amp;&gt;&#10;&#233;/">'
+            '\n'))
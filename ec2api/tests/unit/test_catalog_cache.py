@@ -0,0 +1,95 @@
+# Copyright 2014
+# The Cloudscaling Group, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import eventlet
+import mock
+from oslo_config import fixture as config_fixture
+from oslotest import base as test_base
+
+from ec2api.api import catalog_cache
+
+
+class CatalogCacheTestCase(test_base.BaseTestCase):
+    class FakeException(Exception):
+        pass
+
+    def setUp(self):
+        super(CatalogCacheTestCase, self).setUp()
+        self.conf = self.useFixture(config_fixture.Config())
+        self.cache = catalog_cache.CatalogCache('fake', 'flavor_cache_ttl')
+
+    def test_get(self):
+        fetch = mock.Mock(return_value='fake_value')
+        self.assertEqual('fake_value', self.cache.get('key', fetch))
+        self.assertEqual('fake_value', self.cache.get('key', fetch))
+        fetch.assert_called_once_with()
+        self.assertEqual({'hits': 1, 'misses': 1, 'negative_hits': 0,
+                          'size': 1},
+                         self.cache.get_stats())
+
+        self.cache.invalidate('key')
+        self.cache.get('key', fetch)
+        self.assertEqual(2, fetch.call_count)
+
+        self.conf.config(flavor_cache_ttl=0)
+        self.cache.get('key', fetch)
+        self.assertEqual(2, fetch.call_count)
+        # NOTE(ft): full invalidation applies changed options
+        self.cache.invalidate()
+        self.cache.get('key', fetch)
+        self.cache.get('key', fetch)
+        self.assertEqual(4, fetch.call_count)
+
+    def test_get_concurrently(self):
+        fetch_count = []
+
+        def fetch():
+            fetch_count.append(True)
+            eventlet.sleep(0.01)
+            return 'fake_value'
+
+        pool = eventlet.GreenPool()
+        results = list(pool.imap(lambda _i: self.cache.get('key', fetch),
+                                 range(5)))
+        self.assertEqual(['fake_value'] * 5, results)
+        self.assertEqual(1, len(fetch_count))
+
+        fetch = mock.Mock(side_effect=[self.FakeException(),
+                                       'fake_value'])
+        self.assertRaises(self.FakeException,
+                          self.cache.get, 'other_key', fetch)
+        self.assertEqual('fake_value', self.cache.get('other_key', fetch))
+
+    def test_get_interrupted(self):
+        def interrupted_get():
+            with eventlet.Timeout(0.01, False):
+                self.cache.get('key', lambda: eventlet.sleep(1))
+
+        interrupted = eventlet.spawn(interrupted_get)
+        eventlet.sleep(0)
+        waiter = eventlet.spawn(self.cache.get, 'key',
+                                lambda: 'fake_value')
+        interrupted.wait()
+        self.assertEqual('fake_value', waiter.wait())
+        self.assertEqual({}, self.cache._fetches)
+        self.assertEqual('fake_value',
+                         self.cache.get('key', lambda: 'other_value'))
+
+    def test_get_stats(self):
+        catalog_cache.invalidate_all()
+        stats = catalog_cache.get_stats()
+        self.assertEqual(set(['flavors', 'availability_zones',
+                              'service_catalogs']),
+                         set(stats))
+        self.assertEqual(0, stats['flavors']['size'])
@@ -12,10 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import eventlet
 import mock
+from oslo_config import fixture as config_fixture
 from oslotest import base as test_base
 
 from ec2api.api import common
+from ec2api import exception
 
 
 class OnCrashCleanerTestCase(test_base.BaseTestCase):
@@ -134,6 +137,208 @@ class OnCrashCleanerTestCase(test_base.BaseTestCase):
              {'name': 'prop2', 'value': ['val-123']}])
         self.assertTrue(res)
 
+    def test_compiled_filters(self):
+        obj = common.TaggableItemsDescriber()
+        obj.FILTER_MAP = {'prop1': 'prop-1',
+                          'prop2': ('prop-2', 'sub'),
+                          'prop3': ['prop-3', 'sub'],
+                          'tag': 'tagSet'}
+        item = {'prop-1': 'val-0',
+                'prop-2': {'sub': 123},
+                'prop-3': [{'sub': 'val-1'}, {'sub': 'val-2'}],
+                'tagSet': [{'key': 'fake_key', 'value': 'fake_value'}]}
+
+        def check(filters, is_filtered_out):
+            compiled_filters = obj.compile_filters(filters)
+            self.assertIsInstance(compiled_filters, common.CompiledFilters)
+            self.assertEqual(is_filtered_out,
+                             obj.filtered_out(item, compiled_filters))
+
+        check([{'name': 'prop1', 'value': ['val-?']}], False)
+        check([{'name': 'prop1', 'value': ['val-[1-9]', 'v*']}], False)
+        check([{'name': 'prop1', 'value': ['val-[1-9]']}], True)
+        check([{'name': 'prop2', 'value': ['123']}], False)
+        check([{'name': 'prop2', 'value': ['12']}], True)
+        check([{'name': 'prop3', 'value': ['val-2']}], False)
+        check([{'name': 'prop3', 'value': ['val-3', '*-0']}], True)
+        check([{'name': 'tag',
+                'value': [{'key': 'fake_key', 'value': ['fake_*']}]}], False)
+        check([{'name': 'tag',
+                'value': [{'key': 'fake_*', 'value': ['fake_value']}]}],
+              True)
+        check([{'name': 'prop1', 'value': ['val-0']},
+               {'name': 'tag',
+                'value': [{'key': 'fake_key', 'value': ['other']}]}], True)
+        self.assertFalse(obj.filtered_out({}, obj.compile_filters(None)))
+        self.assertRaises(exception.InvalidParameterValue,
+                          obj.compile_filters,
+                          [{'name': 'fake', 'value': ['fake']}])
+
 
 def fake_standalone_crashed_clean_method():
     raise Exception()
+
+
+class FetchConcurrentlyTestCase(test_base.BaseTestCase):
+    class FakeException(Exception):
+        pass
+
+    def test_fetch_concurrently(self):
+        events = []
+
+        def source(name):
+            events.append(('start', name))
+            eventlet.sleep(0)
+            events.append(('end', name))
+            return name
+
+        results = common.fetch_concurrently({
+            'a': lambda: source('a'),
+            'b': lambda: source('b')})
+        self.assertEqual({'a': 'a', 'b': 'b'}, results)
+        # NOTE(ft): both sources are started before any of them is completed
+        self.assertEqual(set(['start']),
+                         set(event for event, _name in events[:2]))
+
+    def test_fetch_concurrently_failure(self):
+        completed = []
+
+        def fail():
+            raise self.FakeException()
+
+        def succeed():
+            eventlet.sleep(0)
+            completed.append(True)
+
+        self.assertRaises(self.FakeException, common.fetch_concurrently,
+                          {'a': fail, 'b': succeed})
+        self.assertEqual([True], completed)
+
+    def test_fetch_concurrently_timeout(self):
+        self.assertRaises(exception.EC2APIBackendTimeout,
+                          common.fetch_concurrently,
+                          {'a': (lambda: eventlet.sleep(1), 0.01),
+                           'b': lambda: None})
+        self.assertEqual({'a': None},
+                         common.fetch_concurrently(
+                             {'a': (lambda: eventlet.sleep(0.01), 0)}))
+
+    def test_describer_sources(self):
+        describer = common.UniversalDescriber()
+        describer.get_sources = mock.Mock(return_value={
+            'os_items': lambda: ['fake_os_item']})
+        describer.fetch_sources()
+        self.assertEqual(['fake_os_item'], describer.os_items)
+
+
+class PlanFiltersTestCase(test_base.BaseTestCase):
+
+    def test_plan_filters(self):
+        class FakeDescriber(common.UniversalDescriber):
+            FILTER_MAP = {'fake-id': 'fakeId',
+                          'vpc-id': 'vpcId',
+                          'cidr': 'cidrBlock',
+                          'state': 'state'}
+            DB_FILTER_MAP = {'fake-id': 'id',
+                             'vpc-id': 'vpc_id'}
+            OS_FILTER_MAP = {'cidr': 'cidr'}
+
+        describer = FakeDescriber()
+        describer.selective_describe = False
+        filters = [{'name': 'fake-id', 'value': ['fake-1*', 'fake-2']},
+                   {'name': 'vpc-id', 'value': ['vpc-[12]']},
+                   {'name': 'cidr', 'value': ['10.0.0.0/24']},
+                   {'name': 'cidr', 'value': ['10.0.1.0/24']},
+                   {'name': 'state', 'value': ['available']}]
+        # NOTE(ft): pushed down filters are evaluated on formatted items too
+        self.assertEqual(filters, describer.plan_filters(filters))
+        self.assertEqual({'id': ['fake-1*', 'fake-2']}, describer.db_filters)
+        self.assertEqual({'cidr': ['10.0.0.0/24']}, describer.os_filters)
+
+        wildcard_filters = [{'name': 'cidr', 'value': ['10.0.0.*']}]
+        self.assertEqual(wildcard_filters,
+                         describer.plan_filters(wildcard_filters))
+        self.assertEqual({}, describer.os_filters)
+
+        describer.selective_describe = True
+        self.assertEqual(filters, describer.plan_filters(filters))
+        self.assertEqual({}, describer.db_filters)
+        self.assertEqual({}, describer.os_filters)
+
+    @mock.patch('ec2api.db.api.get_item_ids_by_tags')
+    def test_plan_tag_filters(self, get_item_ids_by_tags):
+        class FakeDescriber(common.TaggableItemsDescriber):
+            KIND = 'fake'
+            FILTER_MAP = {'fake-id': 'fakeId'}
+            DB_FILTER_MAP = {'fake-id': 'id'}
+
+        describer = FakeDescriber()
+        describer.context = 'fake_context'
+        describer.selective_describe = False
+        get_item_ids_by_tags.return_value = set(['fake-2', 'fake-1',
+                                                 'other-1'])
+        tag_filters = [{'name': 'tag',
+                        'value': [{'key': 'Name', 'value': ['web*']}]},
+                       {'name': 'tag-key', 'value': ['env']},
+                       {'name': 'tag-value', 'value': ['prod', 'dev']}]
+        other_filters = [
+            {'name': 'tag', 'value': [{'key': 'N*', 'value': ['web']}]},
+            {'name': 'tag-value', 'value': ['[pd]*']}]
+        filters = ([{'name': 'fake-id', 'value': ['fake-*']}] +
+                   tag_filters + other_filters)
+        self.assertEqual(filters, describer.plan_filters(filters))
+        get_item_ids_by_tags.assert_called_once_with(
+            'fake_context', ('fake',),
+            [{'key': ['Name'], 'value': ['web*']},
+             {'key': ['env']},
+             {'value': ['prod', 'dev']}])
+        self.assertEqual({'id': ['fake-1', 'fake-2']}, describer.db_filters)
+
+        get_item_ids_by_tags.reset_mock()
+        describer.get_db_items = mock.Mock()
+        self.assertEqual(tag_filters, describer.plan_filters(tag_filters))
+        self.assertFalse(get_item_ids_by_tags.called)
+
+
+class NextTokenTestCase(test_base.BaseTestCase):
+
+    def setUp(self):
+        super(NextTokenTestCase, self).setUp()
+        self.context = mock.Mock(project_id='fake_project_id')
+
+    def test_next_token(self):
+        token = common.encode_next_token(self.context, 'i', 'i-12345678')
+        self.assertEqual('i-12345678',
+                         common.decode_next_token(self.context, 'i', token))
+
+        def check_invalid(token, context=self.context, kind='i'):
+            self.assertRaises(exception.InvalidPaginationToken,
+                              common.decode_next_token, context, kind, token)
+
+        payload, signature = token.rsplit('.', 1)
+        check_invalid('%s.%s' % (payload, signature[::-1]))
+        check_invalid(common.encode_next_token(self.context, 'i',
+                                               'i-87654321')[:-1])
+        check_invalid('garbage')
+        check_invalid(token, kind='vol')
+        check_invalid(token,
+                      context=mock.Mock(project_id='other_project_id'))
+
+    def test_next_token_key(self):
+        conf = self.useFixture(config_fixture.Config())
+        conf.config(connection='fake_connection', group='database')
+        conf.config(admin_password='fake_password')
+        token = common.encode_next_token(self.context, 'i', 'i-12345678')
+        # NOTE(ft): the derived key is the same in every API worker
+        self.assertEqual(token, common.encode_next_token(self.context, 'i',
+                                                         'i-12345678'))
+
+        conf.config(connection='other_connection', group='database')
+        self.assertRaises(exception.InvalidPaginationToken,
+                          common.decode_next_token, self.context, 'i', token)
+
+        conf.config(next_token_secret='fake_secret')
+        token = common.encode_next_token(self.context, 'i', 'i-12345678')
+        conf.config(connection='fake_connection', group='database')
+        self.assertEqual('i-12345678',
+                         common.decode_next_token(self.context, 'i', token))
@@ -12,6 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import datetime
+
+import eventlet
 from keystoneclient.v2_0 import client as keystone_client_v2
 from keystoneclient.v3 import client as keystone_client_v3
 import mock
@@ -33,6 +36,14 @@ class ContextTestCase(test_base.BaseTestCase):
         conf.config(admin_user='admin',
                     admin_password='password',
                     admin_tenant_name='service')
+        ec2_context._os_admin_auth = None
+        self.addCleanup(setattr, ec2_context, '_os_admin_auth', None)
+        self.addCleanup(setattr, ec2_context, '_keystone_client_class', None)
+        self.addCleanup(self._drop_local_context)
+
+    def _drop_local_context(self):
+        if hasattr(ec2_context.local.store, 'context'):
+            del ec2_context.local.store.context
 
     @mock.patch('keystoneclient.v2_0.client.Client')
     def test_get_os_admin_context(self, keystone):
@@ -65,6 +76,98 @@ class ContextTestCase(test_base.BaseTestCase):
         self.assertEqual(context, ec2_context.get_os_admin_context())
         self.assertFalse(keystone.called)
 
+    def test_get_os_admin_context_token_reuse(self):
+        expires = [datetime.datetime.utcnow() + datetime.timedelta(hours=1)]
+
+        def authenticate(**kwargs):
+            token = 'fake_token_%s' % keystone_class.call_count
+            eventlet.sleep(0.01)
+            return mock.Mock(
+                auth_user_id='fake_user_id',
+                auth_tenant_id='fake_project_id',
+                auth_token=token,
+                auth_ref=mock.Mock(expires=expires[0]))
+
+        keystone_class = mock.Mock(side_effect=authenticate)
+        ec2_context._keystone_client_class = keystone_class
+
+        def get_token():
+            self._drop_local_context()
+            return ec2_context.get_os_admin_context().auth_token
+
+        # NOTE(ft): concurrent callers share one authentication
+        pool = eventlet.GreenPool()
+        tokens = list(pool.imap(lambda _i: get_token(), range(3)))
+        self.assertEqual(['fake_token_1'] * 3, tokens)
+        self.assertEqual('fake_token_1', get_token())
+        self.assertEqual(1, keystone_class.call_count)
+
+        ec2_context.reset_os_admin_auth()
+        self.assertEqual('fake_token_2', get_token())
+
+        # NOTE(ft): the token is refreshed before its expiration
+        expires[0] = datetime.datetime.utcnow() + datetime.timedelta(
+            seconds=60)
+        ec2_context.reset_os_admin_auth()
+        self.assertEqual('fake_token_3', get_token())
+        self.assertEqual('fake_token_4', get_token())
+
+    def test_get_os_admin_context_interrupted(self):
+        def authenticate(**kwargs):
+            if keystone_class.call_count == 1:
+                eventlet.sleep(1)
+            return mock.Mock(
+                auth_user_id='fake_user_id',
+                auth_tenant_id='fake_project_id',
+                auth_token='fake_token',
+                auth_ref=mock.Mock(expires=datetime.datetime.utcnow() +
+                                   datetime.timedelta(hours=1)))
+
+        keystone_class = mock.Mock(side_effect=authenticate)
+        ec2_context._keystone_client_class = keystone_class
+
+        def interrupted_get():
+            with eventlet.Timeout(0.01, False):
+                ec2_context.get_os_admin_context()
+
+        interrupted = eventlet.spawn(interrupted_get)
+        eventlet.sleep(0)
+        waiter = eventlet.spawn(ec2_context.get_os_admin_context)
+        interrupted.wait()
+        self.assertEqual('fake_token', waiter.wait().auth_token)
+        self.assertIsNone(ec2_context._os_admin_auth_fetch)
+        self.assertEqual(2, keystone_class.call_count)
+
+    @mock.patch('ec2api.context.reset_os_admin_auth')
+    def test_call_with_os_admin_reauth(self, reset_auth):
+        unauthorized = exception.EC2APIException()
+        unauthorized.code = 401
+        func = mock.Mock(side_effect=[unauthorized, 'fake'])
+        self.assertEqual('fake', ec2_context.call_with_os_admin_reauth(
+            func, 'fake_arg', kwarg='fake_kwarg'))
+        self.assertEqual([mock.call('fake_arg', kwarg='fake_kwarg')] * 2,
+                         func.mock_calls)
+        reset_auth.assert_called_once_with()
+
+        reset_auth.reset_mock()
+        func = mock.Mock(side_effect=[unauthorized, unauthorized])
+        self.assertRaises(exception.EC2APIException,
+                          ec2_context.call_with_os_admin_reauth, func)
+        self.assertEqual(2, func.call_count)
+
+        reset_auth.reset_mock()
+        func = mock.Mock(side_effect=exception.Unsupported())
+        self.assertRaises(exception.Unsupported,
+                          ec2_context.call_with_os_admin_reauth, func)
+        self.assertFalse(reset_auth.called)
+
+    def test_is_unauthorized_error(self):
+        self.assertTrue(ec2_context.is_unauthorized_error(
+            mock.Mock(http_status=401)))
+        self.assertTrue(ec2_context.is_unauthorized_error(
+            mock.Mock(spec=['code'], code=401)))
+        self.assertFalse(ec2_context.is_unauthorized_error(Exception()))
+
     @mock.patch('keystoneclient.client.Client')
     def test_get_keystone_client_class(self, client):
         client.return_value = mock.MagicMock(spec=keystone_client_v2.Client)
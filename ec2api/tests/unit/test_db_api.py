@@ -12,9 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
+
+import mock
 from oslo_config import cfg
+from oslo_config import fixture as config_fixture
 from oslotest import base as test_base
 from sqlalchemy.orm import exc as orm_exception
+import testtools
 
 from ec2api.api import validator
 from ec2api import config
@@ -22,6 +27,8 @@ from ec2api import context as ec2_context
 from ec2api.db import api as db_api
 from ec2api.db import migration
 from ec2api.db.sqlalchemy import api as session
+from ec2api.db.sqlalchemy import codec
+from ec2api.db.sqlalchemy import models
 from ec2api.tests.unit import fakes
 from ec2api.tests.unit import matchers
 
@@ -301,6 +308,186 @@ class DbApiTestCase(test_base.BaseTestCase):
         items = db_api.get_public_items(self.context, 'fake0', [])
         self.assertEqual(0, len(items))
 
+    def test_get_all_projects_items(self):
+        self._setup_items()
+        items = db_api.get_all_projects_items(self.context, 'fake')
+        self.assertEqual(
+            set([self.context.project_id, self.other_context.project_id]),
+            set(items))
+        self.assertEqual(2, len(items[self.context.project_id]))
+        self.assertEqual(3, len(items[self.other_context.project_id]))
+        self.assertEqual({}, db_api.get_all_projects_items(self.context,
+                                                           'fake0'))
+
+    def test_get_public_items_after_update(self):
+        item = db_api.add_item(self.context, 'fake', {'is_public': False})
+        self.assertEqual(0, len(db_api.get_public_items(self.context,
+                                                        'fake')))
+        item['is_public'] = True
+        db_api.update_item(self.context, item)
+        items = db_api.get_public_items(self.context, 'fake')
+        self.assertEqual(1, len(items))
+        self.assertTrue(items[0]['is_public'])
+        item.pop('is_public')
+        db_api.update_item(self.context, item)
+        self.assertEqual(0, len(db_api.get_public_items(self.context,
+                                                        'fake')))
+
+    def test_get_items_by_instance_id(self):
+        instance_id = fakes.random_ec2_id('i')
+        item = db_api.add_item(self.context, 'fake',
+                               {'instance_id': instance_id})
+        db_api.add_item(self.context, 'fake', {})
+        db_api.add_item(self.context, 'fake1', {'instance_id': instance_id})
+        db_api.add_item(self.other_context, 'fake',
+                        {'instance_id': instance_id})
+
+        items = db_api.get_items_by_instance_id(self.context, 'fake',
+                                                instance_id)
+        self.assertThat(items, matchers.ListMatches([item]))
+
+        item.pop('instance_id')
+        db_api.update_item(self.context, item)
+        self.assertEqual([], db_api.get_items_by_instance_id(
+            self.context, 'fake', instance_id))
+
+    def test_get_items_page(self):
+        items = sorted((db_api.add_item(self.context, 'fake', {})
+                        for _i in range(5)),
+                       key=lambda i: i['id'])
+        db_api.add_item(self.context, 'fake1', {})
+        db_api.add_item(self.other_context, 'fake', {})
+
+        page = db_api.get_items_page(self.context, 'fake', limit=2)
+        self.assertThat(page, matchers.ListMatches(items[:2]))
+        page = db_api.get_items_page(self.context, 'fake',
+                                     marker=items[1]['id'], limit=2)
+        self.assertThat(page, matchers.ListMatches(items[2:4]))
+        page = db_api.get_items_page(self.context, 'fake',
+                                     marker=items[3]['id'])
+        self.assertThat(page, matchers.ListMatches(items[4:]))
+
+    def test_get_items_page_filters(self):
+        vpc_id = fakes.random_ec2_id('vpc')
+        item1 = db_api.add_item(self.context, 'fake',
+                                {'vpc_id': vpc_id, 'os_id': 'os_1'})
+        item2 = db_api.add_item(self.context, 'fake',
+                                {'vpc_id': vpc_id, 'os_id': 'os%2'})
+        db_api.add_item(self.context, 'fake', {'os_id': 'os_3'})
+
+        def check(filters, expected):
+            page = db_api.get_items_page(self.context, 'fake',
+                                         filters=filters)
+            self.assertThat(page, matchers.ListMatches(
+                expected, orderless_lists=True))
+
+        check({'vpc_id': [vpc_id]}, [item1, item2])
+        check({'vpc_id': [vpc_id], 'os_id': ['os_1', 'fake']}, [item1])
+        check({'id': [item2['id'][:-1] + '?']}, [item2])
+        check({'os_id': ['*%*']}, [item2])
+        check({'os_id': ['os_?'], 'vpc_id': ['vpc-*']}, [item1])
+        self.assertRaises(ValueError, db_api.get_items_page,
+                          self.context, 'fake', filters={'data': ['*']})
+
+    @testtools.skipIf(codec.msgpack is None, 'msgpack is not installed')
+    def test_item_data_codec(self):
+        conf = self.useFixture(config_fixture.Config())
+        data = {'str_attr': 'fake_str',
+                'int_attr': 1234,
+                'dict_attr': {'key': [True, None, 'val']}}
+        json_item = db_api.add_item(self.context, 'fake',
+                                    dict(data, os_id=fakes.random_os_id()))
+        conf.config(item_data_codec='msgpack', group='database')
+        msgpack_item = db_api.add_item(self.context, 'fake',
+                                       dict(data, os_id=fakes.random_os_id()))
+
+        encoded_data = dict(session.model_query(self.context, models.Item.id,
+                                                models.Item.data).all())
+        self.assertTrue(encoded_data[json_item['id']].startswith('{'))
+        self.assertTrue(
+            encoded_data[msgpack_item['id']].startswith('msgpack:1:'))
+        for codec_name in ('msgpack', 'json'):
+            conf.config(item_data_codec=codec_name, group='database')
+            self.assertThat(db_api.get_items(self.context, 'fake'),
+                            matchers.ListMatches([json_item, msgpack_item],
+                                                 orderless_lists=True))
+        self.assertRaises(ValueError, codec.decode, 'fake:1:{}')
+
+    def test_item_data_codec_without_msgpack(self):
+        with mock.patch.object(codec, 'msgpack', None):
+            self.assertRaises(RuntimeError, codec.decode, 'msgpack:1:gA==')
+            conf = self.useFixture(config_fixture.Config())
+            conf.config(item_data_codec='msgpack', group='database')
+            self.assertRaises(RuntimeError, codec.encode, {})
+
+    def test_lazy_item_data(self):
+        item = db_api.add_item(self.context, 'fake',
+                               {'os_id': fakes.random_os_id(),
+                                'attr': 'fake'}).copy()
+        with mock.patch('ec2api.db.sqlalchemy.codec.decode',
+                        wraps=codec.decode) as decode:
+            db_item = db_api.get_item_by_id(self.context, item['id'])
+            self.assertEqual((item['id'], item['os_id'], None),
+                             (db_item['id'], db_item['os_id'],
+                              db_item['vpc_id']))
+            copied_item = copy.deepcopy(db_item)
+            self.assertFalse(decode.called)
+
+            self.assertEqual('fake', db_item['attr'])
+            self.assertIn('attr', db_item.keys())
+            self.assertEqual(1, decode.call_count)
+            self.assertThat(copied_item, matchers.DictMatches(item))
+            self.assertEqual(2, decode.call_count)
+
+            db_item = db_api.get_item_by_id(self.context, item['id'])
+            self.assertEqual(item, dict(db_item))
+            db_item = db_api.get_item_by_id(self.context, item['id'])
+            self.assertEqual(item, dict(**db_item))
+            plain_item = {}
+            plain_item.update(db_api.get_item_by_id(self.context,
+                                                    item['id']))
+            self.assertEqual(item, plain_item)
+
+            db_item = db_api.get_item_by_id(self.context, item['id'])
+            db_item['vpc_id'] = fakes.random_ec2_id('vpc')
+            db_api.update_item(self.context, db_item)
+            self.assertThat(db_api.get_item_by_id(self.context, item['id']),
+                            matchers.DictMatches(db_item))
+
+    def test_item_cache(self):
+        self._setup_items()
+        self.context.item_cache = db_api.ItemCache()
+        items = db_api.get_items(self.context, 'fake')
+        self.assertEqual(2, len(items))
+        item_id = items[0]['id']
+        absent_item_id = fakes.random_ec2_id('fake')
+
+        with mock.patch.object(db_api, 'IMPL') as impl:
+            self.assertThat(db_api.get_items(self.context, 'fake'),
+                            matchers.ListMatches(items, orderless_lists=True))
+            item = db_api.get_item_by_id(self.context, item_id)
+            self.assertThat(item, matchers.DictMatches(items[0]))
+            self.assertIsNone(db_api.get_item_by_id(self.context,
+                                                    absent_item_id))
+            self.assertEqual(
+                [item],
+                db_api.get_items_by_ids(self.context,
+                                        (item_id, absent_item_id)))
+            self.assertFalse(impl.mock_calls)
+
+            item['vpc_id'] = fakes.random_ec2_id('vpc')
+            self.assertIsNone(
+                db_api.get_item_by_id(self.context, item_id)['vpc_id'])
+
+        item['vpc_id'] = fakes.ID_EC2_VPC_1
+        db_api.update_item(self.context, item)
+        self.assertEqual(
+            fakes.ID_EC2_VPC_1,
+            db_api.get_item_by_id(self.context, item_id)['vpc_id'])
+        db_api.delete_item(self.context, item_id)
+        self.assertIsNone(db_api.get_item_by_id(self.context, item_id))
+        self.assertEqual(1, len(db_api.get_items(self.context, 'fake')))
+
     def test_add_tags(self):
         item1_id = fakes.random_ec2_id('fake')
         item2_id = fakes.random_ec2_id('fake')
@@ -340,6 +527,84 @@ class DbApiTestCase(test_base.BaseTestCase):
                                               tag3_1, tag3_3],
                                              orderless_lists=True))
 
+    def test_add_tags_upsert(self):
+        item_id = fakes.random_ec2_id('fake')
+
+        def check_add_tags(new_value):
+            db_api.add_tags(self.context,
+                            [{'item_id': item_id, 'key': 'key1',
+                              'value': 'old_val'},
+                             {'item_id': item_id, 'key': 'key2',
+                              'value': 'val'},
+                             {'item_id': item_id, 'key': 'key1',
+                              'value': new_value}])
+            self.assertThat(db_api.get_tags(self.context),
+                            matchers.ListMatches(
+                                [{'item_id': item_id, 'key': 'key1',
+                                  'value': new_value},
+                                 {'item_id': item_id, 'key': 'key2',
+                                  'value': 'val'}],
+                                orderless_lists=True))
+
+        check_add_tags('val1')
+        # NOTE(ft): check the portable path for dialects without upsert
+        with mock.patch('ec2api.db.sqlalchemy.api.'
+                        '_get_tags_upsert_statement', return_value=None):
+            check_add_tags('val2')
+        db_api.add_tags(self.context, [])
+
+    def test_get_tags_page(self):
+        item1_id = fakes.random_ec2_id('fake')
+        item2_id = fakes.random_ec2_id('fake')
+        if item1_id > item2_id:
+            item1_id, item2_id = item2_id, item1_id
+        tags = [{'item_id': item_id, 'key': key, 'value': 'val'}
+                for item_id in (item1_id, item2_id)
+                for key in ('key1', 'key2')]
+        db_api.add_tags(self.context, tags)
+        db_api.add_tags(self.other_context, tags)
+
+        self.assertThat(db_api.get_tags_page(self.context, limit=3),
+                        matchers.ListMatches(tags[:3]))
+        self.assertThat(db_api.get_tags_page(self.context,
+                                             marker=[item1_id, 'key2']),
+                        matchers.ListMatches(tags[2:]))
+        self.assertThat(db_api.get_tags_page(self.context,
+                                             filters={'key': ['*2'],
+                                                      'kind': ['fake']}),
+                        matchers.ListMatches([tags[1], tags[3]]))
+        self.assertEqual([], db_api.get_tags_page(self.context,
+                                                  filters={'item_id': []}))
+
+    def test_get_item_ids_by_tags(self):
+        item1_id = fakes.random_ec2_id('fake')
+        item2_id = fakes.random_ec2_id('fake')
+        item3_id = fakes.random_ec2_id('fake1')
+        db_api.add_tags(self.context, [
+            {'item_id': item1_id, 'key': 'Name', 'value': 'web-1'},
+            {'item_id': item1_id, 'key': 'env', 'value': 'prod'},
+            {'item_id': item2_id, 'key': 'Name', 'value': 'db-1'},
+            {'item_id': item2_id, 'key': 'env', 'value': 'prod'},
+            {'item_id': item3_id, 'key': 'Name', 'value': 'web-2'}])
+        db_api.add_tags(self.other_context, [
+            {'item_id': fakes.random_ec2_id('fake'), 'key': 'Name',
+             'value': 'web-3'}])
+
+        def check(kinds, tag_filters, expected):
+            self.assertEqual(set(expected),
+                             db_api.get_item_ids_by_tags(
+                                 self.context, kinds, tag_filters))
+
+        check(('fake',), [{'key': ['Name'], 'value': ['web-*']}], [item1_id])
+        check(('fake', 'fake1'), [{'key': ['Name'], 'value': ['web-?']}],
+              [item1_id, item3_id])
+        check(None, [{'key': ['env']}], [item1_id, item2_id])
+        check(('fake',), [{'value': ['prod']},
+                          {'key': ['Name'], 'value': ['db-1']}], [item2_id])
+        # NOTE(ft): every filter must be matched by one tag
+        check(('fake',), [{'key': ['Name'], 'value': ['prod']}], [])
+        check(('fake',), [{'key': ['fake']}], [])
+
     def test_add_tags_isolation(self):
         item_id = fakes.random_ec2_id('fake')
         tag1 = {'item_id': item_id,
@@ -543,6 +543,27 @@ class InstanceTestCase(base.ApiTestCase):
                                     {'ImageId': fakes.ID_EC2_IMAGE_1,
                                      'MinCount': '2', 'MaxCount': '1'})
 
+    def test_get_os_flavor_by_name(self):
+        context = self._create_context()
+        self.assertEqual(
+            self.fake_flavor,
+            instance_api._get_os_flavor_by_name(context, 'fake_flavor'))
+        self.assertEqual(1, self.nova.flavors.list.call_count)
+
+        # NOTE(ft): a flavor created after the list was cached is found
+        new_flavor = mock.Mock()
+        new_flavor.configure_mock(name='new_flavor', id='newFlavorId')
+        self.nova.flavors.list.return_value = [self.fake_flavor, new_flavor]
+        self.assertEqual(
+            new_flavor,
+            instance_api._get_os_flavor_by_name(context, 'new_flavor'))
+        self.assertEqual(2, self.nova.flavors.list.call_count)
+
+        self.assertRaises(exception.InvalidParameterValue,
+                          instance_api._get_os_flavor_by_name,
+                          context, 'unknown_flavor')
+        self.assertEqual(3, self.nova.flavors.list.call_count)
+
     @mock.patch.object(fakes.OSInstance, 'delete', autospec=True)
     @mock.patch.object(fakes.OSInstance, 'get', autospec=True)
     def test_terminate_instances(self, os_instance_get, os_instance_delete):
@@ -735,10 +756,16 @@ class InstanceTestCase(base.ApiTestCase):
         self.assertThat(resp, matchers.DictMatches(
             {'reservationSet': [fakes.EC2_RESERVATION_1]},
             orderless_lists=True))
-        self.db_api.get_items_by_ids.assert_called_once_with(
+        self.db_api.get_items_by_ids.assert_any_call(
             mock.ANY, set([fakes.ID_EC2_INSTANCE_1]))
+        # NOTE(ft): a few instances are described by their ids
+        self.nova_admin.servers.get.assert_called_once_with(
+            fakes.ID_OS_INSTANCE_1)
+        self.assertEqual(1, self.nova_admin.servers.list.call_count)
         (self.network_interface_api.describe_network_interfaces.
-         assert_called_with(mock.ANY))
+         assert_called_with(
+             mock.ANY,
+             network_interface_id=[fakes.ID_EC2_NETWORK_INTERFACE_2]))
 
         self.check_filtering(
             'DescribeInstances', 'reservationSet',
@@ -956,6 +983,11 @@ class InstanceTestCase(base.ApiTestCase):
             {'InstanceId.1': fakes.ID_EC2_INSTANCE_2,
              'InstanceId.2': fakes.random_ec2_id('i')})
 
+        self.assert_execution_error(
+            'InvalidParameterCombination', 'DescribeInstances',
+            {'InstanceId.1': fakes.ID_EC2_INSTANCE_2,
+             'MaxResults': '5'})
+
     def test_describe_instance_attributes(self):
         self.set_mock_db_items(fakes.DB_INSTANCE_1, fakes.DB_INSTANCE_2,
                                fakes.DB_IMAGE_ARI_1, fakes.DB_IMAGE_AKI_1,
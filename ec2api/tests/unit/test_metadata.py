@@ -40,6 +40,8 @@ class ProxyTestCase(test_base.BaseTestCase):
                     nova_client_cert='nova_cert',
                     nova_client_priv_key='nova_priv_key',
                     metadata_proxy_shared_secret='secret')
+        metadata.api.invalidate_metadata_cache()
+        self.addCleanup(metadata.api.invalidate_metadata_cache)
 
     @mock.patch('ec2api.metadata.api.get_version_list')
     def test_callable(self, get_version_list):
@@ -85,6 +87,18 @@ class ProxyTestCase(test_base.BaseTestCase):
             self.assertEqual(500, response.status_int)
             self.assertEqual(len(log.mock_calls), 2)
 
+    @mock.patch('ec2api.context.reset_os_admin_auth')
+    @mock.patch.object(metadata.MetadataRequestHandler, '_get_metadata')
+    def test_reauth_on_unauthorized(self, get_metadata, reset_auth):
+        unauthorized = Exception()
+        unauthorized.code = 401
+        get_metadata.side_effect = [unauthorized, 'fake']
+        request = webob.Request.blank('/latest')
+        response = request.get_response(self.handler)
+        self.assertEqual('fake', response.body)
+        self.assertEqual(2, get_metadata.call_count)
+        reset_auth.assert_called_once_with()
+
     @mock.patch('ec2api.metadata.api.get_metadata_item')
     @mock.patch('ec2api.metadata.api.get_os_instance_and_project_id')
     @mock.patch.object(metadata.MetadataRequestHandler, '_get_remote_ip')
@@ -44,6 +44,8 @@ class MetadataApiTestCase(base.ApiTestCase):
                 'userData': {'value': base64.b64encode('fake_user_data')}}
 
         self.fake_context = self._create_context()
+        api.invalidate_metadata_cache()
+        self.addCleanup(api.invalidate_metadata_cache)
 
     def test_get_version_list(self):
         retval = api.get_version_list()
@@ -65,6 +67,7 @@ class MetadataApiTestCase(base.ApiTestCase):
                              'all_tenants': True})
 
         def check_raise():
+            api.invalidate_metadata_cache()
             self.assertRaises(exception.EC2MetadataNotFound,
                               api.get_os_instance_and_project_id,
                               self.fake_context,
@@ -80,6 +83,40 @@ class MetadataApiTestCase(base.ApiTestCase):
             fakes.OSInstance(fakes.OS_INSTANCE_2)]
         check_raise()
 
+    def test_get_instance_and_project_id_cache(self):
+        stats = api.get_cache_stats()['fixed_ips']
+        self.nova.servers.list.return_value = [
+            fakes.OSInstance(fakes.OS_INSTANCE_1)]
+        self.nova.fixed_ips.get.return_value = mock.Mock(hostname='fake_name')
+        for _i in range(3):
+            self.assertEqual(
+                (fakes.ID_OS_INSTANCE_1, fakes.ID_OS_PROJECT),
+                api.get_os_instance_and_project_id(
+                    self.fake_context, fakes.IP_NETWORK_INTERFACE_2))
+        self.assertEqual(1, self.nova.fixed_ips.get.call_count)
+        self.assertEqual(1, self.nova.servers.list.call_count)
+
+        self.nova.fixed_ips.get.side_effect = nova_exception.NotFound('fake')
+        for _i in range(3):
+            self.assertRaises(exception.EC2MetadataNotFound,
+                              api.get_os_instance_and_project_id,
+                              self.fake_context, '10.99.99.99')
+        self.assertEqual(2, self.nova.fixed_ips.get.call_count)
+        new_stats = api.get_cache_stats()['fixed_ips']
+        self.assertEqual(4, new_stats['hits'] - stats['hits'])
+        self.assertEqual(2, new_stats['misses'] - stats['misses'])
+        self.assertEqual(2, new_stats['negative_hits'] -
+                         stats['negative_hits'])
+        self.assertEqual(2, new_stats['size'])
+
+        self.configure(group='metadata', fixed_ip_negative_cache_ttl=0)
+        api.invalidate_metadata_cache()
+        for _i in range(2):
+            self.assertRaises(exception.EC2MetadataNotFound,
+                              api.get_os_instance_and_project_id,
+                              self.fake_context, '10.99.99.99')
+        self.assertEqual(4, self.nova.fixed_ips.get.call_count)
+
     def test_get_version_root(self):
         retval = api.get_metadata_item(self.fake_context, ['2009-04-04'],
                                        fakes.ID_OS_INSTANCE_1,
@@ -112,6 +149,39 @@ class MetadataApiTestCase(base.ApiTestCase):
               api.get_metadata_item, self.fake_context, ['2009-04-04'],
               fakes.ID_OS_INSTANCE_1, fakes.IP_NETWORK_INTERFACE_2)
 
+    def test_metadata_cache(self):
+        def get_item(path_tokens, context=self.fake_context):
+            return api.get_metadata_item(
+                context, path_tokens,
+                fakes.ID_OS_INSTANCE_1, fakes.IP_NETWORK_INTERFACE_2)
+
+        get_item(['latest', 'meta-data', 'local-hostname'])
+        get_item(['latest', 'meta-data', 'instance-id'])
+        get_item(['latest', 'user-data'])
+        self.assertRaises(exception.EC2MetadataNotFound,
+                          get_item, ['2007-08-29', 'meta-data'])
+        self.assertEqual(1, self.instance_api.describe_instances.call_count)
+        self.assertEqual(
+            1, self.instance_api.describe_instance_attribute.call_count)
+
+        # NOTE(ft): cached metadata is not available for other projects
+        other_context = self._create_context()
+        other_context.project_id = fakes.random_os_id()
+        self.assertRaises(exception.EC2MetadataNotFound,
+                          get_item, ['latest', 'meta-data'],
+                          context=other_context)
+        self.assertEqual(2, self.instance_api.describe_instances.call_count)
+
+        api.invalidate_metadata_cache()
+        get_item(['latest', 'meta-data', 'instance-id'])
+        self.assertEqual(3, self.instance_api.describe_instances.call_count)
+
+        self.configure(group='metadata', cache_ttl=0)
+        api.invalidate_metadata_cache()
+        get_item(['latest', 'meta-data', 'instance-id'])
+        get_item(['latest', 'meta-data', 'instance-id'])
+        self.assertEqual(5, self.instance_api.describe_instances.call_count)
+
     def test_non_existing_instance(self):
         self.instance_api.describe_instances.return_value = {
                'reservationSet': []}
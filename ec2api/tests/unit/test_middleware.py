@@ -17,6 +17,7 @@
 from lxml import etree
 import mock
 from oslo_config import cfg
+from oslo_config import fixture as config_fixture
 from oslotest import base as test_base
 import requests
 import webob.dec
@@ -138,7 +139,8 @@ class KeystoneAuthTestCase(test_base.BaseTestCase):
         resp = self.kauth(req)
         self._validate_ec2_error(resp, 400, 'AuthFailure')
 
-    @mock.patch.object(requests, 'request', return_value=FakeResponse())
+    @mock.patch.object(requests.Session, 'request',
+                       return_value=FakeResponse())
     def test_communication_failure(self, mock_request):
         req = wsgi.Request.blank('/test')
         req.GET['Signature'] = 'test-signature'
@@ -148,10 +150,11 @@ class KeystoneAuthTestCase(test_base.BaseTestCase):
         mock_request.assert_called_with('POST',
                                         CONF.keystone_url + '/ec2tokens',
                                         data=mock.ANY, headers=mock.ANY,
-                                        verify=True)
+                                        verify=True, timeout=mock.ANY)
 
     @tools.screen_all_logs
-    @mock.patch.object(requests, 'request', return_value=FakeResponse(200))
+    @mock.patch.object(requests.Session, 'request',
+                       return_value=FakeResponse(200))
     def test_no_result_data(self, mock_request):
         req = wsgi.Request.blank('/test')
         req.GET['Signature'] = 'test-signature'
@@ -161,4 +164,85 @@ class KeystoneAuthTestCase(test_base.BaseTestCase):
         mock_request.assert_called_with('POST',
                                         CONF.keystone_url + '/ec2tokens',
                                         data=mock.ANY, headers=mock.ANY,
-                                        verify=True)
+                                        verify=True, timeout=mock.ANY)
+
+    @tools.screen_all_logs
+    @mock.patch.object(requests.Session, 'request')
+    def test_auth_cache(self, mock_request):
+        success_response = mock.Mock(status_code=200)
+        success_response.json.return_value = {'user_id': 'fake_user',
+                                              'account_id': 'fake_account'}
+        mock_request.return_value = success_response
+
+        def do_request(action, token='fake-token'):
+            req = wsgi.Request.blank('/test')
+            req.GET['Action'] = action
+            req.headers['X-Auth-Token'] = token
+            return req.get_response(self.kauth)
+
+        resp = do_request('DescribeVpcs')
+        self.assertEqual(200, resp.status_code)
+        resp = do_request('DescribeVpcs')
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(1, mock_request.call_count)
+
+        do_request('DescribeSubnets')
+        do_request('DescribeVpcs', token='other-token')
+        self.assertEqual(3, mock_request.call_count)
+
+        mock_request.reset_mock()
+        mock_request.return_value = mock.Mock(status_code=403,
+                                              reason='Forbidden')
+        for _i in range(2):
+            resp = do_request('DescribeVpcs', token='bad-token')
+            self._validate_ec2_error(resp, 403, 'AuthFailure')
+        self.assertEqual(1, mock_request.call_count)
+
+        mock_request.reset_mock()
+        mock_request.return_value = mock.Mock(status_code=503,
+                                              reason='Unavailable')
+        for _i in range(2):
+            resp = do_request('DescribeVpcs', token='another-token')
+            self._validate_ec2_error(resp, 503, 'AuthFailure')
+        self.assertEqual(2, mock_request.call_count)
+
+    @mock.patch.object(requests.Session, 'request')
+    def test_auth_cache_disabled(self, mock_request):
+        self.useFixture(config_fixture.Config()).config(auth_cache_ttl=0)
+        kauth = ec2.EC2KeystoneAuth(conditional_forbid)
+        success_response = mock.Mock(status_code=200)
+        success_response.json.return_value = {'user_id': 'fake_user',
+                                              'account_id': 'fake_account'}
+        mock_request.return_value = success_response
+
+        for _i in range(2):
+            req = wsgi.Request.blank('/test')
+            req.GET['Action'] = 'DescribeVpcs'
+            req.headers['X-Auth-Token'] = 'fake-token'
+            self.assertEqual(200, req.get_response(kauth).status_code)
+        self.assertEqual(2, mock_request.call_count)
+
+    @mock.patch.object(requests.Session, 'request')
+    def test_iam_session(self, mock_request):
+        self.useFixture(config_fixture.Config()).config(
+            iam_connect_timeout=1, iam_read_timeout=2, auth_cache_ttl=0)
+        kauth = ec2.EC2KeystoneAuth(conditional_forbid)
+        success_response = mock.Mock(status_code=200)
+        success_response.json.return_value = {'user_id': 'fake_user',
+                                              'account_id': 'fake_account'}
+        mock_request.return_value = success_response
+
+        sessions = set()
+        for _i in range(2):
+            req = wsgi.Request.blank('/test')
+            req.GET['Action'] = 'DescribeVpcs'
+            req.headers['X-Auth-Token'] = 'fake-token'
+            req.get_response(kauth)
+            sessions.add(kauth._iam_session)
+        self.assertEqual(1, len(sessions))
+        mock_request.assert_called_with('POST', CONF.keystone_token_url,
+                                        data=mock.ANY, headers=mock.ANY,
+                                        verify=True, timeout=(1, 2))
+        stats = kauth.get_iam_pool_stats()
+        self.assertEqual(2, stats['requests'])
+        self.assertEqual(0, stats['failures'])
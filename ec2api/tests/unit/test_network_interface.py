@@ -416,6 +416,34 @@ class NetworkInterfaceTestCase(base.ApiTestCase):
             'DescribeNetworkInterfaces', 'networkInterfaceSet',
             fakes.ID_EC2_NETWORK_INTERFACE_1, 'networkInterfaceId')
 
+    def test_describe_network_interfaces_lightweight(self):
+        self.configure(check_address_status_on_describe=False)
+        self.set_mock_db_items(
+            fakes.DB_NETWORK_INTERFACE_1, fakes.DB_NETWORK_INTERFACE_2,
+            fakes.DB_ADDRESS_1,
+            tools.update_dict(fakes.DB_ADDRESS_2, {'status': 'active'}),
+            fakes.DB_INSTANCE_1, fakes.DB_INSTANCE_2,
+            fakes.DB_SECURITY_GROUP_1)
+        self.neutron.list_ports.return_value = {'ports': [fakes.OS_PORT_2]}
+        self.neutron.list_floatingips.return_value = (
+            {'floatingips': [fakes.OS_FLOATING_IP_2]})
+        self.neutron.list_security_groups.return_value = (
+            {'security_groups': [copy.deepcopy(fakes.OS_SECURITY_GROUP_1)]})
+
+        resp = self.execute(
+            'DescribeNetworkInterfaces',
+            {'NetworkInterfaceId.1': fakes.ID_EC2_NETWORK_INTERFACE_2})
+        self.assertThat(resp['networkInterfaceSet'],
+                        matchers.ListMatches(
+                            [fakes.EC2_NETWORK_INTERFACE_2]))
+        # NOTE(ft): only requested ports and related floating IPs are got
+        self.neutron.list_ports.assert_any_call(
+            tenant_id=fakes.ID_OS_PROJECT, id=[fakes.ID_OS_PORT_2])
+        self.neutron.list_floatingips.assert_called_once_with(
+            tenant_id=fakes.ID_OS_PROJECT, id=[fakes.ID_OS_FLOATING_IP_2])
+        for call in self.neutron.list_ports.mock_calls:
+            self.assertIn('id', call[2])
+
     def test_describe_network_interface_attribute(self):
         self.set_mock_db_items(fakes.DB_NETWORK_INTERFACE_1)
 
@@ -571,8 +571,8 @@ class RouteTableTestCase(base.ApiTestCase):
             fakes.DB_VPC_1, fakes.DB_VPC_2, fakes.DB_IGW_1, fakes.DB_IGW_2,
             fakes.DB_NETWORK_INTERFACE_1, fakes.DB_NETWORK_INTERFACE_2,
             fakes.DB_INSTANCE_1)
-        self.nova.servers.get.return_value = (
-            mock.NonCallableMock(status='ACTIVE'))
+        self.nova.servers.list.return_value = [
+            mock.NonCallableMock(id=fakes.ID_OS_INSTANCE_1, status='ACTIVE')]
 
         resp = self.execute('DescribeRouteTables', {})
         self.assertThat(resp['routeTableSet'],
@@ -584,8 +584,9 @@ class RouteTableTestCase(base.ApiTestCase):
                             {'RouteTableId.1': fakes.ID_EC2_ROUTE_TABLE_1})
         self.assertThat(resp['routeTableSet'],
                         matchers.ListMatches([fakes.EC2_ROUTE_TABLE_1]))
-        self.db_api.get_items_by_ids.assert_called_once_with(
+        self.db_api.get_items_by_ids.assert_any_call(
             mock.ANY, set([fakes.ID_EC2_ROUTE_TABLE_1]))
+        self.assertFalse(self.nova.servers.get.called)
 
         self.check_filtering(
             'DescribeRouteTables', 'routeTableSet',
@@ -634,8 +635,8 @@ class RouteTableTestCase(base.ApiTestCase):
             route_table_1, route_table_2, fakes.DB_VPC_1, fakes.DB_VPC_2,
             igw_1, igw_2, subnet_1, subnet_2,
             fakes.DB_NETWORK_INTERFACE_1, fakes.DB_NETWORK_INTERFACE_2)
-        self.nova.servers.get.return_value = (
-            mock.NonCallableMock(status='DOWN'))
+        self.nova.servers.list.return_value = [
+            mock.NonCallableMock(id=fakes.ID_OS_INSTANCE_1, status='DOWN')]
         resp = self.execute('DescribeRouteTables', {})
         ec2_route_table_1 = copy.deepcopy(fakes.EC2_ROUTE_TABLE_1)
         ec2_route_table_1['routeSet'].append({
@@ -679,6 +680,86 @@ class RouteTableTestCase(base.ApiTestCase):
                         matchers.ListMatches([ec2_route_table_1,
                                               ec2_route_table_2]))
 
+    def test_describe_route_tables_instance_statuses(self):
+        network_interface_3 = tools.update_dict(
+            fakes.DB_NETWORK_INTERFACE_1,
+            {'id': fakes.random_ec2_id('eni'),
+             'instance_id': fakes.ID_EC2_INSTANCE_2})
+        route_table_2 = copy.deepcopy(fakes.DB_ROUTE_TABLE_2)
+        route_table_2['routes'].append(
+            {'destination_cidr_block': '192.168.88.0/24',
+             'network_interface_id': network_interface_3['id']})
+        route_table_3 = copy.deepcopy(fakes.DB_ROUTE_TABLE_3)
+        route_table_3['routes'].append(
+            {'destination_cidr_block': '192.168.99.0/24',
+             'network_interface_id': fakes.ID_EC2_NETWORK_INTERFACE_2})
+        self.set_mock_db_items(
+            fakes.DB_ROUTE_TABLE_1, route_table_2, route_table_3,
+            fakes.DB_VPC_1, fakes.DB_NETWORK_INTERFACE_1,
+            fakes.DB_NETWORK_INTERFACE_2, network_interface_3,
+            fakes.DB_INSTANCE_1, fakes.DB_INSTANCE_2)
+        self.nova.servers.list.return_value = [
+            mock.NonCallableMock(id=fakes.ID_OS_INSTANCE_1, status='ACTIVE'),
+            mock.NonCallableMock(id=fakes.ID_OS_INSTANCE_2, status='DOWN')]
+
+        describer = route_table.RouteTableDescriber()
+        describer.context = self._create_context()
+        describer.ids = None
+        describer.fetch_sources()
+        describer.get_db_items()
+
+        self.assertEqual({fakes.ID_EC2_INSTANCE_1: 'ACTIVE',
+                          fakes.ID_EC2_INSTANCE_2: 'DOWN'},
+                         describer.instance_statuses)
+        self.nova.servers.list.assert_called_once_with(marker=None)
+        self.assertFalse(self.nova.servers.get.called)
+
+        ec2_route_table = route_table._format_route_table(
+            describer.context, route_table_2,
+            network_interfaces=describer.network_interfaces,
+            instance_statuses=describer.instance_statuses)
+        self.assertEqual(
+            [fakes.ID_EC2_INSTANCE_1, fakes.ID_EC2_INSTANCE_2],
+            [r['instanceId'] for r in ec2_route_table['routeSet']
+             if 'instanceId' in r])
+
+    def test_describe_route_tables_instance_statuses_paged(self):
+        route_table_3 = copy.deepcopy(fakes.DB_ROUTE_TABLE_3)
+        route_table_3['routes'].append(
+            {'destination_cidr_block': '192.168.99.0/24',
+             'network_interface_id': fakes.ID_EC2_NETWORK_INTERFACE_2})
+        self.set_mock_db_items(
+            route_table_3, fakes.DB_VPC_1, fakes.DB_NETWORK_INTERFACE_2,
+            fakes.DB_INSTANCE_1)
+        other_os_instance_id = fakes.random_os_id()
+        pages = {
+            None: [mock.NonCallableMock(id=other_os_instance_id,
+                                        status='ACTIVE')],
+            other_os_instance_id: [
+                mock.NonCallableMock(id=fakes.ID_OS_INSTANCE_1,
+                                     status='ACTIVE')],
+            fakes.ID_OS_INSTANCE_1: []}
+        self.nova.servers.list.side_effect = (
+            lambda marker=None: pages[marker])
+
+        describer = route_table.RouteTableDescriber()
+        describer.context = self._create_context()
+        describer.ids = None
+        describer.fetch_sources()
+        describer.get_db_items()
+
+        self.assertEqual({fakes.ID_EC2_INSTANCE_1: 'ACTIVE'},
+                         describer.instance_statuses)
+        self.assertEqual(
+            [mock.call(marker=None), mock.call(marker=other_os_instance_id)],
+            self.nova.servers.list.mock_calls)
+
+        self.nova.servers.list.reset_mock()
+        pages[other_os_instance_id] = []
+        describer.get_db_items()
+        self.assertEqual({}, describer.instance_statuses)
+        self.assertEqual(2, self.nova.servers.list.call_count)
+
     def test_get_subnet_host_routes(self):
         self.set_mock_db_items(
             fakes.DB_NETWORK_INTERFACE_1, fakes.DB_NETWORK_INTERFACE_2,
@@ -751,21 +832,29 @@ class RouteTableTestCase(base.ApiTestCase):
             fakes.ID_OS_SUBNET_1,
             {'subnet': {'host_routes': 'fake_previous_routes'}})
 
+    @mock.patch('ec2api.api.route_table._get_subnet_host_routes')
     @mock.patch('ec2api.api.route_table._get_router_objects')
     @mock.patch('ec2api.api.route_table._update_subnet_host_routes')
     def test_update_routes_in_associated_subnets(self, routes_updater,
-                                                 get_router_objects):
+                                                 get_router_objects,
+                                                 routes_getter):
         subnet_default_rtb = {'id': 'fake_1',
+                              'os_id': fakes.ID_OS_SUBNET_1,
                               'vpc_id': fakes.ID_EC2_VPC_1}
         subnet_rtb_2 = {'id': 'fake_2',
+                        'os_id': fakes.ID_OS_SUBNET_2,
                         'vpc_id': fakes.ID_EC2_VPC_1,
                         'route_table_id': fakes.ID_EC2_ROUTE_TABLE_2}
         subnet_vpc_2 = {'id': 'fake_3',
+                        'os_id': 'fake_os_id',
                         'vpc_id': fakes.ID_EC2_VPC_2}
         self.db_api.get_items.return_value = [subnet_default_rtb,
                                               subnet_rtb_2, subnet_vpc_2]
         self.db_api.get_item_by_id.return_value = fakes.DB_VPC_1
+        self.neutron.list_subnets.return_value = {
+            'subnets': [fakes.OS_SUBNET_2]}
         get_router_objects.return_value = {'fake': 'objects'}
+        routes_getter.return_value = 'fake_routes'
 
         route_table._update_routes_in_associated_subnets(
             mock.MagicMock(), fakes.DB_ROUTE_TABLE_2, 'fake_cleaner',
@@ -773,31 +862,98 @@ class RouteTableTestCase(base.ApiTestCase):
 
         self.db_api.get_item_by_id.assert_called_once_with(
             mock.ANY, fakes.ID_EC2_VPC_1)
+        self.neutron.list_subnets.assert_called_once_with(
+            id=[fakes.ID_OS_SUBNET_2])
+        routes_getter.assert_called_once_with(
+            mock.ANY, fakes.DB_ROUTE_TABLE_2, '10.10.2.1', {'fake': 'objects'})
         routes_updater.assert_called_once_with(
             mock.ANY, subnet_rtb_2, fakes.DB_ROUTE_TABLE_2,
             cleaner='fake_cleaner',
             rollback_route_table_object={'fake': 'table'},
-            router_objects={'fake': 'objects'}, neutron=mock.ANY)
+            router_objects={'fake': 'objects'}, neutron=mock.ANY,
+            os_subnet=fakes.OS_SUBNET_2, host_routes='fake_routes')
         get_router_objects.assert_called_once_with(mock.ANY,
                                                    fakes.DB_ROUTE_TABLE_2)
 
         self.db_api.get_item_by_id.reset_mock()
+        self.neutron.list_subnets.reset_mock()
         routes_updater.reset_mock()
+        routes_getter.reset_mock()
         get_router_objects.reset_mock()
+        self.neutron.list_subnets.return_value = {'subnets': []}
 
         route_table._update_routes_in_associated_subnets(
             mock.MagicMock(), fakes.DB_ROUTE_TABLE_1, 'fake_cleaner',
             {'fake': 'table'}, is_main=True)
 
         self.assertEqual(0, self.db_api.get_item_by_id.call_count)
+        self.assertFalse(routes_getter.called)
+        # NOTE(ft): a subnet missed in Neutron is processed separately to
+        # report the error
         routes_updater.assert_called_once_with(
             mock.ANY, subnet_default_rtb, fakes.DB_ROUTE_TABLE_1,
             cleaner='fake_cleaner',
             rollback_route_table_object={'fake': 'table'},
-            router_objects={'fake': 'objects'}, neutron=mock.ANY)
+            router_objects={'fake': 'objects'}, neutron=mock.ANY,
+            os_subnet=None, host_routes=None)
         get_router_objects.assert_called_once_with(mock.ANY,
                                                    fakes.DB_ROUTE_TABLE_1)
 
+    def test_update_routes_in_associated_subnets_rollback(self):
+        subnets = [{'id': 'subnet-%s' % i,
+                    'os_id': 'os-subnet-%s' % i,
+                    'vpc_id': fakes.ID_EC2_VPC_1}
+                   for i in range(3)]
+        os_subnets = [{'id': subnet['os_id'],
+                       'cidr': '10.10.%s.0/24' % i,
+                       'host_routes': []}
+                      for i, subnet in enumerate(subnets)]
+        route_table_1 = {'id': fakes.ID_EC2_ROUTE_TABLE_1,
+                         'vpc_id': fakes.ID_EC2_VPC_1,
+                         'routes': [{'destination_cidr_block': '0.0.0.0/0',
+                                     'gateway_id': None}]}
+        route_table_2 = {'id': fakes.ID_EC2_ROUTE_TABLE_2,
+                         'vpc_id': fakes.ID_EC2_VPC_1,
+                         'routes': []}
+        self.db_api.get_items.return_value = subnets
+        self.neutron.list_subnets.return_value = {'subnets': os_subnets}
+        self.neutron.show_subnet.side_effect = (
+            lambda os_id: {'subnet': next(s for s in os_subnets
+                                          if s['id'] == os_id)})
+        # NOTE(ft): the first subnet has actual routes already
+        os_subnets[0]['host_routes'] = [{'destination': '0.0.0.0/0',
+                                         'nexthop': '10.10.0.1'}]
+
+        def update_subnet(os_id, body):
+            if os_id == 'os-subnet-1':
+                raise Exception('fake_exception')
+
+        self.neutron.update_subnet.side_effect = update_subnet
+
+        try:
+            with common.OnCrashCleaner() as cleaner:
+                route_table._update_routes_in_associated_subnets(
+                    self._create_context(), route_table_1, cleaner,
+                    route_table_2, is_main=True)
+        except Exception as ex:
+            if ex.message != 'fake_exception':
+                raise
+        else:
+            self.fail('No exception is raised')
+
+        self.assertEqual(1, self.neutron.list_subnets.call_count)
+        self.assertEqual(3, self.neutron.update_subnet.call_count)
+        self.neutron.update_subnet.assert_any_call(
+            'os-subnet-2',
+            {'subnet': {'host_routes': [{'destination': '0.0.0.0/0',
+                                         'nexthop': '10.10.2.1'}]}})
+        # NOTE(ft): only the updated subnet is rolled back
+        self.neutron.show_subnet.assert_called_once_with('os-subnet-2')
+        self.neutron.update_subnet.assert_called_with(
+            'os-subnet-2',
+            {'subnet': {'host_routes': [{'destination': '0.0.0.0/0',
+                                         'nexthop': '127.0.0.1'}]}})
+
     def test_get_router_objects(self):
         self.set_mock_db_items(fakes.DB_IGW_1, fakes.DB_NETWORK_INTERFACE_2)
         host_routes = route_table._get_router_objects('fake_context',
@@ -806,3 +962,7 @@ class RouteTableTestCase(base.ApiTestCase):
             fakes.ID_EC2_IGW_1: fakes.DB_IGW_1,
             fakes.ID_EC2_NETWORK_INTERFACE_2:
                         fakes.DB_NETWORK_INTERFACE_2}))
+        self.db_api.get_items_by_ids.assert_called_once_with(
+            'fake_context', set([fakes.ID_EC2_IGW_1,
+                                 fakes.ID_EC2_NETWORK_INTERFACE_2]))
+        self.assertFalse(self.db_api.get_item_by_id.called)
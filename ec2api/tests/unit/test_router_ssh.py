@@ -0,0 +1,100 @@
+# Copyright 2014
+# The Cloudscaling Group, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import socket
+
+import mock
+from oslo_config import fixture as config_fixture
+from oslotest import base as test_base
+import paramiko
+
+from ec2api.api import router_ssh
+from ec2api.tests.unit import tools
+
+
+class RouterSshTestCase(test_base.BaseTestCase):
+
+    def setUp(self):
+        super(RouterSshTestCase, self).setUp()
+        conf = self.useFixture(config_fixture.Config())
+        conf.config(router_address='fake_router', router_user='fake_user',
+                    router_cred='fake_cred', router_batch_size=2)
+        ssh_client_patcher = mock.patch('paramiko.SSHClient')
+        self.ssh_client_class = ssh_client_patcher.start()
+        self.addCleanup(ssh_client_patcher.stop)
+        self.ssh_client_class.side_effect = self._create_client
+        self.clients = []
+        self.outputs = {}
+        self.addCleanup(setattr, router_ssh, '_pool', None)
+        router_ssh._pool = None
+
+    def _create_client(self):
+        client = mock.Mock()
+        client.get_transport.return_value.is_active.return_value = True
+
+        def exec_command(command, timeout=None):
+            stdout = mock.Mock()
+            stdout.read.return_value = self.outputs.get(command, '')
+            return mock.Mock(), stdout, mock.Mock()
+
+        client.exec_command.side_effect = exec_command
+        self.clients.append(client)
+        return client
+
+    def test_have_routes(self):
+        self.outputs[router_ssh.ROUTE_COMMAND % '10.0.0.1'] = (
+            '                Protocol next hop: 192.168.1.1\n')
+        self.outputs[router_ssh.ROUTE_COMMAND % '10.0.0.3'] = (
+            'Protocol next hop: none\n')
+
+        routes = router_ssh.have_routes(['10.0.0.1', '10.0.0.2', '10.0.0.3',
+                                         '10.0.0.1'])
+        self.assertEqual({'10.0.0.1': True,
+                          '10.0.0.2': False,
+                          '10.0.0.3': False},
+                         routes)
+        self.assertEqual(1, len(self.clients))
+        self.clients[0].connect.assert_called_once_with(
+            'fake_router', username='fake_user', password='fake_cred',
+            timeout=mock.ANY)
+        self.assertEqual(3, self.clients[0].exec_command.call_count)
+
+    def test_session_reuse(self):
+        router_ssh.have_routes(['10.0.0.1'])
+        router_ssh.have_routes(['10.0.0.2'])
+        self.assertEqual(1, len(self.clients))
+        self.assertFalse(self.clients[0].close.called)
+
+        # NOTE(ft): reconnect if the transport is closed
+        self.clients[0].get_transport.return_value.is_active.return_value = (
+            False)
+        router_ssh.have_routes(['10.0.0.3'])
+        self.assertEqual(2, len(self.clients))
+        self.clients[0].close.assert_called_once_with()
+
+    @tools.screen_all_logs
+    def test_reconnect_on_failure(self):
+        router_ssh.have_routes(['10.0.0.1'])
+        self.clients[0].exec_command.side_effect = socket.timeout()
+        self.assertEqual({'10.0.0.2': False},
+                         router_ssh.have_routes(['10.0.0.2']))
+        self.assertEqual(2, len(self.clients))
+        self.clients[0].close.assert_called_once_with()
+
+        self.ssh_client_class.side_effect = None
+        self.ssh_client_class.return_value.connect.side_effect = (
+            paramiko.SSHException())
+        self.clients[1].exec_command.side_effect = socket.timeout()
+        self.assertRaises(paramiko.SSHException,
+                          router_ssh.have_routes, ['10.0.0.3'])
@@ -290,6 +290,45 @@ class SecurityGroupTestCase(base.ApiTestCase):
             'DescribeSecurityGroups', 'securityGroupInfo',
             fakes.ID_EC2_SECURITY_GROUP_2, 'groupId')
 
+    def test_describe_security_groups_cross_references(self):
+        security_group.security_group_engine = (
+            security_group.SecurityGroupEngineNeutron())
+        os_groups = []
+        db_groups = []
+        for i in range(3):
+            os_id = fakes.random_os_id()
+            db_groups.append({'id': fakes.random_ec2_id('sg'),
+                              'os_id': os_id,
+                              'vpc_id': fakes.ID_EC2_VPC_1})
+            os_groups.append({'id': os_id,
+                              'name': 'group%s' % i,
+                              'description': 'description',
+                              'tenant_id': fakes.ID_OS_PROJECT})
+        for i, os_group in enumerate(os_groups):
+            os_group['security_group_rules'] = [
+                {'id': fakes.random_os_id(),
+                 'direction': 'ingress',
+                 'ethertype': 'IPv4',
+                 'protocol': 'tcp',
+                 'port_range_min': 22,
+                 'port_range_max': 22,
+                 'remote_group_id': os_groups[(i + 1) % 3]['id'],
+                 'remote_ip_prefix': None}]
+        self.set_mock_db_items(*db_groups)
+        self.neutron.list_security_groups.return_value = (
+            {'security_groups': os_groups})
+
+        resp = security_group.describe_security_groups(
+            self._create_context())
+        groups = dict((g['groupId'], g) for g in resp['securityGroupInfo'])
+        self.assertEqual(3, len(groups))
+        for i, db_group in enumerate(db_groups):
+            self.assertEqual(
+                [{'groupId': db_groups[(i + 1) % 3]['id'],
+                  'groupName': 'group%s' % ((i + 1) % 3),
+                  'userId': fakes.ID_OS_PROJECT}],
+                groups[db_group['id']]['ipPermissions'][0]['groups'])
+
     def test_describe_security_groups_nova(self):
         security_group.security_group_engine = (
             security_group.SecurityGroupEngineNova())
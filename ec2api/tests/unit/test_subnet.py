@@ -15,6 +15,7 @@
 import mock
 from neutronclient.common import exceptions as neutron_exception
 
+from ec2api.api import subnet as subnet_api
 from ec2api.tests.unit import base
 from ec2api.tests.unit import fakes
 from ec2api.tests.unit import matchers
@@ -271,6 +272,38 @@ class SubnetTestCase(base.ApiTestCase):
             'DescribeSubnets', 'subnetSet',
             fakes.ID_EC2_SUBNET_2, 'subnetId')
 
+    def test_describe_subnets_pushed_down_filters(self):
+        self.set_mock_db_items(fakes.DB_VPC_1, fakes.DB_SUBNET_1,
+                               fakes.DB_SUBNET_2)
+        self.neutron.list_subnets.return_value = (
+                {'subnets': [fakes.OS_SUBNET_2]})
+        self.neutron.list_networks.return_value = (
+                {'networks': [fakes.OS_NETWORK_1, fakes.OS_NETWORK_2]})
+
+        resp = self.execute('DescribeSubnets',
+                            {'Filter.1.Name': 'vpc-id',
+                             'Filter.1.Value.1': fakes.ID_EC2_VPC_1,
+                             'Filter.2.Name': 'cidr',
+                             'Filter.2.Value.1': fakes.CIDR_SUBNET_2,
+                             'Filter.3.Name': 'subnet-id',
+                             'Filter.3.Value.1': 'subnet-*'})
+        self.assertEqual([fakes.ID_EC2_SUBNET_2],
+                         [s['subnetId'] for s in resp['subnetSet']])
+        self.db_api.get_items_page.assert_called_once_with(
+            mock.ANY, 'subnet', marker=None, limit=None,
+            filters={'vpc_id': [fakes.ID_EC2_VPC_1],
+                     'id': ['subnet-*']})
+        self.neutron.list_subnets.assert_called_once_with(
+            cidr=[fakes.CIDR_SUBNET_2])
+        self.assertFalse(self.db_api.get_items.called)
+
+        # NOTE(ft): DB filters don't fail if nothing is found
+        self.db_api.get_items_page.reset_mock()
+        resp = self.execute('DescribeSubnets',
+                            {'Filter.1.Name': 'vpc-id',
+                             'Filter.1.Value.1': 'vpc-?0000000'})
+        self.assertEqual([], resp['subnetSet'])
+
     def test_describe_subnets_not_consistent_os_subnet(self):
         self.set_mock_db_items(fakes.DB_SUBNET_1, fakes.DB_SUBNET_2)
         self.neutron.list_subnets.return_value = (
@@ -280,3 +313,21 @@ class SubnetTestCase(base.ApiTestCase):
 
         resp = self.execute('DescribeSubnets', {})
         self.assertEqual([], resp['subnetSet'])
+
+    def test_get_subnets_ips_usage(self):
+        os_ports = [
+            {'device_owner': 'network:dhcp',
+             'fixed_ips': [{'subnet_id': fakes.ID_OS_SUBNET_1,
+                            'ip_address': '10.10.1.2'}]},
+            {'device_owner': 'compute:nova',
+             'fixed_ips': [{'subnet_id': fakes.ID_OS_SUBNET_1,
+                            'ip_address': '10.10.1.3'},
+                           {'subnet_id': fakes.ID_OS_SUBNET_2,
+                            'ip_address': '10.10.2.3'}]},
+            {'device_owner': 'compute:nova',
+             'fixed_ips': [{'subnet_id': fakes.ID_OS_SUBNET_2,
+                            'ip_address': '10.10.2.4'}]},
+            {'device_owner': 'network:router_interface'}]
+        self.assertEqual({fakes.ID_OS_SUBNET_1: (2, True),
+                          fakes.ID_OS_SUBNET_2: (2, False)},
+                         subnet_api._get_subnets_ips_usage(os_ports))
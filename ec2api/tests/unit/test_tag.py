@@ -19,12 +19,15 @@ from ec2api.api import tag as tag_api
 from ec2api.tests.unit import base
 from ec2api.tests.unit import fakes
 from ec2api.tests.unit import matchers
+from ec2api.tests.unit import tools
 
 
 class TagTestCase(base.ApiTestCase):
 
     def test_create_tags(self):
-        self.db_api.get_item_by_id.return_value = {'id': 'fake'}
+        self.db_api.get_items_by_ids.side_effect = (
+            lambda context, item_ids: [{'id': item_id}
+                                       for item_id in item_ids])
 
         # NOTE(ft): check create several tags for several resources
         resp = self.execute('CreateTags',
@@ -66,9 +69,17 @@ class TagTestCase(base.ApiTestCase):
                        'Tag.1.Value': 'value'})
         resp = self.execute('CreateTags', params)
         self.assertEqual({'return': True}, resp)
+        # NOTE(ft): check existence of all resources is checked at once
+        self.assertEqual(2, self.db_api.get_items_by_ids.call_count)
+        self.assertEqual(
+            sorted(r_id for r_id in resource_ids
+                   if not r_id.startswith(('ami', 'aki', 'ari'))),
+            sorted(self.db_api.get_items_by_ids.call_args[0][1]))
 
         # NOTE(ft): check create a tag for non-existing images
-        self.db_api.get_item_by_id.return_value = None
+        self.db_api.get_items_by_ids.reset_mock()
+        self.db_api.get_items_by_ids.side_effect = None
+        self.db_api.get_items_by_ids.return_value = []
         resp = self.execute('CreateTags',
                             {'ResourceId.1': fakes.ID_EC2_IMAGE_1,
                              'ResourceId.2': fakes.ID_EC2_IMAGE_AKI_1,
@@ -76,6 +87,7 @@ class TagTestCase(base.ApiTestCase):
                              'Tag.1.Key': 'Oracle RAC node',
                              'Tag.1.Value': ''})
         self.assertEqual({'return': True}, resp)
+        self.assertFalse(self.db_api.get_items_by_ids.called)
 
     def test_create_tags_invalid_parameters(self):
         # NOTE(ft): check tag validity checks
@@ -104,7 +116,7 @@ class TagTestCase(base.ApiTestCase):
              'Tag.1.Value': 'fake-value'})
 
         # NOTE(ft): check resource existence check
-        self.db_api.get_item_by_id.return_value = None
+        self.db_api.get_items_by_ids.return_value = []
         for r_id in tag_api.RESOURCE_TYPES:
             if r_id in ('ami', 'ari', 'aki'):
                 continue
@@ -142,16 +154,18 @@ class TagTestCase(base.ApiTestCase):
             mock.ANY, [fakes.ID_EC2_VPC_1], None)
 
     def test_describe_tags(self):
-        self.db_api.get_tags.return_value = [{'item_id': fakes.ID_EC2_VPC_1,
-                                              'key': 'key1',
-                                              'value': ''},
-                                             {'item_id': fakes.ID_EC2_VPC_2,
-                                              'key': 'key2',
-                                              'value': 'value2'},
-                                             {'item_id': fakes.ID_EC2_VPC_2,
-                                              'key': 'key1',
-                                              'value': 'value3'}
-                                             ]
+        tags = [{'item_id': fakes.ID_EC2_VPC_1,
+                 'key': 'key1',
+                 'value': ''},
+                {'item_id': fakes.ID_EC2_VPC_2,
+                 'key': 'key2',
+                 'value': 'value2'},
+                {'item_id': fakes.ID_EC2_VPC_2,
+                 'key': 'key1',
+                 'value': 'value3'}]
+        self.db_api.get_tags.return_value = tags
+        self.db_api.get_tags_page.side_effect = (
+            tools.get_db_api_get_tags_page(*tags))
         resp = self.execute('DescribeTags', {})
         self.assertThat(resp,
                         matchers.DictMatches(
@@ -202,3 +216,77 @@ class TagTestCase(base.ApiTestCase):
                                           'key': 'fake-key',
                                           'value': 'fake-value'}]},
                              resp)
+
+    def test_describe_tags_pushed_down_filters(self):
+        tags = [{'item_id': fakes.ID_EC2_VPC_1,
+                 'key': 'key1',
+                 'value': 'value1'},
+                {'item_id': fakes.ID_EC2_SUBNET_1,
+                 'key': 'key1',
+                 'value': 'value2'}]
+        self.db_api.get_tags_page.side_effect = (
+            tools.get_db_api_get_tags_page(*tags))
+
+        resp = self.execute('DescribeTags',
+                            {'Filter.1.Name': 'resource-type',
+                             'Filter.1.Value.1': 'subnet',
+                             'Filter.1.Value.2': 'image',
+                             'Filter.2.Name': 'key',
+                             'Filter.2.Value.1': 'key*'})
+        self.assertEqual([fakes.ID_EC2_SUBNET_1],
+                         [t['resourceId'] for t in resp['tagSet']])
+        self.db_api.get_tags_page.assert_called_once_with(
+            mock.ANY, marker=None, limit=None,
+            filters={'kind': ['aki', 'ami', 'ari', 'subnet'],
+                     'key': ['key*']})
+        self.assertFalse(self.db_api.get_tags.called)
+
+        self.db_api.get_tags_page.reset_mock()
+        resp = self.execute('DescribeTags',
+                            {'Filter.1.Name': 'resource-type',
+                             'Filter.1.Value.1': 'subnet',
+                             'Filter.1.Value.2': 'fake-type',
+                             'Filter.2.Name': 'key',
+                             'Filter.2.Value.1': 'key*'})
+        self.assertEqual([fakes.ID_EC2_SUBNET_1],
+                         [t['resourceId'] for t in resp['tagSet']])
+        self.db_api.get_tags_page.assert_called_once_with(
+            mock.ANY, marker=None, limit=None, filters={'key': ['key*']})
+
+        # NOTE(ft): DB can match values case-insensitively
+        self.db_api.get_tags_page.side_effect = None
+        self.db_api.get_tags_page.return_value = [
+            tags[0], tools.update_dict(tags[1], {'key': 'KEY1'})]
+        resp = self.execute('DescribeTags',
+                            {'Filter.1.Name': 'key',
+                             'Filter.1.Value.1': 'key*'})
+        self.assertEqual([fakes.ID_EC2_VPC_1],
+                         [t['resourceId'] for t in resp['tagSet']])
+
+    def test_describe_tags_paginated(self):
+        tags = [{'item_id': fakes.ID_EC2_VPC_1,
+                 'key': 'key%s' % i,
+                 'value': 'value'}
+                for i in range(6)]
+        self.db_api.get_tags_page.return_value = tags
+
+        resp = self.execute('DescribeTags', {'MaxResults': '5'})
+        self.assertEqual(5, len(resp['tagSet']))
+        self.assertIn('nextToken', resp)
+        self.db_api.get_tags_page.assert_called_once_with(
+            mock.ANY, marker=None, limit=6, filters=None)
+        self.assertFalse(self.db_api.get_tags.called)
+
+        self.db_api.get_tags_page.return_value = tags[5:]
+        resp = self.execute('DescribeTags', {'MaxResults': '5',
+                                             'NextToken': resp['nextToken']})
+        self.assertEqual(1, len(resp['tagSet']))
+        self.assertNotIn('nextToken', resp)
+        self.db_api.get_tags_page.assert_called_with(
+            mock.ANY, marker=[fakes.ID_EC2_VPC_1, 'key4'], limit=6,
+            filters=None)
+
+        self.assert_execution_error('InvalidPaginationToken', 'DescribeTags',
+                                    {'NextToken': 'fake'})
+        self.assert_execution_error('InvalidParameterValue', 'DescribeTags',
+                                    {'MaxResults': '1001'})
@@ -14,6 +14,7 @@
 
 import mock
 
+from ec2api.api import common
 from ec2api.tests.unit import base
 from ec2api.tests.unit import fakes
 from ec2api.tests.unit import matchers
@@ -71,6 +72,43 @@ class VolumeTestCase(base.ApiTestCase):
             'DescribeVolumes', 'volumeSet',
             fakes.ID_EC2_VOLUME_1, 'volumeId')
 
+    def test_describe_volumes_paginated_auto_create(self):
+        self.cinder.volumes.list.return_value = [
+            fakes.OSVolume(fakes.OS_VOLUME_1),
+            fakes.OSVolume(fakes.OS_VOLUME_2),
+            fakes.OSVolume(fakes.OS_VOLUME_3)]
+        self.set_mock_db_items(fakes.DB_VOLUME_1, fakes.DB_VOLUME_2,
+                               fakes.DB_INSTANCE_1, fakes.DB_INSTANCE_2,
+                               fakes.DB_SNAPSHOT_1, fakes.DB_SNAPSHOT_2)
+
+        def add_item(context, kind, data, project_id=None):
+            self.add_mock_db_items(fakes.DB_VOLUME_3)
+            return fakes.DB_VOLUME_3
+        self.db_api.add_item.side_effect = add_item
+
+        resp = self.execute('DescribeVolumes', {'MaxResults': '5'})
+        self.assertThat(resp, matchers.DictMatches(
+            {'volumeSet': [fakes.EC2_VOLUME_1, fakes.EC2_VOLUME_2,
+                           fakes.EC2_VOLUME_3]},
+            orderless_lists=True))
+        self.db_api.add_item.assert_called_once_with(
+            mock.ANY, 'vol', {'os_id': fakes.ID_OS_VOLUME_3}, project_id=None)
+        self.assertEqual(1, self.cinder.volumes.list.call_count)
+
+        # NOTE(ft): next pages don't add unknown OS items
+        self.db_api.add_item.reset_mock()
+        self.set_mock_db_items(fakes.DB_VOLUME_1, fakes.DB_VOLUME_2,
+                               fakes.DB_INSTANCE_1, fakes.DB_INSTANCE_2,
+                               fakes.DB_SNAPSHOT_1, fakes.DB_SNAPSHOT_2)
+        next_token = common.encode_next_token(
+            mock.Mock(project_id=fakes.ID_OS_PROJECT), 'vol', '')
+        resp = self.execute('DescribeVolumes', {'MaxResults': '5',
+                                                'NextToken': next_token})
+        self.assertThat(resp, matchers.DictMatches(
+            {'volumeSet': [fakes.EC2_VOLUME_1, fakes.EC2_VOLUME_2]},
+            orderless_lists=True))
+        self.assertFalse(self.db_api.add_item.called)
+
     def test_describe_volumes_auto_remove(self):
         self.cinder.volumes.list.return_value = []
         self.set_mock_db_items(fakes.DB_VOLUME_1, fakes.DB_VOLUME_2)
@@ -14,6 +14,7 @@
 
 
 import copy
+import fnmatch
 import logging
 import re
 
@@ -94,6 +95,17 @@ def get_db_api_get_items_by_ids(*items):
     return db_api_get_items_by_ids
 
 
+def get_db_api_get_items_by_instance_id(*items):
+    """Generate db_api.get_items_by_instance_id mock function."""
+
+    def db_api_get_items_by_instance_id(context, kind, instance_id):
+        return [copy.deepcopy(item)
+                for item in items
+                if (ec2utils.get_ec2_id_kind(item['id']) == kind and
+                    item.get('instance_id') == instance_id)]
+    return db_api_get_items_by_instance_id
+
+
 def get_db_api_get_items_ids(*items):
     """Generate db_api.get_items_ids mock function."""
 
@@ -106,6 +118,62 @@ def get_db_api_get_items_ids(*items):
     return db_api_get_items_ids
 
 
+def _is_matched(item, filters):
+    return all(any(fnmatch.fnmatch(str(item.get(column)), value)
+                   for value in values)
+               for column, values in (filters or {}).items())
+
+
+def get_db_api_get_items_page(*items):
+    """Generate db_api.get_items_page mock function."""
+
+    def db_api_get_items_page(context, kind, marker=None, limit=None,
+                              filters=None):
+        page = sorted((copy.deepcopy(item)
+                       for item in items
+                       if (ec2utils.get_ec2_id_kind(item['id']) == kind and
+                           (marker is None or item['id'] > marker) and
+                           _is_matched(item, filters))),
+                      key=lambda item: item['id'])
+        return page[:limit] if limit is not None else page
+    return db_api_get_items_page
+
+
+def get_db_api_get_tags_page(*tags):
+    """Generate db_api.get_tags_page mock function."""
+
+    def db_api_get_tags_page(context, marker=None, limit=None, filters=None):
+        page = [copy.deepcopy(tag)
+                for tag in tags
+                if (_is_matched(dict(tag, kind=ec2utils.get_ec2_id_kind(
+                                         tag['item_id'])),
+                                filters) and
+                    (marker is None or
+                     [tag['item_id'], tag['key']] > marker))]
+        page.sort(key=lambda tag: (tag['item_id'], tag['key']))
+        return page[:limit] if limit is not None else page
+    return db_api_get_tags_page
+
+
+def get_db_api_get_item_ids_by_tags(*tags):
+    """Generate db_api.get_item_ids_by_tags mock function."""
+
+    def db_api_get_item_ids_by_tags(context, kinds, tag_filters):
+        item_ids = set()
+        for tag in tags:
+            item_id = tag['item_id']
+            if ec2utils.get_ec2_id_kind(item_id) not in kinds:
+                continue
+            item_tags = [t for t in tags if t['item_id'] == item_id]
+            for tag_filter in tag_filters:
+                if not any(_is_matched(t, tag_filter) for t in item_tags):
+                    break
+            else:
+                item_ids.add(item_id)
+        return item_ids
+    return db_api_get_item_ids_by_tags
+
+
 def get_neutron_create(kind, os_id, addon={}):
     """Generate Neutron create an object mock function."""
 
@@ -15,12 +15,14 @@
 
 """Utilities and helper functions."""
 
+import collections
 import contextlib
 import hashlib
 import hmac
 import shutil
 import socket
 import tempfile
+import time
 from xml.sax import saxutils
 
 from oslo_config import cfg
@@ -113,3 +115,46 @@ def utf8(value):
         return value.encode('utf-8')
     assert isinstance(value, str)
     return value
+
+
+class TTLCache(object):
+    """Size bounded LRU cache which expires entries after a time to live.
+
+    A non positive maxsize or ttl disables the cache, set becomes a no-op.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        try:
+            expires_at, value = self._data.pop(key)
+        except KeyError:
+            return default
+        if expires_at <= time.time():
+            return default
+        # NOTE(ft): reinsert to mark the entry as recently used
+        self._data[key] = (expires_at, value)
+        return value
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        self._data.pop(key, None)
+        while len(self._data) >= self.maxsize:
+            self._data.popitem(last=False)
+        self._data[key] = (time.time() + ttl, value)
+
+    def pop(self, key, default=None):
+        expires_at, value = self._data.pop(key, (None, default))
+        return value
+
+    def clear(self):
+        self._data.clear()